@@ -0,0 +1,1256 @@
+"""Camada de armazenamento dos pedidos e das configurações.
+
+Define a interface usada pelo app (`PedidosStore`) e duas implementações:
+`SheetsStore`, que fala direto com o Google Sheets, e `SQLiteStore`, que
+serve leituras e escritas localmente e replica as alterações para uma
+planilha-espelho opcional em segundo plano.
+"""
+import bisect
+import json
+import logging
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import deque
+
+from prazos import data_hora_iso, data_iso
+
+logger = logging.getLogger(__name__)
+
+# Cabeçalhos da planilha "Pedidos", na ordem das colunas
+COLUNAS_PEDIDOS = [
+    "ID", "Data/Hora", "Nome Cliente", "CPF", "Telefone Cliente", "Email",
+    "Itens Pedido", "Total Pedido", "Observacoes", "Tipo Pagamento",
+    "ID Transacao", "Status", "Aprovado por", "Valor Total Agrupado", "Entregue",
+    "Notificacao"  # resultado do envio do comprovante por WhatsApp (ver notificacoes.py)
+]
+# "capacidades" guarda, em JSON, o limite de quentinhas por prato naquela data (ex: {"Isca ...": 150})
+COLUNAS_CONFIG = ["data_evento", "prazo_data", "prazo_hora", "nome_amigavel", "capacidades"]
+# Itens de cada pedido em formato estruturado (planilha "Itens" / tabela itens_pedido)
+COLUNAS_ITENS = ["ID Pedido", "Data", "Item", "Quantidade", "Preco Unitario"]
+# Catálogo de eventos; "cardapio", "datas" e "pagamento" guardam JSON (ver eventos.py)
+COLUNAS_EVENTOS = ["evento", "nome", "cardapio", "datas", "pagamento", "acompanhamentos", "ativo"]
+# "[2x] Nome do prato" seguido de ", [Nx] ..." ou do fim do texto; aceita vírgulas no nome
+PADRAO_ITEM_TEXTO = r"\[(?P<Quantidade>\d+)x\] (?P<Item>.+?)(?=, \[\d+x\] |$)"
+
+
+def numero_coluna(coluna):
+    """Retorna o número (base 1) da coluna na planilha de pedidos."""
+    return COLUNAS_PEDIDOS.index(coluna) + 1
+
+
+def formatar_itens(itens, separador=", "):
+    """Monta o texto de exibição dos itens (ex: '[2x] Frango assado e Toscana')."""
+    return separador.join(f"[{item['Quantidade']}x] {item['Item']}" for item in itens)
+
+
+def ler_capacidades(texto):
+    """Converte o JSON da coluna 'capacidades' em {prato: limite}; vazio ou inválido = sem limites."""
+    try:
+        capacidades = json.loads(texto) if texto else {}
+    except (TypeError, ValueError):
+        return {}
+    if not isinstance(capacidades, dict):
+        return {}
+    return {str(prato): int(limite) for prato, limite in capacidades.items() if str(limite).strip().lstrip("-").isdigit()}
+
+
+def itens_do_texto(pedido_id, data, texto):
+    """Converte o texto de 'Itens Pedido' de um pedido antigo em itens estruturados."""
+    return [
+        {"ID Pedido": str(pedido_id), "Data": data, "Item": m.group("Item").strip(),
+         "Quantidade": int(m.group("Quantidade")), "Preco Unitario": None}
+        for m in re.finditer(PADRAO_ITEM_TEXTO, str(texto))
+    ]
+
+
+class PedidosStore(ABC):
+    """Interface comum aos backends de pedidos e configurações.
+
+    Quem precisa acompanhar as escritas feitas pelo app (caches, índices)
+    se registra com `registrar_ouvinte`; o ouvinte recebe
+    `("adicionados", linhas, itens)` ou `("atualizados", ids, coluna, valor)`.
+    """
+
+    def __init__(self):
+        self._ouvintes = []
+
+    def registrar_ouvinte(self, ouvinte):
+        self._ouvintes.append(ouvinte)
+
+    def _notificar(self, evento, *args):
+        for ouvinte in self._ouvintes:
+            try:
+                ouvinte(evento, *args)
+            except Exception:
+                logger.exception("Falha no ouvinte %r do evento %s", ouvinte, evento)
+
+    @abstractmethod
+    def carregar_pedidos(self):
+        """Retorna todos os pedidos como lista de dicionários (mesmo formato do get_all_records)."""
+
+    @abstractmethod
+    def carregar_alteracoes(self, n_conhecidos):
+        """Leitura incremental: retorna (ids, status, entregue, novos).
+
+        `ids`, `status` e `entregue` são as colunas ID/Status/Entregue de
+        todos os pedidos, na ordem das linhas (`ids` tem o tamanho real da
+        planilha: quem lê confere se os pedidos conhecidos continuam nas
+        mesmas posições); `novos` são os registros completos depois dos
+        `n_conhecidos` primeiros.
+        """
+
+    @abstractmethod
+    def carregar_itens(self):
+        """Retorna os itens estruturados de todos os pedidos (dicionários com as chaves de COLUNAS_ITENS)."""
+
+    @abstractmethod
+    def adicionar_pedidos(self, linhas, itens=()):
+        """Acrescenta pedidos em lote; cada linha segue a ordem de COLUNAS_PEDIDOS.
+
+        `itens` traz os itens estruturados dos mesmos pedidos, um dicionário
+        por item com as chaves de COLUNAS_ITENS.
+        """
+
+    @abstractmethod
+    def atualizar_pedido(self, pedido_id, coluna, valor):
+        """Altera uma coluna de um pedido. Retorna False se o pedido não existir."""
+
+    def atualizar_pedidos_em_lote(self, pedido_ids, coluna, valor):
+        """Altera a mesma coluna de vários pedidos. Retorna {id: True/False} por pedido."""
+        # atualizar_pedido já notifica os ouvintes, um pedido por vez
+        return {str(pid): self.atualizar_pedido(pid, coluna, valor) for pid in pedido_ids}
+
+    def atualizar_valores_em_lote(self, coluna, valores):
+        """Grava um valor diferente por pedido na mesma coluna (`valores` = {id: valor}). Retorna {id: True/False}."""
+        por_valor = {}
+        for pid, valor in valores.items():
+            por_valor.setdefault(valor, []).append(pid)
+        resultado = {}
+        for valor, ids in por_valor.items():
+            resultado.update(self.atualizar_pedidos_em_lote(ids, coluna, valor))
+        return resultado
+
+    def _notificar_valores(self, coluna, valores):
+        # Os ouvintes recebem um evento "atualizados" por valor distinto
+        por_valor = {}
+        for pid, valor in valores.items():
+            por_valor.setdefault(valor, []).append(str(pid))
+        for valor, ids in por_valor.items():
+            self._notificar("atualizados", ids, coluna, valor)
+
+    @abstractmethod
+    def carregar_configuracoes(self):
+        """Retorna as linhas da planilha de configurações como lista de dicionários."""
+
+    @abstractmethod
+    def salvar_configuracao(self, data_evento, prazo_data, prazo_hora, nome_amigavel, capacidades=""):
+        """Cria ou atualiza o prazo (e as capacidades por prato, em JSON) de uma data do evento."""
+
+    @abstractmethod
+    def carregar_eventos(self):
+        """Retorna o catálogo de eventos como lista de dicionários (chaves de COLUNAS_EVENTOS)."""
+
+    @abstractmethod
+    def salvar_evento(self, registro):
+        """Cria ou atualiza um evento do catálogo; `registro` segue a ordem de COLUNAS_EVENTOS."""
+
+
+def garantir_colunas(sheet, total):
+    """Aumenta a grade da planilha até `total` colunas, se preciso.
+
+    Abas criadas antes das colunas mais novas (ex: "Configuracoes" com 4
+    colunas, sem "capacidades") recusam escritas fora da grade com erro 400.
+    `col_count` vem das propriedades já carregadas: só há chamada à API
+    quando falta coluna.
+    """
+    if sheet.col_count < total:
+        sheet.add_cols(total - sheet.col_count)
+
+
+def letra_coluna(coluna):
+    """Retorna a letra da coluna na planilha de pedidos (ex: 'Status' -> 'L')."""
+    return chr(ord('A') + numero_coluna(coluna) - 1)
+
+
+# --- Índice de pedidos ---
+
+class EntradaIndice:
+    """Posição e situação de um pedido conhecidas pelo índice."""
+    __slots__ = ("linha", "status", "entregue")
+
+    def __init__(self, linha, status="", entregue=""):
+        self.linha = linha
+        self.status = status
+        self.entregue = entregue
+
+
+class IndicePedidos:
+    """Índice em memória, compartilhado pelo processo, de ID do pedido -> linha, status e entrega.
+
+    É montado uma vez a partir dos registros carregados e mantido em dia a
+    cada escrita, evitando o `sheet.find()` (que varre a planilha inteira)
+    a cada aprovação ou entrega.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entradas = {}
+        self.construido = False
+        self.proxima_linha = 2
+
+    def construir(self, registros, primeira_linha=2):
+        entradas = {}
+        for i, rec in enumerate(registros):
+            entradas[str(rec.get("ID", ""))] = EntradaIndice(
+                primeira_linha + i, str(rec.get("Status", "")), str(rec.get("Entregue", ""))
+            )
+        entradas.pop("", None)
+        with self._lock:
+            self._entradas = entradas
+            self.proxima_linha = primeira_linha + len(registros)
+            self.construido = True
+
+    def registrar(self, pedido_id, linha, status="", entregue=""):
+        entrada = EntradaIndice(linha, status, entregue)
+        with self._lock:
+            self._entradas[str(pedido_id)] = entrada
+            self.proxima_linha = max(self.proxima_linha, linha + 1)
+
+    def atualizar(self, pedido_id, coluna, valor):
+        with self._lock:
+            entrada = self._entradas.get(str(pedido_id))
+            if entrada is None:
+                return
+            if coluna == "Status":
+                entrada.status = str(valor)
+            elif coluna == "Entregue":
+                entrada.entregue = str(valor)
+
+    def get(self, pedido_id):
+        with self._lock:
+            return self._entradas.get(str(pedido_id))
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+# --- Google Sheets ---
+
+def _linha_inicial(resposta):
+    """Extrai a primeira linha gravada da resposta do append_rows (ex: 'Pedidos!A10:O12' -> 10)."""
+    try:
+        intervalo = resposta["updates"]["updatedRange"].split("!")[-1].split(":")[0]
+        return int("".join(ch for ch in intervalo if ch.isdigit()))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class PlanilhaSobDemanda:
+    """Worksheet aberto só no primeiro uso (conexão, busca e criação da aba ficam para depois).
+
+    `abrir` é chamada uma única vez, por quem usar a planilha primeiro ou por
+    um aquecimento em segundo plano; os demais acessos esperam por ela.
+    """
+
+    def __init__(self, titulo, abrir):
+        self.title = titulo
+        self._abrir = abrir
+        self._sheet = None
+        self._lock = threading.Lock()
+
+    def abrir(self):
+        if self._sheet is None:
+            with self._lock:
+                if self._sheet is None:
+                    self._sheet = self._abrir()
+        return self._sheet
+
+    @property
+    def aberta(self):
+        return self._sheet is not None
+
+    def __getattr__(self, nome):
+        return getattr(self.abrir(), nome)
+
+
+class SheetsStore(PedidosStore):
+    """Backend que lê e escreve diretamente nas planilhas do Google Sheets."""
+
+    def __init__(self, sheet_pedidos, sheet_config, sheet_itens=None, sheet_eventos=None):
+        super().__init__()
+        self.sheet = sheet_pedidos
+        self.config_sheet = sheet_config
+        self.itens_sheet = sheet_itens
+        self.eventos_sheet = sheet_eventos
+        self.indice = IndicePedidos()
+
+    def carregar_pedidos(self):
+        registros = self.sheet.get_all_records()
+        self.indice.construir(registros)
+        return registros
+
+    def carregar_alteracoes(self, n_conhecidos):
+        # Uma única chamada à API: as duas colunas de situação e as linhas novas. Os intervalos começam
+        # em linhas que já existem (o cabeçalho e a última linha conhecida, descartados abaixo): depois
+        # que o append_rows ajusta a grade ao tamanho exato dos dados, pedir a partir da linha seguinte
+        # daria erro 400 ("exceeds grid limits")
+        ultima = letra_coluna(COLUNAS_PEDIDOS[-1])
+        intervalos = [f"{letra_coluna(c)}1:{letra_coluna(c)}" for c in ("ID", "Status", "Entregue")]
+        try:
+            id_col, status_col, entregue_col, novas = self.sheet.batch_get(intervalos + [f"A{n_conhecidos + 1}:{ultima}"])
+        except Exception as e:
+            if "exceeds grid limits" not in str(e):
+                raise
+            # Linhas apagadas direto na planilha: a grade ficou menor que os pedidos conhecidos
+            id_col, status_col, entregue_col = self.sheet.batch_get(intervalos)
+            novas = []
+        # A API corta as células vazias do fim: só a coluna de IDs (sempre preenchida) dá o número de linhas
+        ids = [str(v[0]) if v else "" for v in id_col[1:]]
+        total = len(ids)
+        status = [v[0] if v else "" for v in status_col[1:]][:total]
+        entregue = [v[0] if v else "" for v in entregue_col[1:]][:total]
+        status += [""] * (total - len(status))
+        entregue += [""] * (total - len(entregue))
+        novos = [dict(zip(COLUNAS_PEDIDOS, list(linha) + [""] * (len(COLUNAS_PEDIDOS) - len(linha)))) for linha in novas[1:]]
+        if self.indice.construido:
+            self.indice.construir([{"ID": pid, "Status": s, "Entregue": e} for pid, s, e in zip(ids, status, entregue)])
+        return ids, status, entregue, novos
+
+    def carregar_itens(self):
+        if self.itens_sheet is None:
+            return []
+        return self.itens_sheet.get_all_records()
+
+    def adicionar_pedidos(self, linhas, itens=()):
+        # Pode ser a repetição de um lote que falhou no meio (FilaPedidos, EspelhoAssincrono): pedidos que
+        # o índice já conhece não são gravados de novo, e os itens só vão para os pedidos ainda sem itens
+        if not linhas:
+            return
+        if not self.indice.construido:
+            self.carregar_pedidos()
+        novas = [linha for linha in linhas if self.indice.get(linha[0]) is None]
+        if novas:
+            try:
+                resposta = self.sheet.append_rows(novas, value_input_option='USER_ENTERED')
+            except Exception:
+                # A escrita pode ter chegado à planilha mesmo com erro (ex: tempo esgotado): a próxima
+                # tentativa relê os pedidos antes de decidir o que falta
+                self.indice.construido = False
+                raise
+            inicio = _linha_inicial(resposta) or self.indice.proxima_linha
+            for i, linha in enumerate(novas):
+                self.indice.registrar(linha[0], inicio + i, linha[numero_coluna("Status") - 1], linha[numero_coluna("Entregue") - 1])
+        if itens and self.itens_sheet is not None:
+            pendentes = list(itens)
+            if len(novas) < len(linhas):
+                # Uma leitura só da coluna de IDs, e só na repetição (a partir do cabeçalho, que sempre existe)
+                com_itens = {str(v[0]) for v in self.itens_sheet.get("A1:A")[1:] if v}
+                pendentes = [item for item in pendentes if str(item["ID Pedido"]) not in com_itens]
+            if pendentes:
+                self.itens_sheet.append_rows([[item[c] for c in COLUNAS_ITENS] for item in pendentes], value_input_option='RAW')
+        self._notificar("adicionados", linhas, list(itens))
+
+    def localizar(self, pedido_id):
+        """Retorna a linha do pedido na planilha, consultando a planilha só se o índice não o conhecer."""
+        if not self.indice.construido:
+            self.carregar_pedidos()
+        entrada = self.indice.get(pedido_id)
+        if entrada is not None:
+            return entrada.linha
+        # Pedido gravado por fora do app (ex: editado direto na planilha)
+        cell = self.sheet.find(str(pedido_id), in_column=1)
+        if not cell:
+            return None
+        self.indice.registrar(pedido_id, cell.row)
+        return cell.row
+
+    def _conferir_linhas(self, pedido_ids):
+        """Retorna {id: linha ou None}, conferindo na planilha o ID gravado em cada linha antes da escrita.
+
+        Se alguém ordenou a planilha ou apagou uma linha no meio, a linha do
+        índice aponta para outro pedido: o índice é refeito e o pedido,
+        localizado de novo. Custa uma única chamada (batch_get) por escrita.
+        """
+        linhas = {str(pid): self.localizar(pid) for pid in pedido_ids}
+        conhecidas = [(pid, linha) for pid, linha in linhas.items() if linha is not None]
+        if not conhecidas:
+            return linhas
+        gravados = self.sheet.batch_get([f"A{linha}" for _, linha in conhecidas])
+        divergentes = [
+            pid for (pid, _), valor in zip(conhecidas, gravados)
+            if str(valor[0][0] if valor and valor[0] else "") != pid
+        ]
+        if divergentes:
+            logger.warning("Linhas da planilha mudaram de posição (%d pedidos); refazendo o índice", len(divergentes))
+            self.carregar_pedidos()
+            for pid in divergentes:
+                linhas[pid] = self.localizar(pid)
+        return linhas
+
+    def atualizar_pedido(self, pedido_id, coluna, valor):
+        linha = self._conferir_linhas([pedido_id])[str(pedido_id)]
+        if linha is None:
+            return False
+        self.sheet.update(range_name=f"{letra_coluna(coluna)}{linha}", values=[[valor]])
+        self.indice.atualizar(pedido_id, coluna, valor)
+        self._notificar("atualizados", [str(pedido_id)], coluna, valor)
+        return True
+
+    def atualizar_pedidos_em_lote(self, pedido_ids, coluna, valor):
+        resultado, dados = {}, []
+        for pid, linha in self._conferir_linhas(pedido_ids).items():
+            resultado[pid] = linha is not None
+            if linha is not None:
+                dados.append({"range": f"{letra_coluna(coluna)}{linha}", "values": [[valor]]})
+        if dados:
+            # Uma única escrita para todo o lote
+            self.sheet.batch_update(dados)
+            alterados = [pid for pid, ok in resultado.items() if ok]
+            for pid in alterados:
+                self.indice.atualizar(pid, coluna, valor)
+            self._notificar("atualizados", alterados, coluna, valor)
+        return resultado
+
+    def atualizar_valores_em_lote(self, coluna, valores):
+        resultado, dados = {}, []
+        linhas = self._conferir_linhas(valores)
+        for pid, valor in valores.items():
+            linha = linhas[str(pid)]
+            resultado[str(pid)] = linha is not None
+            if linha is not None:
+                dados.append({"range": f"{letra_coluna(coluna)}{linha}", "values": [[valor]]})
+        if dados:
+            # Uma única escrita, mesmo com um valor por pedido
+            self.sheet.batch_update(dados)
+            alterados = {pid: valor for pid, valor in valores.items() if resultado[str(pid)]}
+            for pid, valor in alterados.items():
+                self.indice.atualizar(pid, coluna, valor)
+            self._notificar_valores(coluna, alterados)
+        return resultado
+
+    def carregar_configuracoes(self):
+        return self.config_sheet.get_all_records()
+
+    def salvar_configuracao(self, data_evento, prazo_data, prazo_hora, nome_amigavel, capacidades=""):
+        garantir_colunas(self.config_sheet, len(COLUNAS_CONFIG))
+        cell = self.config_sheet.find(data_evento, in_column=1)
+        if cell:
+            self.config_sheet.update(
+                range_name=f"B{cell.row}:E{cell.row}", values=[[prazo_data, prazo_hora, nome_amigavel, capacidades]]
+            )
+        else:
+            self.config_sheet.append_row([data_evento, prazo_data, prazo_hora, nome_amigavel, capacidades])
+
+    def carregar_eventos(self):
+        if self.eventos_sheet is None:
+            return []
+        return self.eventos_sheet.get_all_records()
+
+    def salvar_evento(self, registro):
+        if self.eventos_sheet is None:
+            raise ValueError("Este backend não tem a planilha de eventos")
+        garantir_colunas(self.eventos_sheet, len(COLUNAS_EVENTOS))
+        cell = self.eventos_sheet.find(str(registro[0]), in_column=1)
+        if cell:
+            ultima = chr(ord('A') + len(COLUNAS_EVENTOS) - 1)
+            self.eventos_sheet.update(range_name=f"A{cell.row}:{ultima}{cell.row}", values=[list(registro)])
+        else:
+            self.eventos_sheet.append_row(list(registro), value_input_option='RAW')
+
+
+class EspelhoAssincrono:
+    """Replica as escritas para outro backend em uma thread de fundo.
+
+    Cada escrita vai antes para uma fila em disco (SQLite) e é replicada na
+    ordem em que aconteceu; o que ficou na fila quando o processo parou é
+    replicado na próxima inicialização. Falhas (ex: erro 429 de cota do
+    Sheets) são tentadas de novo sem limite, com espera crescente; a
+    interface do app nunca espera pela planilha-espelho.
+    """
+
+    def __init__(self, destino, caminho, espera_inicial=1.0, espera_maxima=60.0):
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self.destino = destino
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self.ultimo_erro = None
+        self._lock = threading.Lock()
+        self._novos = threading.Event()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS espelho (seq INTEGER PRIMARY KEY AUTOINCREMENT, metodo TEXT NOT NULL, argumentos TEXT NOT NULL)"
+            )
+        self._thread = threading.Thread(target=self._processar, name="espelho-sheets", daemon=True)
+        self._thread.start()
+
+    def __getattr__(self, nome):
+        # Qualquer método de escrita do destino vira uma operação enfileirada
+        getattr(self.destino, nome)
+        return lambda *args: self._enfileirar(nome, args)
+
+    def _enfileirar(self, metodo, args):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO espelho (metodo, argumentos) VALUES (?, ?)", (metodo, json.dumps(list(args))))
+        self._novos.set()
+
+    def pendentes(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM espelho").fetchone()[0]
+
+    def aguardar(self, timeout=30.0):
+        """Espera a fila do espelho esvaziar. Retorna False se o tempo acabar antes."""
+        limite = time.monotonic() + timeout
+        while self.pendentes():
+            if time.monotonic() > limite:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _processar(self):
+        espera = self.espera_inicial
+        while True:
+            with self._lock:
+                proxima = self._conn.execute("SELECT seq, metodo, argumentos FROM espelho ORDER BY seq LIMIT 1").fetchone()
+            if proxima is None:
+                self._novos.wait()
+                self._novos.clear()
+                continue
+            seq, metodo, argumentos = proxima
+            try:
+                getattr(self.destino, metodo)(*json.loads(argumentos))
+            except Exception as e:
+                # A operação fica na fila: as seguintes esperam por ela para manter a ordem
+                self.ultimo_erro = f"{type(e).__name__}: {e}"
+                logger.warning("Falha ao replicar %s; nova tentativa em %.1fs", metodo, espera, exc_info=True)
+                time.sleep(espera)
+                espera = min(espera * 2, self.espera_maxima) * random.uniform(0.8, 1.2)
+                continue
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM espelho WHERE seq = ?", (seq,))
+            self.ultimo_erro = None
+            espera = self.espera_inicial
+
+
+# --- SQLite ---
+
+def _q(nome):
+    """Coloca o nome da coluna entre aspas (os cabeçalhos têm espaços e barras)."""
+    return '"' + nome.replace('"', '""') + '"'
+
+
+class SQLiteStore(PedidosStore):
+    """Backend local em SQLite (modo WAL), com espelho opcional no Google Sheets."""
+
+    def __init__(self, caminho, espelho=None):
+        super().__init__()
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self.caminho = caminho
+        # A fila do espelho fica no mesmo arquivo, em uma tabela própria
+        self.espelho = EspelhoAssincrono(espelho, caminho) if espelho is not None else None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._criar_tabelas()
+
+    def _criar_tabelas(self):
+        colunas = ", ".join(f"{_q(c)} TEXT NOT NULL DEFAULT ''" for c in COLUNAS_PEDIDOS[1:])
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS pedidos ("
+                f"linha INTEGER PRIMARY KEY AUTOINCREMENT, {_q('ID')} TEXT NOT NULL UNIQUE, {colunas})"
+            )
+            colunas_pedidos = {r[1] for r in self._conn.execute("PRAGMA table_info(pedidos)")}
+            for coluna in COLUNAS_PEDIDOS:
+                if coluna not in colunas_pedidos:
+                    # Bancos criados antes de a coluna existir (ex: Notificacao)
+                    self._conn.execute(f"ALTER TABLE pedidos ADD COLUMN {_q(coluna)} TEXT NOT NULL DEFAULT ''")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS configuracoes ("
+                "data_evento TEXT PRIMARY KEY, prazo_data TEXT, prazo_hora TEXT, nome_amigavel TEXT, "
+                "capacidades TEXT NOT NULL DEFAULT '')"
+            )
+            colunas_config = {r[1] for r in self._conn.execute("PRAGMA table_info(configuracoes)")}
+            if "capacidades" not in colunas_config:
+                # Bancos criados antes da coluna de capacidades
+                self._conn.execute("ALTER TABLE configuracoes ADD COLUMN capacidades TEXT NOT NULL DEFAULT ''")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS itens_pedido ("
+                "pedido_id TEXT NOT NULL, data TEXT NOT NULL, item TEXT NOT NULL, "
+                "quantidade INTEGER NOT NULL, preco_unitario REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_itens_pedido ON itens_pedido (pedido_id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_itens_data ON itens_pedido (data, item)")
+            colunas_eventos = ", ".join(f"{c} TEXT NOT NULL DEFAULT ''" for c in COLUNAS_EVENTOS[1:])
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS eventos (evento TEXT PRIMARY KEY, {colunas_eventos})")
+
+    def vazio(self):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM pedidos LIMIT 1").fetchone() is None
+
+    def importar_de(self, origem):
+        """Copia pedidos, configurações e eventos de outro backend (usado na primeira carga a partir do Sheets)."""
+        pedidos = origem.carregar_pedidos()
+        linhas = [[str(p.get(c, "")) for c in COLUNAS_PEDIDOS] for p in pedidos if str(p.get("ID", ""))]
+        # Datas no formato local da planilha ('DD/MM/AAAA') entram no banco como o app grava
+        for linha in linhas:
+            linha[1] = data_hora_iso(linha[1])
+        itens = [dict(item, Data=data_iso(item.get("Data", ""))) for item in origem.carregar_itens()]
+        linhas, _ = self._inserir(linhas, itens)
+        for rec in origem.carregar_configuracoes():
+            self._salvar_configuracao_local(*(str(rec.get(c, "")) for c in COLUNAS_CONFIG))
+        for rec in origem.carregar_eventos():
+            if str(rec.get("evento", "")):
+                self._salvar_evento_local([str(rec.get(c, "")) for c in COLUNAS_EVENTOS])
+        logger.info("Importados %d pedidos para %s", len(linhas), self.caminho)
+
+    def _inserir(self, linhas, itens=()):
+        """Insere as linhas ignorando IDs já gravados, junto com os itens delas, em uma única transação.
+
+        Retorna (linhas, itens) que entraram de fato: se a gravação dos itens
+        falhar, nenhuma linha fica no banco e o lote pode ser reenviado.
+        """
+        marcadores = ", ".join("?" for _ in COLUNAS_PEDIDOS)
+        sql = f"INSERT OR IGNORE INTO pedidos ({', '.join(_q(c) for c in COLUNAS_PEDIDOS)}) VALUES ({marcadores})"
+        inseridas = []
+        with self._lock, self._conn:
+            for linha in linhas:
+                # Linhas gravadas antes das colunas mais novas (ex: ainda na fila) são completadas com vazio
+                valores = [str(v) for v in linha] + [""] * (len(COLUNAS_PEDIDOS) - len(linha))
+                if self._conn.execute(sql, valores).rowcount:
+                    inseridas.append(linha)
+            ids = {str(linha[0]) for linha in inseridas}
+            itens = [item for item in itens if str(item.get("ID Pedido", "")) in ids]
+            self._conn.executemany(
+                "INSERT INTO itens_pedido (pedido_id, data, item, quantidade, preco_unitario) VALUES (?, ?, ?, ?, ?)",
+                [(str(i["ID Pedido"]), str(i["Data"]), str(i["Item"]), int(i["Quantidade"]), float(i["Preco Unitario"])) for i in itens]
+            )
+        return inseridas, itens
+
+    def carregar_itens(self):
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT pedido_id, data, item, quantidade, preco_unitario FROM itens_pedido ORDER BY rowid"
+            )
+            return [dict(zip(COLUNAS_ITENS, r)) for r in cursor.fetchall()]
+
+    def carregar_pedidos(self):
+        with self._lock:
+            cursor = self._conn.execute(
+                f"SELECT {', '.join(_q(c) for c in COLUNAS_PEDIDOS)} FROM pedidos ORDER BY linha"
+            )
+            return [dict(r) for r in cursor.fetchall()]
+
+    def carregar_alteracoes(self, n_conhecidos):
+        with self._lock:
+            situacao = self._conn.execute(
+                f"SELECT {_q('ID')}, {_q('Status')}, {_q('Entregue')} FROM pedidos ORDER BY linha"
+            ).fetchall()
+            novos = self._conn.execute(
+                f"SELECT {', '.join(_q(c) for c in COLUNAS_PEDIDOS)} FROM pedidos ORDER BY linha LIMIT -1 OFFSET ?",
+                (n_conhecidos,)
+            ).fetchall()
+        return [r[0] for r in situacao], [r[1] for r in situacao], [r[2] for r in situacao], [dict(r) for r in novos]
+
+    def adicionar_pedidos(self, linhas, itens=()):
+        if not linhas:
+            return
+        # Reenvios da fila de gravação não duplicam pedidos (nem na planilha-espelho)
+        linhas, itens = self._inserir(linhas, itens)
+        if not linhas:
+            return
+        self._notificar("adicionados", linhas, itens)
+        if self.espelho:
+            self.espelho.adicionar_pedidos(linhas, itens)
+
+    def atualizar_pedido(self, pedido_id, coluna, valor):
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f"UPDATE pedidos SET {_q(coluna)} = ? WHERE {_q('ID')} = ?", (str(valor), str(pedido_id))
+            )
+        if cursor.rowcount == 0:
+            return False
+        self._notificar("atualizados", [str(pedido_id)], coluna, valor)
+        if self.espelho:
+            self.espelho.atualizar_pedido(pedido_id, coluna, valor)
+        return True
+
+    def atualizar_pedidos_em_lote(self, pedido_ids, coluna, valor):
+        sql = f"UPDATE pedidos SET {_q(coluna)} = ? WHERE {_q('ID')} = ?"
+        with self._lock, self._conn:
+            resultado = {str(pid): self._conn.execute(sql, (str(valor), str(pid))).rowcount > 0 for pid in pedido_ids}
+        alterados = [pid for pid, ok in resultado.items() if ok]
+        if alterados:
+            self._notificar("atualizados", alterados, coluna, valor)
+        if self.espelho and alterados:
+            self.espelho.atualizar_pedidos_em_lote(alterados, coluna, valor)
+        return resultado
+
+    def atualizar_valores_em_lote(self, coluna, valores):
+        sql = f"UPDATE pedidos SET {_q(coluna)} = ? WHERE {_q('ID')} = ?"
+        with self._lock, self._conn:
+            resultado = {str(pid): self._conn.execute(sql, (str(valor), str(pid))).rowcount > 0 for pid, valor in valores.items()}
+        alterados = {pid: valor for pid, valor in valores.items() if resultado[str(pid)]}
+        self._notificar_valores(coluna, alterados)
+        if self.espelho and alterados:
+            # Uma única operação no espelho (um batch_update na planilha)
+            self.espelho.atualizar_valores_em_lote(coluna, alterados)
+        return resultado
+
+    def carregar_configuracoes(self):
+        with self._lock:
+            cursor = self._conn.execute(f"SELECT {', '.join(COLUNAS_CONFIG)} FROM configuracoes")
+            return [dict(r) for r in cursor.fetchall()]
+
+    def _salvar_configuracao_local(self, data_evento, prazo_data, prazo_hora, nome_amigavel, capacidades=""):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO configuracoes (data_evento, prazo_data, prazo_hora, nome_amigavel, capacidades) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(data_evento) DO UPDATE SET prazo_data = excluded.prazo_data, "
+                "prazo_hora = excluded.prazo_hora, nome_amigavel = excluded.nome_amigavel, capacidades = excluded.capacidades",
+                (data_evento, prazo_data, prazo_hora, nome_amigavel, capacidades)
+            )
+
+    def salvar_configuracao(self, data_evento, prazo_data, prazo_hora, nome_amigavel, capacidades=""):
+        self._salvar_configuracao_local(data_evento, prazo_data, prazo_hora, nome_amigavel, capacidades)
+        if self.espelho:
+            self.espelho.salvar_configuracao(data_evento, prazo_data, prazo_hora, nome_amigavel, capacidades)
+
+    def carregar_eventos(self):
+        with self._lock:
+            cursor = self._conn.execute(f"SELECT {', '.join(COLUNAS_EVENTOS)} FROM eventos ORDER BY rowid")
+            return [dict(r) for r in cursor.fetchall()]
+
+    def _salvar_evento_local(self, registro):
+        atualizacao = ", ".join(f"{c} = excluded.{c}" for c in COLUNAS_EVENTOS[1:])
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO eventos ({', '.join(COLUNAS_EVENTOS)}) VALUES ({', '.join('?' for _ in COLUNAS_EVENTOS)}) "
+                f"ON CONFLICT(evento) DO UPDATE SET {atualizacao}",
+                [str(v) for v in registro]
+            )
+
+    def salvar_evento(self, registro):
+        self._salvar_evento_local(registro)
+        if self.espelho:
+            self.espelho.salvar_evento(list(registro))
+
+
+# --- Fila de gravação (write-behind) ---
+
+def _ler_registro(texto):
+    registro = json.loads(texto)
+    if isinstance(registro, list):
+        # Formato antigo da fila: só a linha do pedido
+        registro = {"linha": registro, "itens": []}
+    return registro
+
+
+class FilaPedidos:
+    """Fila durável, em disco, para os pedidos enviados pelos clientes.
+
+    `enfileirar` grava o pedido em um SQLite local e retorna na hora; uma
+    thread de fundo descarrega os pedidos no backend em lotes (uma única
+    chamada a `adicionar_pedidos` por lote), com novas tentativas e espera
+    exponencial quando o backend falha. Pedidos que ainda estavam na fila
+    quando o processo parou são enviados na próxima inicialização.
+    """
+
+    def __init__(self, store, caminho, tamanho_lote=100, intervalo=1.0, espera_maxima=60.0):
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self.store = store
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.espera_maxima = espera_maxima
+        self.ultimo_erro = None
+        self._lock = threading.Lock()
+        self._novos = threading.Event()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS fila (seq INTEGER PRIMARY KEY AUTOINCREMENT, linha TEXT NOT NULL)")
+        self._thread = threading.Thread(target=self._descarregar, name="fila-pedidos", daemon=True)
+        self._thread.start()
+
+    def enfileirar(self, linhas, itens=()):
+        """Registra os pedidos (e seus itens estruturados) na fila local e acorda a thread de gravação."""
+        por_pedido = {}
+        for item in itens:
+            por_pedido.setdefault(str(item["ID Pedido"]), []).append(item)
+        registros = [(json.dumps({"linha": l, "itens": por_pedido.get(str(l[0]), [])}),) for l in linhas]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO fila (linha) VALUES (?)", registros)
+        self._novos.set()
+
+    def pendentes(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM fila").fetchone()[0]
+
+    def registros(self):
+        """Pedidos ainda na fila, como [{"linha": [...], "itens": [...]}], do mais antigo ao mais novo."""
+        with self._lock:
+            return [_ler_registro(r) for (r,) in self._conn.execute("SELECT linha FROM fila ORDER BY seq")]
+
+    def aguardar(self, timeout=30.0):
+        """Espera a fila esvaziar. Retorna False se o tempo acabar antes."""
+        limite = time.monotonic() + timeout
+        while self.pendentes():
+            if time.monotonic() > limite:
+                return False
+            self._novos.set()
+            time.sleep(0.05)
+        return True
+
+    def _proximo_lote(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT seq, linha FROM fila ORDER BY seq LIMIT ?", (self.tamanho_lote,)
+            ).fetchall()
+
+    def _descarregar(self):
+        espera = self.intervalo
+        while True:
+            self._novos.wait(espera)
+            self._novos.clear()
+            lote = self._proximo_lote()
+            if not lote:
+                espera = self.intervalo
+                continue
+            linhas, itens = [], []
+            for _, registro in lote:
+                registro = _ler_registro(registro)
+                linhas.append(registro["linha"])
+                itens.extend(registro["itens"])
+            try:
+                self.store.adicionar_pedidos(linhas, itens)
+            except Exception as e:
+                self.ultimo_erro = f"{type(e).__name__}: {e}"
+                espera = min(max(espera, self.intervalo) * 2, self.espera_maxima) * random.uniform(0.8, 1.2)
+                logger.warning("Falha ao gravar lote de %d pedidos; nova tentativa em %.1fs", len(lote), espera)
+                continue
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM fila WHERE seq <= ?", (lote[-1][0],))
+            self.ultimo_erro = None
+            espera = self.intervalo
+            if len(lote) == self.tamanho_lote:
+                # Ainda há pedidos acumulados: segue sem esperar
+                self._novos.set()
+
+
+# --- Deduplicação de envios ---
+
+class DeduplicadorPedidos:
+    """Chaves de idempotência dos envios de pedido, em memória com cópia em SQLite.
+
+    `registrar` grava a chave junto com os IDs do pedido; um segundo envio
+    com a mesma chave dentro da janela (clique duplo, rerun repetido) recebe
+    os IDs da primeira vez e não grava nada. As chaves sobrevivem a um
+    reinício do processo.
+    """
+
+    def __init__(self, caminho, janela=600.0):
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self.janela = janela
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS envios (chave TEXT PRIMARY KEY, ids TEXT NOT NULL, criado_em REAL NOT NULL)")
+            self._conn.execute("DELETE FROM envios WHERE criado_em < ?", (time.time() - janela,))
+            self._chaves = {
+                chave: (json.loads(ids), criado_em)
+                for chave, ids, criado_em in self._conn.execute("SELECT chave, ids, criado_em FROM envios")
+            }
+
+    def registrar(self, chave, ids):
+        """Retorna None se a chave é nova (e a registra), ou os IDs do envio anterior dentro da janela."""
+        agora = time.time()
+        with self._lock:
+            anterior = self._chaves.get(chave)
+            if anterior is not None and agora - anterior[1] < self.janela:
+                return anterior[0]
+            self._chaves[chave] = (list(ids), agora)
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO envios (chave, ids, criado_em) VALUES (?, ?, ?)", (chave, json.dumps(list(ids)), agora)
+                )
+            if len(self._chaves) % 500 == 0:
+                self._expurgar(agora)
+        return None
+
+    def liberar(self, chave):
+        """Esquece a chave (o envio não chegou a ser registrado e pode ser tentado de novo)."""
+        with self._lock, self._conn:
+            self._chaves.pop(chave, None)
+            self._conn.execute("DELETE FROM envios WHERE chave = ?", (chave,))
+
+    def _expurgar(self, agora):
+        limite = agora - self.janela
+        for chave in [c for c, (_, criado_em) in self._chaves.items() if criado_em < limite]:
+            del self._chaves[chave]
+        with self._conn:
+            self._conn.execute("DELETE FROM envios WHERE criado_em < ?", (limite,))
+
+
+# --- Feed de alterações (painéis ao vivo) ---
+
+class AlteracaoPedidos:
+    """Uma gravação publicada no feed: pedidos novos ou uma coluna alterada."""
+    __slots__ = ("seq", "tipo", "ids", "coluna", "valor", "instante")
+
+    def __init__(self, seq, tipo, ids, coluna=None, valor=None):
+        self.seq = seq
+        self.tipo = tipo  # "adicionados" ou "atualizados"
+        self.ids = ids
+        self.coluna = coluna
+        self.valor = valor
+        self.instante = time.time()
+
+
+class FeedAlteracoes:
+    """Registro em memória das gravações de pedidos, com número de sequência.
+
+    Cada sessão do painel guarda o último `seq` que viu e pergunta pelo que
+    veio depois (`desde`), sem tocar no backend. O registro guarda as
+    `capacidade` alterações mais recentes; quem ficou para trás recebe None
+    e redesenha tudo.
+    """
+
+    def __init__(self, store, capacidade=1000):
+        self._lock = threading.Condition()
+        self._alteracoes = deque(maxlen=capacidade)
+        self.seq = 0
+        store.registrar_ouvinte(self._ao_gravar)
+
+    def _ao_gravar(self, evento, *args):
+        if evento == "adicionados":
+            linhas, _ = args
+            alteracao = dict(tipo=evento, ids=[str(linha[0]) for linha in linhas])
+        elif evento == "atualizados":
+            pedido_ids, coluna, valor = args
+            alteracao = dict(tipo=evento, ids=[str(pid) for pid in pedido_ids], coluna=coluna, valor=valor)
+        else:
+            return
+        with self._lock:
+            self.seq += 1
+            self._alteracoes.append(AlteracaoPedidos(self.seq, **alteracao))
+            self._lock.notify_all()
+
+    def desde(self, seq):
+        """Alterações publicadas depois de `seq`, em ordem; None se algumas já saíram do registro."""
+        with self._lock:
+            if seq >= self.seq:
+                return []
+            if not self._alteracoes or self._alteracoes[0].seq > seq + 1:
+                return None
+            return [a for a in self._alteracoes if a.seq > seq]
+
+    def aguardar(self, seq, timeout=None):
+        """Bloqueia até haver alteração depois de `seq` (ou o tempo acabar). Retorna o seq atual."""
+        with self._lock:
+            self._lock.wait_for(lambda: self.seq > seq, timeout)
+            return self.seq
+
+
+# --- Contadores de produção (cozinha) ---
+
+class ContadoresProducao:
+    """Quantidades a produzir por data e prato, separadas por status do pedido.
+
+    Os contadores são montados uma vez a partir do backend e, depois disso,
+    só mudam pelos eventos de gravação do app: pedido novo soma no status
+    do pedido, mudança de status move as quantidades de um status para outro.
+    """
+
+    def __init__(self, store):
+        self._lock = threading.Lock()
+        self._totais = {}
+        self._pedidos = {}
+        self.versao = 0
+        self._construir(store)
+        store.registrar_ouvinte(self._ao_gravar)
+
+    def _construir(self, store):
+        por_pedido = {}
+        for item in store.carregar_itens():
+            por_pedido.setdefault(str(item["ID Pedido"]), []).append(item)
+        for pedido in store.carregar_pedidos():
+            pid = str(pedido.get("ID", ""))
+            itens = por_pedido.get(pid) or itens_do_texto(pid, data_iso(pedido.get("Data/Hora", "")), pedido.get("Itens Pedido", ""))
+            self._registrar(pid, itens, str(pedido.get("Status", "")))
+
+    def _somar(self, itens, status, sinal):
+        for item in itens:
+            chave = (str(item["Data"]), str(item["Item"]), status)
+            self._totais[chave] = self._totais.get(chave, 0) + sinal * int(item["Quantidade"])
+
+    def _registrar(self, pedido_id, itens, status):
+        # Pedidos lidos do Sheets trazem a data no formato local (DD/MM/AAAA)
+        resumo = [{"Data": data_iso(i["Data"]), "Item": i["Item"], "Quantidade": i["Quantidade"]} for i in itens]
+        self._pedidos[pedido_id] = [resumo, status]
+        self._somar(resumo, status, 1)
+
+    def _ao_gravar(self, evento, *args):
+        with self._lock:
+            if evento == "adicionados":
+                linhas, itens = args
+                por_pedido = {}
+                for item in itens:
+                    por_pedido.setdefault(str(item["ID Pedido"]), []).append(item)
+                status_col = numero_coluna("Status") - 1
+                for linha in linhas:
+                    pid = str(linha[0])
+                    if pid in self._pedidos:
+                        continue
+                    itens_pedido = por_pedido.get(pid) or itens_do_texto(pid, data_iso(linha[1]), linha[numero_coluna("Itens Pedido") - 1])
+                    self._registrar(pid, itens_pedido, str(linha[status_col]))
+            elif evento == "atualizados":
+                pedido_ids, coluna, valor = args
+                if coluna != "Status":
+                    return
+                for pid in pedido_ids:
+                    pedido = self._pedidos.get(str(pid))
+                    if pedido is None or pedido[1] == valor:
+                        continue
+                    self._somar(pedido[0], pedido[1], -1)
+                    self._somar(pedido[0], valor, 1)
+                    pedido[1] = valor
+            else:
+                return
+            self.versao += 1
+
+    def quantidades(self, data, status):
+        """Retorna {prato: quantidade} de uma data para um status."""
+        with self._lock:
+            return {item: n for (d, item, st), n in self._totais.items() if d == data and st == status and n}
+
+    def conhece(self, pedido_id):
+        """True se o pedido já está nos contadores (ou seja, já foi gravado no backend)."""
+        with self._lock:
+            return str(pedido_id) in self._pedidos
+
+    def totais_por_prato(self):
+        """Retorna {(data, prato): quantidade} somando todos os status."""
+        totais = {}
+        with self._lock:
+            for (data, item, _), n in self._totais.items():
+                totais[(data, item)] = totais.get((data, item), 0) + n
+        return totais
+
+
+# --- Índice de busca (balcão de retirada) ---
+
+def dobrar_texto(texto):
+    """Minúsculas e sem acentos, para comparar nomes digitados de qualquer jeito."""
+    decomposto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(ch for ch in decomposto if not unicodedata.combining(ch)).lower()
+
+
+def _so_digitos(texto):
+    return "".join(ch for ch in str(texto) if ch.isdigit())
+
+
+class IndiceBusca:
+    """Índice em memória para a busca no balcão de retirada.
+
+    Mantém listas ordenadas de prefixos de nome (sem acento), sufixos de
+    telefone e prefixos de ID, consultadas com busca binária. É montado uma
+    vez a partir do backend e atualizado pelos eventos de gravação.
+    """
+
+    def __init__(self, store):
+        self._lock = threading.Lock()
+        self._nomes = []      # (token do nome, id)
+        self._telefones = []  # (telefone invertido, id)
+        self._ids = []        # (id ou código após o '-', id)
+        self._pedidos = {}
+        for pedido in store.carregar_pedidos():
+            self._adicionar(pedido)
+        for lista in (self._nomes, self._telefones, self._ids):
+            lista.sort()
+        store.registrar_ouvinte(self._ao_gravar)
+
+    def _adicionar(self, pedido, ordenado=False):
+        pid = str(pedido.get("ID", ""))
+        if not pid or pid in self._pedidos:
+            return
+        self._pedidos[pid] = {
+            "ID": pid,
+            "Nome Cliente": str(pedido.get("Nome Cliente", "")),
+            "Telefone Cliente": str(pedido.get("Telefone Cliente", "")),
+            # Pedidos lidos do Sheets trazem a data no formato local (DD/MM/AAAA)
+            "Data": data_iso(pedido.get("Data/Hora", "")),
+            "Itens Pedido": str(pedido.get("Itens Pedido", "")),
+            "Status": str(pedido.get("Status", "")),
+            "Entregue": str(pedido.get("Entregue", "")),
+        }
+        chaves = [(self._nomes, (token, pid)) for token in set(dobrar_texto(pedido.get("Nome Cliente", "")).split())]
+        telefone = _so_digitos(pedido.get("Telefone Cliente", ""))
+        if telefone:
+            chaves.append((self._telefones, (telefone[::-1], pid)))
+        chaves.append((self._ids, (pid.upper(), pid)))
+        if "-" in pid:
+            chaves.append((self._ids, (pid.split("-", 1)[1].upper(), pid)))
+        for lista, chave in chaves:
+            if ordenado:
+                bisect.insort(lista, chave)
+            else:
+                lista.append(chave)
+
+    @staticmethod
+    def _prefixo(lista, prefixo):
+        """IDs cujas chaves começam com o prefixo (busca binária na lista ordenada)."""
+        encontrados = set()
+        i = bisect.bisect_left(lista, (prefixo, ""))
+        while i < len(lista) and lista[i][0].startswith(prefixo):
+            encontrados.add(lista[i][1])
+            i += 1
+        return encontrados
+
+    def _ao_gravar(self, evento, *args):
+        with self._lock:
+            if evento == "adicionados":
+                linhas, _ = args
+                for linha in linhas:
+                    self._adicionar(dict(zip(COLUNAS_PEDIDOS, linha)), ordenado=True)
+            elif evento == "atualizados":
+                pedido_ids, coluna, valor = args
+                for pid in pedido_ids:
+                    pedido = self._pedidos.get(str(pid))
+                    if pedido is not None and coluna in pedido:
+                        pedido[coluna] = str(valor)
+
+    def buscar(self, consulta, data=None, filtro=None, limite=20, pagina=0):
+        """Busca por nome, telefone (final do número) ou ID.
+
+        Retorna (total de resultados, pedidos da página pedida).
+        """
+        consulta = consulta.strip().lstrip("#")
+        if not consulta:
+            return 0, []
+        with self._lock:
+            digitos = _so_digitos(consulta)
+            if digitos and len(digitos) == len(consulta.replace(" ", "").replace("-", "")):
+                # Só números: final do telefone ou início do ID
+                ids = self._prefixo(self._telefones, digitos[::-1]) | self._prefixo(self._ids, consulta.upper())
+            else:
+                ids = None
+                for token in dobrar_texto(consulta).split():
+                    achados = self._prefixo(self._nomes, token)
+                    ids = achados if ids is None else ids & achados
+                ids = (ids or set()) | self._prefixo(self._ids, consulta.upper())
+            pedidos = [self._pedidos[pid] for pid in ids]
+        if data is not None:
+            pedidos = [p for p in pedidos if p["Data"] == data]
+        if filtro is not None:
+            pedidos = [p for p in pedidos if filtro(p)]
+        pedidos.sort(key=lambda p: (dobrar_texto(p["Nome Cliente"]), p["ID"]))
+        inicio = pagina * limite
+        return len(pedidos), [dict(p) for p in pedidos[inicio:inicio + limite]]
+
+
+# --- Capacidade por data e prato ---
+
+class ReservaEstoque:
+    """Controle de capacidade por data e prato, com reserva atômica no envio do pedido.
+
+    O total já vendido é o dos contadores de produção (pedidos gravados no
+    backend) mais as reservas dos pedidos que ainda estão a caminho dele, na
+    fila de gravação. Essas reservas começam pelos pedidos que sobraram na
+    fila de uma execução anterior e deixam de contar assim que os contadores
+    recebem o pedido gravado, então um pedido nunca é contado duas vezes.
+    Tudo sob um único lock: duas sessões enviando ao mesmo tempo nunca passam
+    do limite.
+    """
+
+    def __init__(self, store, contadores, fila=None):
+        self._lock = threading.Lock()
+        self._contadores = contadores
+        self._em_voo = {}  # pedido_id -> {(data, prato): quantidade}, só dos pedidos ainda não gravados
+        if fila is not None:
+            for registro in fila.registros():
+                linha = registro["linha"]
+                pid = str(linha[0])
+                itens = registro["itens"] or itens_do_texto(pid, data_iso(linha[1]), linha[numero_coluna("Itens Pedido") - 1])
+                quantidades = {}
+                for item in itens:
+                    chave = (data_iso(item["Data"]), str(item["Item"]))
+                    quantidades[chave] = quantidades.get(chave, 0) + int(item["Quantidade"])
+                self._em_voo[pid] = quantidades
+        self._capacidades = {}
+        for rec in store.carregar_configuracoes():
+            self.definir_capacidades(str(rec.get("data_evento", "")), ler_capacidades(rec.get("capacidades", "")))
+
+    def definir_capacidades(self, data, capacidades):
+        """Substitui os limites de uma data (chamado ao salvar as configurações)."""
+        with self._lock:
+            for chave in [c for c in self._capacidades if c[0] == data]:
+                del self._capacidades[chave]
+            for prato, limite in capacidades.items():
+                if limite > 0:
+                    self._capacidades[(data, prato)] = limite
+
+    def capacidade(self, data, prato):
+        """Limite configurado, ou None quando o prato não tem limite naquela data."""
+        return self._capacidades.get((data, prato))
+
+    def _reservado(self):
+        # Chamado com o lock; os pedidos que já chegaram aos contadores deixam de contar como reserva
+        for pid in [pid for pid in self._em_voo if self._contadores.conhece(pid)]:
+            del self._em_voo[pid]
+        reservado = self._contadores.totais_por_prato()
+        for quantidades in self._em_voo.values():
+            for chave, qtd in quantidades.items():
+                reservado[chave] = reservado.get(chave, 0) + qtd
+        return reservado
+
+    def disponivel(self, data, prato):
+        """Quantas quentinhas ainda podem ser pedidas (None = sem limite)."""
+        with self._lock:
+            limite = self._capacidades.get((data, prato))
+            if limite is None:
+                return None
+            return max(limite - self._reservado().get((data, prato), 0), 0)
+
+    def reservar(self, pedidos, ids):
+        """Reserva tudo ou nada. `pedidos` é {data: {prato: quantidade}} e `ids` é {data: pedido_id}.
+
+        Retorna a lista de faltas [(data, prato, disponível)]; lista vazia
+        significa que a reserva foi feita.
+        """
+        with self._lock:
+            reservado = self._reservado()
+            faltas = []
+            for data, pratos in pedidos.items():
+                for prato, qtd in pratos.items():
+                    limite = self._capacidades.get((data, prato))
+                    if limite is not None and reservado.get((data, prato), 0) + qtd > limite:
+                        faltas.append((data, prato, max(limite - reservado.get((data, prato), 0), 0)))
+            if faltas:
+                return faltas
+            for data, pratos in pedidos.items():
+                self._em_voo[str(ids[data])] = {(data, prato): qtd for prato, qtd in pratos.items()}
+            return []
+
+    def liberar(self, pedido_ids):
+        """Desfaz as reservas dos pedidos (ex: quando o pedido não chegou a ser registrado)."""
+        with self._lock:
+            for pid in pedido_ids:
+                self._em_voo.pop(str(pid), None)
@@ -0,0 +1,527 @@
+"""Teste de carga dos caminhos de dados do app, contra uma planilha falsa.
+
+Simula N usuários simultâneos (clientes fazendo pedidos e administradores
+carregando, buscando, aprovando, entregando e gerando relatórios) sobre uma
+imitação em memória da API de worksheets do gspread, com latência e limite
+de cota configuráveis. Ao final mostra, por ação, as latências p50/p95/p99,
+as chamadas à API por ação e a vazão.
+
+Exemplos:
+    python benchmark_carga.py
+    python benchmark_carga.py --backend sheets --usuarios 50 --duracao 30
+    python benchmark_carga.py --modo legado --latencia 0.25 --cota 300
+"""
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from armazenamento import (
+    COLUNAS_CONFIG, COLUNAS_ITENS, COLUNAS_PEDIDOS, ContadoresProducao, FilaPedidos, IndiceBusca, ReservaEstoque,
+    SheetsStore, SQLiteStore, formatar_itens, numero_coluna
+)
+
+PRATOS = {
+    "Isca (carne, frango e calabresa)": 20.00,
+    "Frango assado e Toscana": 20.00,
+    "Assado de panela e Toscana": 20.00,
+}
+DATAS = ["2025-08-02", "2025-08-03"]
+NOMES = ["Maria", "José", "Antônio", "Ana", "Francisco", "Luíza", "João", "Conceição", "Raimundo", "Fátima"]
+SOBRENOMES = ["Silva", "Sousa", "Oliveira", "Araújo", "Carvalho", "Lima", "Pereira", "Rodrigues"]
+
+
+# --- Planilha falsa ---
+
+class ErroCota(Exception):
+    """Equivalente ao erro 429 (RESOURCE_EXHAUSTED) da API do Google Sheets."""
+
+
+class ErroAPI(Exception):
+    """Equivalente ao erro 400 (INVALID_ARGUMENT) da API, ex: intervalo fora da grade da planilha."""
+
+
+class Celula:
+    def __init__(self, row, col, value):
+        self.row = row
+        self.col = col
+        self.value = value
+
+
+def _referencia(ref):
+    """'L12' -> (12, 12); 'A' -> (1, None)."""
+    m = re.fullmatch(r"([A-Z]+)(\d*)", ref)
+    coluna = 0
+    for ch in m.group(1):
+        coluna = coluna * 26 + ord(ch) - ord("A") + 1
+    return coluna, int(m.group(2)) if m.group(2) else None
+
+
+class ContadorAPI:
+    """Conta as chamadas à API (total e por thread) e aplica a cota por minuto."""
+
+    def __init__(self, cota_por_minuto):
+        self.cota_por_minuto = cota_por_minuto
+        self._lock = threading.Lock()
+        self._janela = []
+        self._local = threading.local()
+        self.total = 0
+        self.por_metodo = defaultdict(int)
+
+    def registrar(self, metodo):
+        agora = time.monotonic()
+        with self._lock:
+            if self.cota_por_minuto:
+                self._janela = [t for t in self._janela if agora - t < 60]
+                if len(self._janela) >= self.cota_por_minuto:
+                    raise ErroCota(f"Quota exceeded ({self.cota_por_minuto} requests/min)")
+                self._janela.append(agora)
+            self.total += 1
+            self.por_metodo[metodo] += 1
+        self._local.chamadas = self.chamadas_da_thread() + 1
+
+    def chamadas_da_thread(self):
+        return getattr(self._local, "chamadas", 0)
+
+
+class PlanilhaFalsa:
+    """Imitação em memória de um gspread.Worksheet, com latência e cota configuráveis.
+
+    A grade tem o tamanho exato dos dados (como depois de um append_rows que
+    precisou crescer a planilha) e as colunas do cabeçalho: ler ou gravar
+    fora dela dá erro, como na API real.
+    """
+
+    def __init__(self, titulo, cabecalho, contador, latencia=0.1, variacao=0.05, latencia_por_mil_linhas=0.05):
+        self.title = titulo
+        self.contador = contador
+        self.latencia = latencia
+        self.variacao = variacao
+        self.latencia_por_mil_linhas = latencia_por_mil_linhas
+        self._lock = threading.Lock()
+        self._linhas = [list(cabecalho)]
+        self.col_count = len(cabecalho)
+
+    @property
+    def row_count(self):
+        return len(self._linhas)
+
+    def _conferir_grade(self, intervalo, linha, coluna):
+        if linha > self.row_count or coluna > self.col_count:
+            raise ErroAPI(
+                f"Range ({self.title}!{intervalo}) exceeds grid limits. Max rows: {self.row_count}, max columns: {self.col_count}"
+            )
+
+    def _chamada(self, metodo, linhas_lidas=0):
+        self.contador.registrar(metodo)
+        espera = self.latencia + random.uniform(0, self.variacao) + self.latencia_por_mil_linhas * linhas_lidas / 1000
+        if espera > 0:
+            time.sleep(espera)
+
+    def _celula(self, linha, coluna):
+        valores = self._linhas[linha - 1] if linha <= len(self._linhas) else []
+        return valores[coluna - 1] if coluna <= len(valores) else ""
+
+    def _definir(self, linha, coluna, valor):
+        while len(self._linhas) < linha:
+            self._linhas.append([])
+        valores = self._linhas[linha - 1]
+        valores.extend([""] * (coluna - len(valores)))
+        valores[coluna - 1] = str(valor)
+
+    def _intervalo(self, intervalo):
+        inicio, _, fim = intervalo.split("!")[-1].partition(":")
+        c1, l1 = _referencia(inicio)
+        c2, l2 = _referencia(fim or inicio)
+        return c1, l1 or 1, c2, l2 or len(self._linhas)
+
+    def _ler(self, intervalo):
+        c1, l1, c2, l2 = self._intervalo(intervalo)
+        self._conferir_grade(intervalo, l1, c2)
+        valores = [[self._celula(l, c) for c in range(c1, c2 + 1)] for l in range(l1, min(l2, len(self._linhas)) + 1)]
+        # Como a API real, remove células e linhas vazias do final
+        for linha in valores:
+            while linha and linha[-1] == "":
+                linha.pop()
+        while valores and not valores[-1]:
+            valores.pop()
+        return valores
+
+    # API do gspread usada pelo app
+
+    def get_all_records(self):
+        self._chamada("get_all_records", len(self._linhas))
+        with self._lock:
+            cabecalho = self._linhas[0]
+            return [dict(zip(cabecalho, l + [""] * (len(cabecalho) - len(l)))) for l in self._linhas[1:]]
+
+    def row_values(self, linha):
+        self._chamada("row_values")
+        with self._lock:
+            return list(self._linhas[linha - 1]) if linha <= len(self._linhas) else []
+
+    def append_rows(self, linhas, value_input_option=None, **kwargs):
+        self._chamada("append_rows")
+        with self._lock:
+            inicio = len(self._linhas) + 1
+            self._linhas.extend([str(v) for v in l] for l in linhas)
+            return {"updates": {"updatedRange": f"{self.title}!A{inicio}:O{len(self._linhas)}"}}
+
+    def append_row(self, linha, value_input_option=None, **kwargs):
+        return self.append_rows([linha], value_input_option)
+
+    def find(self, consulta, in_column=None, **kwargs):
+        self._chamada("find", len(self._linhas))
+        with self._lock:
+            for i, linha in enumerate(self._linhas, start=1):
+                for j, valor in enumerate(linha, start=1):
+                    if valor == str(consulta) and in_column in (None, j):
+                        return Celula(i, j, valor)
+        return None
+
+    def update_cell(self, linha, coluna, valor):
+        self._chamada("update_cell")
+        with self._lock:
+            self._conferir_grade(f"R{linha}C{coluna}", linha, coluna)
+            self._definir(linha, coluna, valor)
+
+    def update(self, range_name=None, values=None, **kwargs):
+        self._chamada("update")
+        with self._lock:
+            c1, l1, _, _ = self._intervalo(range_name)
+            self._conferir_grade(range_name, l1 + len(values) - 1, c1 + max(map(len, values), default=1) - 1)
+            for i, linha in enumerate(values):
+                for j, valor in enumerate(linha):
+                    self._definir(l1 + i, c1 + j, valor)
+
+    def batch_update(self, dados, **kwargs):
+        self._chamada("batch_update")
+        with self._lock:
+            for bloco in dados:
+                c1, l1, _, _ = self._intervalo(bloco["range"])
+                self._conferir_grade(bloco["range"], l1 + len(bloco["values"]) - 1, c1 + max(map(len, bloco["values"]), default=1) - 1)
+                for i, linha in enumerate(bloco["values"]):
+                    for j, valor in enumerate(linha):
+                        self._definir(l1 + i, c1 + j, valor)
+
+    def add_cols(self, quantidade):
+        self._chamada("add_cols")
+        with self._lock:
+            self.col_count += quantidade
+
+    def get(self, intervalo, **kwargs):
+        self._chamada("get")
+        with self._lock:
+            return self._ler(intervalo)
+
+    def batch_get(self, intervalos, **kwargs):
+        with self._lock:
+            lidas = sum(self._intervalo(i)[3] - self._intervalo(i)[1] + 1 for i in intervalos)
+        self._chamada("batch_get", lidas)
+        with self._lock:
+            return [self._ler(i) for i in intervalos]
+
+
+# --- Geração de dados ---
+
+def novo_pedido():
+    """Gera (linha, itens) no mesmo formato gravado pela página de pedidos."""
+    data = random.choice(DATAS)
+    pid = f"{data.replace('-', '')}-{uuid.uuid4().hex[:6].upper()}"
+    itens = [
+        {"ID Pedido": pid, "Data": data, "Item": prato, "Quantidade": random.randint(1, 3), "Preco Unitario": preco}
+        for prato, preco in random.sample(list(PRATOS.items()), random.randint(1, 2))
+    ]
+    total = sum(i["Quantidade"] * i["Preco Unitario"] for i in itens)
+    linha = [
+        pid, f"{data} {random.randint(7, 11):02d}:{random.randint(0, 59):02d}:00",
+        f"{random.choice(NOMES)} {random.choice(SOBRENOMES)}", "", f"869{random.randint(10**7, 10**8 - 1)}", "",
+        formatar_itens(itens), f"{total:.2f}", "", random.choice(["Pix", "Dinheiro"]), "",
+        random.choice(["Pendente", "Aprovado"]), "", f"{total:.2f}", "", ""
+    ]
+    return linha, itens
+
+
+# --- Cenário ---
+
+class Cenario:
+    """Monta o backend escolhido sobre planilhas falsas e executa as ações medidas."""
+
+    def __init__(self, args):
+        self.args = args
+        self.contador = ContadorAPI(args.cota)
+        planilha = dict(latencia=args.latencia, variacao=args.variacao, latencia_por_mil_linhas=args.latencia_por_mil_linhas)
+        self.sheet = PlanilhaFalsa("Pedidos", COLUNAS_PEDIDOS, self.contador, **planilha)
+        self.config_sheet = PlanilhaFalsa("Configuracoes", COLUNAS_CONFIG, self.contador, **planilha)
+        self.itens_sheet = PlanilhaFalsa("Itens", COLUNAS_ITENS, self.contador, **planilha)
+
+        # Dados iniciais gravados direto, sem latência nem contagem
+        iniciais = [novo_pedido() for _ in range(args.pedidos_iniciais)]
+        self.sheet._linhas.extend(l for l, _ in iniciais)
+        self.itens_sheet._linhas.extend([i[c] for c in COLUNAS_ITENS] for _, itens in iniciais for i in itens)
+        self.ids = [l[0] for l, _ in iniciais]
+        self.nomes = [l[2] for l, _ in iniciais]
+        self._lock_ids = threading.Lock()
+
+        self.sheets_store = SheetsStore(self.sheet, self.config_sheet, self.itens_sheet)
+        self._pasta = tempfile.TemporaryDirectory(prefix="benchmark_quentinhas_")
+        self.pasta = self._pasta.name
+        if args.modo == "legado":
+            self.store = None
+        elif args.backend == "sqlite":
+            self.store = SQLiteStore(os.path.join(self.pasta, "pedidos.db"), espelho=self.sheets_store)
+            self.store.importar_de(self.sheets_store)
+        else:
+            self.store = self.sheets_store
+
+        self.fila = self.cache = self.indice = self.reserva = None
+        if self.store is not None:
+            self.fila = FilaPedidos(self.store, os.path.join(self.pasta, "fila.db"), intervalo=0.2)
+            self.indice = IndiceBusca(self.store)
+            self.reserva = ReservaEstoque(self.store, ContadoresProducao(self.store), self.fila)
+            if not args.sem_pandas:
+                from cache_pedidos import CachePedidos
+                self.cache = CachePedidos(self.store, ttl=args.ttl)
+                self.cache.frame()
+
+    def escoar(self, timeout=60.0):
+        """Espera as gravações em segundo plano (fila de pedidos e espelho do SQLite). Retorna False se o tempo acabar."""
+        limite = time.monotonic() + timeout
+        escoou = True
+        if self.fila is not None:
+            escoou = self.fila.aguardar(timeout=timeout)
+        espelho = getattr(self.store, "espelho", None)
+        if espelho is not None:
+            # A fila grava no SQLite, e o SQLite só então enfileira no espelho: espera nessa ordem
+            escoou = espelho.aguardar(timeout=max(limite - time.monotonic(), 0)) and escoou
+        return escoou
+
+    def fechar(self):
+        self._pasta.cleanup()
+
+    def _algum_id(self):
+        with self._lock_ids:
+            return random.choice(self.ids)
+
+    # Ações no modo atual (com store, fila, índices e cache)
+
+    def pedido(self):
+        linha, itens = novo_pedido()
+        pedidos = defaultdict(lambda: defaultdict(int))
+        for item in itens:
+            pedidos[item["Data"]][item["Item"]] += item["Quantidade"]
+        if self.reserva.reservar(pedidos, {data: linha[0] for data in pedidos}):
+            return
+        self.fila.enfileirar([linha], itens)
+        with self._lock_ids:
+            self.ids.append(linha[0])
+
+    def carregar(self):
+        if self.cache is not None:
+            self.cache.frame()
+        else:
+            self.store.carregar_pedidos()
+
+    def buscar(self):
+        self.indice.buscar(random.choice(self.nomes).split()[0][:4])
+
+    def aprovar(self):
+        self.store.atualizar_pedido(self._algum_id(), "Status", "Aprovado")
+
+    def aprovar_lote(self):
+        with self._lock_ids:
+            ids = random.sample(self.ids, min(20, len(self.ids)))
+        self.store.atualizar_pedidos_em_lote(ids, "Status", "Aprovado")
+
+    def entregar(self):
+        self.store.atualizar_pedido(self._algum_id(), "Entregue", "Sim")
+
+    def relatorio(self):
+        if self.cache is None:
+            return
+        from relatorios import fechamento_por_dia, itens_dos_pedidos, resumo_itens
+        df = self.cache.frame()
+        aprovados = df[df['Status'] == 'Aprovado'].assign(
+            Data=lambda d: d['Data/Hora'].dt.date,
+            **{'Total Pedido': lambda d: d['Total Pedido'].astype(float)}
+        )
+        resumo_itens(itens_dos_pedidos(aprovados, self.cache.itens()))
+        fechamento_por_dia(aprovados)
+
+    # Ações no modo legado (mesmas chamadas do app original)
+
+    def pedido_legado(self):
+        linha, _ = novo_pedido()
+        self.sheet.append_row(linha, value_input_option='USER_ENTERED')
+        with self._lock_ids:
+            self.ids.append(linha[0])
+
+    def carregar_legado(self):
+        self.sheet.get_all_records()
+
+    def buscar_legado(self):
+        # No app original, cada tecla digitada recarrega a planilha inteira
+        self.sheet.get_all_records()
+
+    def aprovar_legado(self):
+        cell = self.sheet.find(self._algum_id())
+        if cell:
+            self.sheet.update_cell(cell.row, numero_coluna("Status"), "Aprovado")
+        self.sheet.get_all_records()
+
+    def entregar_legado(self):
+        cell = self.sheet.find(self._algum_id())
+        if cell:
+            self.sheet.update_cell(cell.row, numero_coluna("Entregue"), "Sim")
+        self.sheet.get_all_records()
+
+    def relatorio_legado(self):
+        self.sheet.get_all_records()
+
+    def acoes(self):
+        """Ações sorteadas pelos usuários simulados, com seus pesos."""
+        sufixo = "_legado" if self.args.modo == "legado" else ""
+        cliente = [("pedido", 1.0)]
+        admin = [("carregar", 3.0), ("buscar", 3.0), ("aprovar", 2.0), ("entregar", 1.0), ("relatorio", 1.0)]
+        if not sufixo:
+            admin.append(("aprovar_lote", 0.2))
+        return {
+            "cliente": [(nome, getattr(self, nome + sufixo), peso) for nome, peso in cliente],
+            "admin": [(nome, getattr(self, nome + sufixo), peso) for nome, peso in admin],
+        }
+
+
+# --- Execução e relatório ---
+
+def percentil(valores, p):
+    if not valores:
+        return float("nan")
+    ordenados = sorted(valores)
+    return ordenados[min(int(round(p / 100 * (len(ordenados) - 1))), len(ordenados) - 1)]
+
+
+def executar(args):
+    random.seed(args.semente)
+    cenario = Cenario(args)
+    try:
+        return _executar(args, cenario)
+    finally:
+        cenario.fechar()
+
+
+def _executar(args, cenario):
+    acoes = cenario.acoes()
+    medicoes = defaultdict(lambda: {"latencias": [], "erros": 0, "chamadas": 0})
+    lock = threading.Lock()
+    chamadas_antes = cenario.contador.total
+    fim = time.monotonic() + args.duracao
+
+    def usuario(indice):
+        tipo = "admin" if indice < args.admins else "cliente"
+        nomes, funcoes, pesos = zip(*acoes[tipo])
+        while time.monotonic() < fim:
+            i = random.choices(range(len(nomes)), weights=pesos)[0]
+            chamadas = cenario.contador.chamadas_da_thread()
+            inicio = time.perf_counter()
+            try:
+                funcoes[i]()
+                erro = False
+            except (ErroCota, ErroAPI):
+                erro = True
+            duracao = time.perf_counter() - inicio
+            with lock:
+                m = medicoes[nomes[i]]
+                m["latencias"].append(duracao)
+                m["erros"] += erro
+                m["chamadas"] += cenario.contador.chamadas_da_thread() - chamadas
+            time.sleep(random.uniform(0, args.pausa))
+
+    inicio = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.usuarios) as executor:
+        list(executor.map(usuario, range(args.usuarios)))
+    decorrido = time.monotonic() - inicio
+    # Os pedidos só estão gravados quando saem da fila e, com o SQLite, também do espelho no Sheets
+    escoou = cenario.escoar(timeout=60)
+    escoamento = time.monotonic() - inicio - decorrido
+
+    chamadas_primeiro_plano = sum(m["chamadas"] for m in medicoes.values())
+    resultado = {
+        "configuracao": vars(args),
+        "duracao_s": round(decorrido, 2),
+        "escoamento_s": round(escoamento, 2),
+        "escoou": escoou,
+        "vazao_acoes_s": round(sum(len(m["latencias"]) for m in medicoes.values()) / decorrido, 2),
+        "chamadas_api_total": cenario.contador.total - chamadas_antes,
+        "chamadas_api_segundo_plano": cenario.contador.total - chamadas_antes - chamadas_primeiro_plano,
+        "chamadas_api_por_metodo": dict(cenario.contador.por_metodo),
+        "acoes": {},
+    }
+    for nome, m in sorted(medicoes.items()):
+        lat = m["latencias"]
+        resultado["acoes"][nome] = {
+            "n": len(lat),
+            "erros": m["erros"],
+            "p50_ms": round(percentil(lat, 50) * 1000, 1),
+            "p95_ms": round(percentil(lat, 95) * 1000, 1),
+            "p99_ms": round(percentil(lat, 99) * 1000, 1),
+            "media_ms": round(statistics.fmean(lat) * 1000, 1) if lat else float("nan"),
+            "chamadas_api_por_acao": round(m["chamadas"] / len(lat), 2) if lat else 0,
+            "vazao_s": round(len(lat) / decorrido, 2),
+        }
+    return resultado
+
+
+def imprimir(resultado):
+    cfg = resultado["configuracao"]
+    print(f"Modo: {cfg['modo']} | backend: {cfg['backend']} | usuários: {cfg['usuarios']} ({cfg['admins']} admins) | "
+          f"pedidos iniciais: {cfg['pedidos_iniciais']} | latência: {cfg['latencia'] * 1000:.0f} ms | "
+          f"cota: {cfg['cota'] or 'sem limite'}/min")
+    print(f"{'ação':<14}{'n':>7}{'erros':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'API/ação':>10}{'ações/s':>10}")
+    for nome, a in resultado["acoes"].items():
+        print(f"{nome:<14}{a['n']:>7}{a['erros']:>7}{a['p50_ms']:>10}{a['p95_ms']:>10}{a['p99_ms']:>10}"
+              f"{a['chamadas_api_por_acao']:>10}{a['vazao_s']:>10}")
+    print(f"Vazão total: {resultado['vazao_acoes_s']} ações/s em {resultado['duracao_s']} s")
+    print(f"Gravações em segundo plano (fila e espelho) concluídas {resultado['escoamento_s']} s depois do fim da carga"
+          + ("" if resultado["escoou"] else " (tempo esgotado: ainda havia gravações pendentes)"))
+    print(f"Chamadas à API: {resultado['chamadas_api_total']} "
+          f"({resultado['chamadas_api_segundo_plano']} em segundo plano: fila e espelho)")
+    print("Por método: " + ", ".join(f"{k}={v}" for k, v in sorted(resultado["chamadas_api_por_metodo"].items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga dos caminhos de dados do app de quentinhas.")
+    parser.add_argument("--modo", choices=["atual", "legado"], default="atual",
+                        help="'legado' repete as chamadas do app original (get_all_records a cada rerun, find + update_cell)")
+    parser.add_argument("--backend", choices=["sqlite", "sheets"], default="sqlite")
+    parser.add_argument("--usuarios", type=int, default=20, help="usuários simultâneos")
+    parser.add_argument("--admins", type=int, default=4, help="quantos dos usuários são administradores")
+    parser.add_argument("--duracao", type=float, default=10.0, help="segundos de teste")
+    parser.add_argument("--pausa", type=float, default=0.2, help="pausa máxima entre ações de um usuário (s)")
+    parser.add_argument("--pedidos-iniciais", type=int, default=2000)
+    parser.add_argument("--latencia", type=float, default=0.1, help="latência base de cada chamada à API (s)")
+    parser.add_argument("--variacao", type=float, default=0.05, help="variação aleatória somada à latência (s)")
+    parser.add_argument("--latencia-por-mil-linhas", type=float, default=0.05, help="custo extra de leituras grandes (s)")
+    parser.add_argument("--cota", type=int, default=0, help="limite de chamadas por minuto (0 = sem limite; o Sheets usa 300)")
+    parser.add_argument("--ttl", type=float, default=30.0, help="tempo de vida do frame compartilhado do painel (s)")
+    parser.add_argument("--sem-pandas", action="store_true", help="não usa o frame do painel nem os relatórios")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--json", help="grava o resultado neste arquivo JSON")
+    args = parser.parse_args()
+
+    resultado = executar(args)
+    imprimir(resultado)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
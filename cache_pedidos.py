@@ -0,0 +1,110 @@
+"""DataFrame de pedidos compartilhado pelas sessões do painel.
+
+O frame é carregado por inteiro uma única vez e depois mantido por
+sincronização incremental: a cada `ttl` segundos (ou quando o próprio app
+grava um pedido novo) só são lidas as colunas Status/Entregue e as linhas
+depois da última conhecida. As alterações de status feitas pelo app são
+aplicadas direto no frame, sem nenhuma leitura.
+
+Os itens estruturados dos pedidos ficam em um segundo frame, carregado uma
+vez e estendido com os itens de cada pedido gravado pelo app.
+"""
+import threading
+import time
+
+import pandas as pd
+
+from armazenamento import COLUNAS_ITENS
+from prazos import data_hora_iso
+
+
+def montar_df(registros):
+    """Converte registros (lista de dicionários) no DataFrame usado pelo painel."""
+    if not registros:
+        return pd.DataFrame()
+    df = pd.DataFrame(registros)
+    # A planilha devolve 'DD/MM/AAAA' nas linhas formatadas por ela: o mesmo parser dos contadores e do índice de busca
+    df['Data/Hora'] = pd.to_datetime(df['Data/Hora'].map(data_hora_iso), format='ISO8601', errors='coerce')
+    return df
+
+
+def montar_df_itens(itens):
+    """Converte itens estruturados no frame normalizado (um item por linha, colunas tipadas)."""
+    df = pd.DataFrame(list(itens), columns=COLUNAS_ITENS)
+    return df.astype({
+        "ID Pedido": str, "Data": str, "Item": str,
+        "Quantidade": "int64", "Preco Unitario": "float64",
+    })
+
+
+class CachePedidos:
+    """Frame de pedidos com tempo de vida, atualizado de forma incremental."""
+
+    def __init__(self, store, ttl=30):
+        self.store = store
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._df = None
+        self._itens = None
+        self._sincronizado_em = 0.0
+        self._sujo = False
+        store.registrar_ouvinte(self._ao_gravar)
+
+    def frame(self, sincronizar=False):
+        """Retorna o frame atual. Não altere o objeto retornado: ele é compartilhado."""
+        with self._lock:
+            if self._df is None:
+                self.recarregar()
+            elif sincronizar or self._sujo or time.monotonic() - self._sincronizado_em > self.ttl:
+                self._sincronizar()
+            return self._df
+
+    def itens(self):
+        """Retorna o frame de itens estruturados (também compartilhado, não altere)."""
+        with self._lock:
+            if self._itens is None:
+                self._itens = montar_df_itens(self.store.carregar_itens())
+            return self._itens
+
+    def recarregar(self):
+        """Leitura completa (primeira carga, ou quando linhas somem da planilha)."""
+        with self._lock:
+            self._df = montar_df(self.store.carregar_pedidos())
+            self._itens = None
+            self._sincronizado_em = time.monotonic()
+            self._sujo = False
+
+    def _sincronizar(self):
+        n = len(self._df)
+        ids, status, entregue, novos = self.store.carregar_alteracoes(n)
+        if ids[:n] != (self._df['ID'].astype(str).tolist() if n else []):
+            # Linhas apagadas ou reordenadas direto na planilha: as posições mudaram
+            self.recarregar()
+            return
+        df = self._df.copy()
+        if n:
+            df['Status'] = status[:n]
+            df['Entregue'] = entregue[:n]
+        if novos:
+            df = pd.concat([df, montar_df(novos)], ignore_index=True)
+        self._df = df
+        self._sincronizado_em = time.monotonic()
+        self._sujo = False
+
+    def _ao_gravar(self, evento, *args):
+        if evento == "adicionados":
+            # A releitura incremental busca só as linhas novas; os itens chegam prontos no evento
+            _, itens = args
+            with self._lock:
+                self._sujo = True
+                if self._itens is not None and itens:
+                    self._itens = pd.concat([self._itens, montar_df_itens(itens)], ignore_index=True)
+        elif evento == "atualizados":
+            pedido_ids, coluna, valor = args
+            with self._lock:
+                if self._df is None or self._df.empty:
+                    return
+                # Copia antes de alterar: sessões podem estar lendo o frame anterior
+                df = self._df.copy()
+                df.loc[df['ID'].astype(str).isin([str(i) for i in pedido_ids]), coluna] = valor
+                self._df = df
@@ -0,0 +1,186 @@
+"""Comandas e etiquetas em lote para a cozinha e o balcão de retirada.
+
+`gerar_comandas` produz, sob demanda, uma comanda por pedido e prato,
+agrupadas por prato e ordenadas pelo nome do cliente. Os escritores
+consomem esse gerador uma comanda por vez e gravam em um arquivo binário
+qualquer; `gerar_arquivo` devolve o resultado inteiro em bytes, que é o
+que o download do painel envia. Cada comanda leva um QR code com o ID do
+pedido, lido no balcão de retirada.
+
+Formatos: PDF A4 com 10 etiquetas por página (requer `reportlab`) e
+ESC/POS para impressora térmica, que usa o QR code nativo da impressora.
+"""
+import io
+import textwrap
+from itertools import groupby
+
+from armazenamento import dobrar_texto
+
+class Comanda:
+    """Um prato de um pedido aprovado."""
+    __slots__ = ("pedido_id", "nome", "telefone", "data", "prato", "quantidade", "observacoes")
+
+    def __init__(self, pedido_id, nome, telefone, data, prato, quantidade, observacoes):
+        self.pedido_id = pedido_id
+        self.nome = nome
+        self.telefone = telefone
+        self.data = data
+        self.prato = prato
+        self.quantidade = quantidade
+        self.observacoes = observacoes
+
+
+def gerar_comandas(df_pedidos, itens):
+    """Gera as comandas dos pedidos (frame do painel) a partir dos itens estruturados, por prato e nome."""
+    clientes = df_pedidos[['ID', 'Nome Cliente', 'Telefone Cliente', 'Observacoes']].astype(str)
+    tabela = itens[['ID Pedido', 'Data', 'Item', 'Quantidade']].merge(clientes, left_on='ID Pedido', right_on='ID')
+    tabela = tabela.assign(_ordem=tabela['Nome Cliente'].map(dobrar_texto)).sort_values(['Item', '_ordem', 'ID Pedido'])
+    colunas = ['ID Pedido', 'Nome Cliente', 'Telefone Cliente', 'Data', 'Item', 'Quantidade', 'Observacoes']
+    for linha in tabela[colunas].itertuples(index=False, name=None):
+        yield Comanda(*linha)
+
+
+def gerar_arquivo(escritor, comandas, evento, **opcoes):
+    """Grava as comandas com `escritor` e devolve o arquivo em bytes."""
+    saida = io.BytesIO()
+    escritor(comandas, saida, evento, **opcoes)
+    return saida.getvalue()
+
+
+# --- Impressora térmica (ESC/POS) ---
+
+ESC, GS = b"\x1b", b"\x1d"
+CODIFICACAO_ESCPOS = "cp860"  # página de código 3 (português) das impressoras ESC/POS
+
+
+def _qr_escpos(texto, modulo=6):
+    """Comandos GS ( k: QR modelo 2, correção M, gravado na memória da impressora e impresso."""
+    dados = texto.encode("ascii", "replace")
+    tamanho = len(dados) + 3
+    return (
+        GS + b"(k\x04\x00\x31\x41\x32\x00"
+        + GS + b"(k\x03\x00\x31\x43" + bytes([modulo])
+        + GS + b"(k\x03\x00\x31\x45\x31"
+        + GS + b"(k" + bytes([tamanho % 256, tamanho // 256]) + b"\x31\x50\x30" + dados
+        + GS + b"(k\x03\x00\x31\x51\x30"
+    )
+
+
+def escrever_escpos(comandas, saida, evento, largura=48):
+    """Uma comanda por corte de papel; cada prato começa com um cabeçalho. `largura` em caracteres (48 = 80 mm)."""
+    def linha(texto=""):
+        saida.write(texto.encode(CODIFICACAO_ESCPOS, "replace") + b"\n")
+
+    saida.write(ESC + b"@" + ESC + b"t\x03")
+    for prato, grupo in groupby(comandas, key=lambda c: c.prato):
+        saida.write(ESC + b"a\x01" + GS + b"!\x11")
+        linha(prato[:largura // 2])
+        saida.write(GS + b"!\x00" + ESC + b"a\x00")
+        linha("=" * largura)
+        for comanda in grupo:
+            saida.write(ESC + b"a\x01")
+            linha(evento[:largura])
+            saida.write(ESC + b"E\x01" + GS + b"!\x11")
+            linha(f"{comanda.quantidade}x {comanda.prato}"[:largura // 2])
+            saida.write(GS + b"!\x00" + ESC + b"E\x00" + ESC + b"a\x00")
+            linha("-" * largura)
+            for parte in textwrap.wrap(comanda.nome, largura) or [""]:
+                linha(parte)
+            linha(f"Pedido #{comanda.pedido_id}  {comanda.data[8:10]}/{comanda.data[5:7]}")
+            if comanda.observacoes.strip():
+                for parte in textwrap.wrap(f"Obs: {comanda.observacoes}", largura):
+                    linha(parte)
+            saida.write(ESC + b"a\x01" + _qr_escpos(comanda.pedido_id) + ESC + b"a\x00")
+            # Avança o papel e faz o corte parcial
+            saida.write(ESC + b"d\x03" + GS + b"V\x42\x00")
+
+
+# --- PDF (etiquetas A4) ---
+
+def _desenhar_qr(pdf, texto, x, y, lado):
+    """QR code como um único caminho preenchido (o QrCodeWidget cria um objeto por módulo e é lento em lote)."""
+    from reportlab.graphics.barcode.qrencoder import QRCode, QRErrorCorrectLevel
+    qr = QRCode(None, QRErrorCorrectLevel.M)
+    qr.addData(texto)
+    # Máscara fixa: qualquer uma é válida para o leitor, e escolher a melhor custa ~10x mais por etiqueta
+    qr.version = qr.calculate_version()
+    qr.makeImpl(False, 0)
+    n = qr.getModuleCount()
+    pdf.saveState()
+    # Coordenadas em módulos (inteiros), com borda de um módulo: o PDF fica menor e mais rápido de gerar
+    pdf.translate(x, y)
+    pdf.scale(lado / (n + 2), lado / (n + 2))
+    caminho = pdf.beginPath()
+    for linha in range(n):
+        coluna = 0
+        while coluna < n:
+            if not qr.isDark(linha, coluna):
+                coluna += 1
+                continue
+            inicio = coluna
+            while coluna < n and qr.isDark(linha, coluna):
+                coluna += 1
+            # Módulos escuros seguidos viram um só retângulo
+            caminho.rect(inicio + 1, n - linha, coluna - inicio, 1)
+    pdf.drawPath(caminho, stroke=0, fill=1)
+    pdf.restoreState()
+
+
+def escrever_pdf(comandas, saida, evento, colunas=2, linhas=5):
+    """Etiquetas A4 (colunas x linhas por página); cada prato começa em uma página nova."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.pdfgen import canvas
+
+    largura_pagina, altura_pagina = A4
+    margem, cabecalho = 8 * mm, 12 * mm
+    largura = (largura_pagina - 2 * margem) / colunas
+    altura = (altura_pagina - 2 * margem - cabecalho) / linhas
+    lado_qr = min(altura - 8 * mm, 32 * mm)
+    pdf = canvas.Canvas(saida, pagesize=A4, pageCompression=1)
+    pdf.setTitle(f"Comandas - {evento}")
+
+    def iniciar_pagina(prato, pagina):
+        pdf.setFont("Helvetica-Bold", 12)
+        pdf.drawString(margem, altura_pagina - margem - 6 * mm, f"{evento} - {prato}")
+        pdf.setFont("Helvetica", 9)
+        pdf.drawRightString(largura_pagina - margem, altura_pagina - margem - 6 * mm, f"página {pagina}")
+
+    primeira = True
+    for prato, grupo in groupby(comandas, key=lambda c: c.prato):
+        posicao, pagina = 0, 1
+        if not primeira:
+            pdf.showPage()
+        primeira = False
+        iniciar_pagina(prato, pagina)
+        for comanda in grupo:
+            if posicao == colunas * linhas:
+                pdf.showPage()
+                posicao, pagina = 0, pagina + 1
+                iniciar_pagina(prato, pagina)
+            x = margem + (posicao % colunas) * largura
+            y = altura_pagina - margem - cabecalho - (posicao // colunas + 1) * altura
+            posicao += 1
+
+            pdf.setDash(2, 2)
+            pdf.rect(x, y, largura, altura)
+            pdf.setDash()
+            _desenhar_qr(pdf, comanda.pedido_id, x + largura - lado_qr - 3 * mm, y + (altura - lado_qr) / 2, lado_qr)
+
+            texto_x, topo = x + 4 * mm, y + altura - 8 * mm
+            largura_texto = largura - lado_qr - 10 * mm
+            pdf.setFont("Helvetica-Bold", 13)
+            pdf.drawString(texto_x, topo, f"{comanda.quantidade}x {comanda.prato}"[:30])
+            pdf.setFont("Helvetica-Bold", 10)
+            for i, parte in enumerate(textwrap.wrap(comanda.nome, 28)[:2]):
+                pdf.drawString(texto_x, topo - (6 + 4.5 * i) * mm, parte)
+            pdf.setFont("Helvetica", 9)
+            pdf.drawString(texto_x, topo - 16 * mm, f"Pedido #{comanda.pedido_id}")
+            pdf.drawString(texto_x, topo - 20.5 * mm, f"Data: {comanda.data[8:10]}/{comanda.data[5:7]}/{comanda.data[:4]}")
+            if comanda.observacoes.strip():
+                pdf.setFont("Helvetica-Oblique", 8)
+                for i, parte in enumerate(textwrap.wrap(f"Obs: {comanda.observacoes}", int(largura_texto / (1.6 * mm)))[:3]):
+                    pdf.drawString(texto_x, topo - (26 + 3.8 * i) * mm, parte)
+    if primeira:
+        pdf.drawString(margem, altura_pagina - margem - 6 * mm, f"{evento}: nenhuma comanda")
+    pdf.save()
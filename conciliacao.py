@@ -0,0 +1,255 @@
+"""Conciliação dos créditos PIX do extrato bancário com os pedidos pendentes.
+
+O extrato (CSV ou OFX exportado pelo banco) vira uma lista de créditos.
+Os pedidos pendentes pagos por PIX são agrupados em cobranças: um envio
+do formulário com várias datas gera um pedido por data, pagos juntos pelo
+"Valor Total Agrupado". As cobranças ficam em um índice por valor (em
+centavos), então cada crédito só é comparado com as cobranças de mesmo
+valor. Entre essas, valem a semelhança do nome do pagador e a janela de
+datas (o pagamento chega até `janela_dias` antes da data do pedido). Cada
+crédito e cada cobrança entram em no máximo uma proposta.
+"""
+import csv
+import hashlib
+import io
+import re
+import unicodedata
+from collections import defaultdict
+from datetime import datetime, timedelta
+from difflib import SequenceMatcher
+
+# Palavras que o banco põe junto do nome do pagador, e partículas dos nomes
+PALAVRAS_IGNORADAS = {
+    "pix", "recebido", "recebida", "transferencia", "credito", "ted", "doc", "de", "da", "do", "das", "dos", "e",
+}
+FORMATOS_DATA_EXTRATO = (
+    "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d", "%d/%m/%y",
+)
+# Cabeçalhos aceitos no CSV (comparados sem acento e em minúsculas)
+COLUNAS_CSV = {
+    "data": ("data", "data lancamento", "data/hora", "date", "dtposted"),
+    "valor": ("valor", "valor (r$)", "amount", "value", "credito", "trnamt"),
+    "nome": ("nome", "pagador", "nome pagador", "remetente", "favorecido", "descricao", "historico", "memo", "name"),
+    "id": ("id", "identificador", "id transacao", "fitid", "documento", "e2e", "end to end"),
+    "tipo": ("tipo", "natureza", "trntype", "d/c"),
+}
+SEMELHANCA_ALTA = 0.85
+TOLERANCIA_HORARIO = timedelta(hours=2)
+
+
+class Lancamento:
+    """Crédito do extrato."""
+    __slots__ = ("id", "data", "centavos", "nome")
+
+    def __init__(self, id, data, centavos, nome):
+        self.id = id
+        self.data = data
+        self.centavos = centavos
+        self.nome = nome
+
+
+class Cobranca:
+    """Pedidos pendentes pagos juntos (mesmo envio do formulário)."""
+    __slots__ = ("ids", "nome", "telefone", "centavos", "data_pedido", "hora")
+
+    def __init__(self, ids, nome, telefone, centavos, data_pedido, hora):
+        self.ids = ids
+        self.nome = nome
+        self.telefone = telefone
+        self.centavos = centavos
+        self.data_pedido = data_pedido
+        self.hora = hora
+
+
+class Proposta:
+    __slots__ = ("lancamento", "cobranca", "semelhanca", "no_horario")
+
+    def __init__(self, lancamento, cobranca, semelhanca, no_horario):
+        self.lancamento = lancamento
+        self.cobranca = cobranca
+        self.semelhanca = semelhanca
+        self.no_horario = no_horario
+
+    @property
+    def confiavel(self):
+        return self.semelhanca >= SEMELHANCA_ALTA
+
+
+# --- Leitura do extrato ---
+
+def _sem_acento(texto):
+    return unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode("ascii").lower().strip()
+
+
+def centavos(texto):
+    """'1.234,56', '1234.56', 'R$ 36,00' -> inteiro em centavos; None se não for um valor."""
+    texto = re.sub(r"[^\d,.\-]", "", str(texto))
+    if not re.search(r"\d", texto):
+        return None
+    if "," in texto:
+        # Formato brasileiro: ponto de milhar, vírgula decimal
+        texto = texto.replace(".", "").replace(",", ".")
+    try:
+        return round(float(texto) * 100)
+    except ValueError:
+        return None
+
+
+def ler_data(texto):
+    texto = str(texto).strip()
+    for formato in FORMATOS_DATA_EXTRATO:
+        try:
+            return datetime.strptime(texto, formato)
+        except ValueError:
+            continue
+    return None
+
+
+def _id_lancamento(*partes):
+    # Extratos sem identificador: o mesmo arquivo importado de novo gera os mesmos IDs
+    return "EXT-" + hashlib.sha1("|".join(map(str, partes)).encode("utf-8")).hexdigest()[:12].upper()
+
+
+def ler_ofx(texto):
+    lancamentos = []
+    for bloco in re.findall(r"<STMTTRN>(.*?)(?:</STMTTRN>|(?=<STMTTRN>)|</BANKTRANLIST>)", texto, re.S | re.I):
+        campos = {
+            chave.upper(): valor.strip()
+            for chave, valor in re.findall(r"<(\w+)>([^<\r\n]*)", bloco)
+        }
+        valor = centavos(campos.get("TRNAMT", ""))
+        data = re.match(r"\d{8}(\d{6})?", campos.get("DTPOSTED", ""))
+        if valor is None or valor <= 0 or data is None:
+            continue
+        data = datetime.strptime(data.group(0), "%Y%m%d%H%M%S" if data.group(1) else "%Y%m%d")
+        nome = campos.get("NAME") or campos.get("MEMO", "")
+        lancamentos.append(Lancamento(campos.get("FITID") or _id_lancamento(data, valor, nome), data, valor, nome))
+    return lancamentos
+
+
+def ler_csv(texto):
+    try:
+        dialeto = csv.Sniffer().sniff(texto[:4096], delimiters=";,\t")
+    except csv.Error:
+        dialeto = csv.excel
+    linhas = list(csv.reader(io.StringIO(texto), dialeto))
+    if not linhas:
+        return []
+    cabecalho = [_sem_acento(c) for c in linhas[0]]
+    posicoes = {}
+    for campo, nomes in COLUNAS_CSV.items():
+        for i, coluna in enumerate(cabecalho):
+            if coluna in nomes:
+                posicoes.setdefault(campo, i)
+    if "data" not in posicoes or "valor" not in posicoes:
+        raise ValueError("O CSV precisa ter ao menos as colunas de data e valor")
+
+    lancamentos, repetidos = [], defaultdict(int)
+    for linha in linhas[1:]:
+        campo = lambda nome: linha[posicoes[nome]].strip() if nome in posicoes and posicoes[nome] < len(linha) else ""
+        valor, data = centavos(campo("valor")), ler_data(campo("data"))
+        if valor is None or data is None or valor <= 0 or _sem_acento(campo("tipo")).startswith(("d", "debit")):
+            continue
+        nome = campo("nome")
+        identificador = campo("id")
+        if not identificador:
+            chave = (data, valor, nome)
+            repetidos[chave] += 1
+            identificador = _id_lancamento(data, valor, nome, repetidos[chave])
+        lancamentos.append(Lancamento(identificador, data, valor, nome))
+    return lancamentos
+
+
+def ler_extrato(conteudo, nome_arquivo):
+    """Créditos (valores positivos) de um extrato CSV ou OFX. Levanta ValueError se o formato não for reconhecido."""
+    for codificacao in ("utf-8-sig", "latin-1"):
+        try:
+            texto = conteudo.decode(codificacao)
+            break
+        except UnicodeDecodeError:
+            continue
+    if nome_arquivo.lower().endswith(".ofx") or "<OFX>" in texto[:2048].upper():
+        return ler_ofx(texto)
+    return ler_csv(texto)
+
+
+# --- Conciliação ---
+
+def _tokens(nome):
+    return [t for t in re.findall(r"[a-z]+", _sem_acento(nome)) if t not in PALAVRAS_IGNORADAS]
+
+
+def semelhanca_nomes(nome_extrato, nome_pedido):
+    """0 a 1. Aceita nome abreviado ou cortado pelo banco (ex: 'JOAO S SILVA' x 'João Santos da Silva')."""
+    a, b = _tokens(nome_extrato), _tokens(nome_pedido)
+    if not a or not b:
+        return 0.0
+    curto, longo = (a, b) if len(a) <= len(b) else (b, a)
+    # Cada palavra do nome mais curto precisa aparecer no outro (inteira ou como inicial/prefixo)
+    encontrados = sum(any(u.startswith(t) for u in longo) for t in curto if len(t) != 2)
+    encontrados += sum(t in longo for t in curto if len(t) == 2)
+    return max(encontrados / len(curto), SequenceMatcher(None, " ".join(a), " ".join(b)).ratio())
+
+
+def agrupar_cobrancas(pedidos):
+    """Agrupa os pedidos pendentes (registros com as colunas de COLUNAS_PEDIDOS) pagos juntos."""
+    grupos = {}
+    for pedido in pedidos:
+        data_hora = str(pedido.get("Data/Hora", ""))
+        valor = centavos(pedido.get("Valor Total Agrupado", "")) or centavos(pedido.get("Total Pedido", ""))
+        data = ler_data(data_hora[:10])
+        if valor is None or data is None:
+            continue
+        telefone = "".join(filter(str.isdigit, str(pedido.get("Telefone Cliente", ""))))
+        # Os pedidos de um mesmo envio têm o mesmo telefone, o mesmo total agrupado e a mesma hora
+        chave = (telefone, valor, data_hora[11:19])
+        grupo = grupos.get(chave)
+        if grupo is None:
+            grupos[chave] = Cobranca([str(pedido["ID"])], str(pedido.get("Nome Cliente", "")), telefone, valor, data.date(), data_hora[11:19])
+        else:
+            grupo.ids.append(str(pedido["ID"]))
+            grupo.data_pedido = min(grupo.data_pedido, data.date())
+    return list(grupos.values())
+
+
+def conciliar(lancamentos, cobrancas, janela_dias=30, semelhanca_minima=0.6, usados=()):
+    """Propõe um crédito por cobrança, da combinação mais provável para a menos provável.
+
+    `usados` são os IDs de transação já gravados em pedidos (importação
+    repetida do mesmo extrato). Retorna (propostas, créditos sem par).
+    """
+    por_valor = defaultdict(list)
+    for cobranca in cobrancas:
+        por_valor[cobranca.centavos].append(cobranca)
+    usados = set(usados)
+
+    candidatos = []
+    for lancamento in lancamentos:
+        if lancamento.id in usados:
+            continue
+        for cobranca in por_valor.get(lancamento.centavos, ()):
+            dias = (cobranca.data_pedido - lancamento.data.date()).days
+            if not 0 <= dias <= janela_dias:
+                continue
+            semelhanca = semelhanca_nomes(lancamento.nome, cobranca.nome)
+            if semelhanca < semelhanca_minima:
+                continue
+            # PIX feito logo depois do pedido: o horário do crédito fica perto da hora gravada
+            # (extratos só com a data não têm horário para comparar)
+            hora = ler_data(f"{lancamento.data:%Y-%m-%d} {cobranca.hora}")
+            no_horario = (
+                hora is not None and lancamento.data.time() != datetime.min.time()
+                and abs(lancamento.data - hora) <= TOLERANCIA_HORARIO
+            )
+            candidatos.append((semelhanca + (0.1 if no_horario else 0.0), semelhanca, no_horario, lancamento, cobranca))
+
+    candidatos.sort(key=lambda c: c[0], reverse=True)
+    propostas, lancamentos_usados, cobrancas_usadas = [], set(), set()
+    for _, semelhanca, no_horario, lancamento, cobranca in candidatos:
+        if lancamento.id in lancamentos_usados or id(cobranca) in cobrancas_usadas:
+            continue
+        lancamentos_usados.add(lancamento.id)
+        cobrancas_usadas.add(id(cobranca))
+        propostas.append(Proposta(lancamento, cobranca, semelhanca, no_horario))
+    sem_par = [l for l in lancamentos if l.id not in lancamentos_usados and l.id not in usados]
+    return propostas, sem_par
@@ -0,0 +1,140 @@
+"""Catálogo de eventos (congressos, jantares, retiros) e seu cache em memória.
+
+Cada evento tem o próprio cardápio, datas, dados de pagamento e partição
+de pedidos: planilhas "Pedidos - <evento>", "Itens - <evento>" e
+"Configuracoes - <evento>", ou um arquivo SQLite próprio. O evento
+principal usa os nomes originais, então os dados já gravados continuam
+valendo. O catálogo fica no backend do evento principal e é recarregado
+sem reiniciar o app; cada recarga que muda algo incrementa `versao`.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from armazenamento import COLUNAS_EVENTOS
+
+logger = logging.getLogger(__name__)
+EVENTO_PRINCIPAL = "principal"
+PADRAO_ID_EVENTO = re.compile(r"[a-z0-9][a-z0-9-]{0,39}")
+
+
+def nome_particao(nome_base, evento):
+    """Nome da planilha do evento (ex: 'Pedidos' -> 'Pedidos - retiro-2026')."""
+    return nome_base if evento == EVENTO_PRINCIPAL else f"{nome_base} - {evento}"
+
+
+def caminho_particao(caminho, evento):
+    """Arquivo SQLite do evento (ex: 'dados/pedidos.db' -> 'dados/pedidos_retiro-2026.db')."""
+    if evento == EVENTO_PRINCIPAL:
+        return caminho
+    raiz, extensao = os.path.splitext(caminho)
+    return f"{raiz}_{evento}{extensao}"
+
+
+def _json(texto, padrao):
+    try:
+        valor = json.loads(texto) if texto else padrao
+    except (TypeError, ValueError):
+        return padrao
+    return valor if isinstance(valor, type(padrao)) else padrao
+
+
+class Evento:
+    """Configuração de um evento: cardápio {prato: preço}, datas {rótulo: 'AAAA-MM-DD'} e pagamento."""
+    __slots__ = ("id", "nome", "cardapio", "datas", "pagamento", "acompanhamentos", "ativo")
+
+    def __init__(self, id, nome, cardapio, datas, pagamento=None, acompanhamentos="", ativo=True):
+        self.id = id
+        self.nome = nome
+        self.cardapio = dict(cardapio)
+        self.datas = dict(datas)
+        # Chaves usadas pelo app: pix_chave, pix_nome, pix_banco, whatsapp
+        self.pagamento = dict(pagamento or {})
+        self.acompanhamentos = acompanhamentos
+        self.ativo = ativo
+
+    @classmethod
+    def de_registro(cls, rec):
+        """Monta o evento a partir de uma linha do catálogo; JSON inválido vira vazio.
+
+        Preço que não é número levanta ValueError/TypeError.
+        """
+        cardapio = _json(rec.get("cardapio", ""), {})
+        return cls(
+            id=str(rec.get("evento", "")), nome=str(rec.get("nome", "")),
+            cardapio={str(prato): float(preco) for prato, preco in cardapio.items()},
+            datas={str(rotulo): str(data) for rotulo, data in _json(rec.get("datas", ""), {}).items()},
+            pagamento=_json(rec.get("pagamento", ""), {}),
+            acompanhamentos=str(rec.get("acompanhamentos", "")),
+            ativo=str(rec.get("ativo", "")).strip().lower() not in ("0", "false", "nao", "não"),
+        )
+
+    def registro(self):
+        """Linha do catálogo, na ordem de COLUNAS_EVENTOS."""
+        return [
+            self.id, self.nome, json.dumps(self.cardapio, ensure_ascii=False), json.dumps(self.datas, ensure_ascii=False),
+            json.dumps(self.pagamento, ensure_ascii=False), self.acompanhamentos, "sim" if self.ativo else "não",
+        ]
+
+
+class ConfigEventos:
+    """Catálogo de eventos em memória, com tempo de vida e número de versão.
+
+    `eventos()` relê o catálogo do backend a cada `ttl` segundos; sessões
+    comparam `versao` para saber se o cardápio ou as datas mudaram. Se o
+    catálogo estiver vazio, o evento `padrao` é gravado como o primeiro.
+    Linhas que não dá para ler (ex: preço que não é número) ficam de fora,
+    em `invalidos`, sem derrubar os demais eventos.
+    """
+
+    def __init__(self, store, padrao, ttl=60):
+        self.store = store
+        self.ttl = ttl
+        self.versao = 0
+        self._lock = threading.Lock()
+        self._registros = None
+        self._eventos = {}
+        self.invalidos = {}  # id do evento -> motivo
+        self._carregado_em = 0.0
+        if not store.carregar_eventos():
+            store.salvar_evento(padrao.registro())
+
+    def eventos(self):
+        """{id: Evento}, na ordem do catálogo. Não altere os objetos retornados: são compartilhados."""
+        with self._lock:
+            if self._registros is None or time.monotonic() - self._carregado_em > self.ttl:
+                self._recarregar()
+            return self._eventos
+
+    def recarregar(self):
+        with self._lock:
+            self._recarregar()
+
+    def _recarregar(self):
+        registros = [[str(rec.get(c, "")) for c in COLUNAS_EVENTOS] for rec in self.store.carregar_eventos()]
+        self._carregado_em = time.monotonic()
+        if registros == self._registros:
+            return
+        eventos, invalidos = {}, {}
+        for registro in registros:
+            if not PADRAO_ID_EVENTO.fullmatch(registro[0]):
+                continue
+            try:
+                eventos[registro[0]] = Evento.de_registro(dict(zip(COLUNAS_EVENTOS, registro)))
+            except (TypeError, ValueError) as e:
+                logger.warning("Evento %r ignorado: linha inválida no catálogo (%s)", registro[0], e)
+                invalidos[registro[0]] = str(e)
+        self._registros = registros
+        self._eventos = eventos
+        self.invalidos = invalidos
+        self.versao += 1
+
+    def salvar(self, evento):
+        """Grava o evento no catálogo e recarrega o cache (todas as sessões veem a nova versão)."""
+        if not PADRAO_ID_EVENTO.fullmatch(evento.id):
+            raise ValueError("O identificador do evento deve ter só letras minúsculas, números e hífens")
+        self.store.salvar_evento(evento.registro())
+        self.recarregar()
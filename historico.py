@@ -0,0 +1,272 @@
+"""Histórico dos pedidos em Parquet, particionado por evento e data.
+
+Snapshots periódicos do frame de pedidos e dos itens estruturados são
+gravados em `<raiz>/pedidos/evento=<id>/data=<AAAA-MM-DD>/parte.parquet`
+(e o mesmo em `<raiz>/itens/...`), com colunas tipadas: `Data/Hora` como
+timestamp, totais numéricos, status e pagamento como categorias. Cada
+partição é mesclada com a versão anterior pelo ID, então pedidos apagados
+da planilha continuam no histórico.
+
+Os horários de chegada e de aprovação de cada pedido são anotados pelo
+próprio app (ouvinte do backend) e gravados em `Recebido em` e
+`Aprovado em`; pedidos anteriores ao histórico ficam sem eles.
+
+As consultas da aba de Relatórios leem só as colunas e as partições
+pedidas, sem tocar no backend nem na API do Google Sheets.
+"""
+import logging
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from armazenamento import COLUNAS_PEDIDOS
+from relatorios import itens_dos_pedidos
+
+logger = logging.getLogger(__name__)
+
+HORARIO = pa.timestamp("us", tz="UTC")
+# Colunas que não são texto; as demais de COLUNAS_PEDIDOS são gravadas como string
+TIPOS_PEDIDOS = {"Data/Hora": pa.timestamp("us"), "Total Pedido": pa.float64(), "Valor Total Agrupado": pa.float64()}
+# Gravadas como texto (o Parquet já as codifica em dicionário) e lidas como category
+CATEGORICAS = {"Tipo Pagamento", "Status", "Entregue", "Notificacao", "Item", "evento"}
+ESQUEMA_PEDIDOS = pa.schema(
+    [(coluna, TIPOS_PEDIDOS.get(coluna, pa.string())) for coluna in COLUNAS_PEDIDOS]
+    + [("Recebido em", HORARIO), ("Aprovado em", HORARIO)]
+)
+ESQUEMA_ITENS = pa.schema([
+    ("ID Pedido", pa.string()), ("Data", pa.string()), ("Item", pa.string()),
+    ("Quantidade", pa.int64()), ("Preco Unitario", pa.float64()),
+])
+PARTICOES = pa.schema([("evento", pa.string()), ("data", pa.string())])
+ESQUEMAS = {"pedidos": ESQUEMA_PEDIDOS, "itens": ESQUEMA_ITENS}
+ARQUIVO_PARTICAO = "parte.parquet"
+
+
+# --- Gravação ---
+
+def tipar_pedidos(df):
+    """Converte o frame do painel para as colunas e tipos de ESQUEMA_PEDIDOS."""
+    tipado = {}
+    for campo in ESQUEMA_PEDIDOS:
+        coluna = campo.name
+        valores = df[coluna] if coluna in df.columns else pd.Series(pd.NA, index=df.index)
+        # Unidades fixas: o que volta do Parquet compara igual ao frame novo
+        if campo.type == HORARIO:
+            tipado[coluna] = pd.to_datetime(valores, errors="coerce", utc=True).astype("datetime64[ns, UTC]")
+        elif pa.types.is_timestamp(campo.type):
+            tipado[coluna] = pd.to_datetime(valores, errors="coerce").astype("datetime64[ns]")
+        elif pa.types.is_floating(campo.type):
+            tipado[coluna] = pd.to_numeric(valores, errors="coerce").astype("float64")
+        elif coluna in CATEGORICAS:
+            tipado[coluna] = valores.fillna("").astype(str).astype("category")
+        else:
+            tipado[coluna] = valores.fillna("").astype(str)
+    return pd.DataFrame(tipado, index=df.index)
+
+
+def tipar_itens(itens):
+    return pd.DataFrame({
+        "ID Pedido": itens["ID Pedido"].astype(str), "Data": itens["Data"].astype(str),
+        "Item": itens["Item"].astype(str).astype("category"),
+        "Quantidade": pd.to_numeric(itens["Quantidade"], errors="coerce").fillna(0).astype("int64"),
+        "Preco Unitario": pd.to_numeric(itens["Preco Unitario"], errors="coerce"),
+    })
+
+
+def _caminho(raiz, tabela, evento, data):
+    return os.path.join(raiz, tabela, f"evento={evento}", f"data={data}", ARQUIVO_PARTICAO)
+
+
+def _ler_particao(caminho):
+    if not os.path.exists(caminho):
+        return None
+    return pq.read_table(caminho).to_pandas()
+
+
+def _gravar_particao(caminho, df, esquema):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = caminho + ".tmp"
+    df = df.astype({coluna: str for coluna in df.columns if coluna in CATEGORICAS})
+    pq.write_table(pa.Table.from_pandas(df, schema=esquema, preserve_index=False), temporario)
+    # Troca atômica: uma consulta em andamento nunca lê um arquivo pela metade
+    os.replace(temporario, caminho)
+
+
+def gravar_snapshot(raiz, evento, df_pedidos, df_itens, recebidos=None, aprovados=None, agora=None):
+    """Mescla o frame atual nas partições do evento e retorna quantas partições foram regravadas.
+
+    `recebidos` e `aprovados` são {ID: horário UTC} anotados pelo app; os
+    horários já gravados em uma partição nunca são substituídos.
+    """
+    if df_pedidos.empty:
+        return 0
+    agora = agora or pd.Timestamp.now(tz="UTC")
+    pedidos = tipar_pedidos(df_pedidos)
+    # Pedidos sem data válida não têm partição; continuam visíveis no painel ao vivo
+    pedidos = pedidos[pedidos["Data/Hora"].notna()].copy()
+    ids = pedidos["ID"]
+    pedidos["Recebido em"] = pd.to_datetime(ids.map(recebidos or {}), utc=True).astype("datetime64[ns, UTC]")
+    pedidos["Aprovado em"] = pd.to_datetime(ids.map(aprovados or {}), utc=True).astype("datetime64[ns, UTC]")
+    itens = tipar_itens(itens_dos_pedidos(df_pedidos[df_pedidos["ID"].astype(str).isin(ids)], df_itens))
+
+    regravadas = 0
+    for data, atuais in pedidos.groupby(pedidos["Data/Hora"].dt.strftime("%Y-%m-%d"), sort=False):
+        caminho = _caminho(raiz, "pedidos", evento, data)
+        atuais = atuais.copy()
+        anteriores = _ler_particao(caminho)
+        if anteriores is not None:
+            anteriores = tipar_pedidos(anteriores)
+            horarios = anteriores.set_index("ID")[["Recebido em", "Aprovado em"]]
+            for coluna in ("Recebido em", "Aprovado em"):
+                atuais[coluna] = atuais["ID"].map(horarios[coluna]).fillna(atuais[coluna])
+            atuais = pd.concat([anteriores[~anteriores["ID"].isin(atuais["ID"])], atuais], ignore_index=True)
+        atuais = tipar_pedidos(atuais).reset_index(drop=True)
+        # Aprovado sem horário anotado (ex: aprovado em outra instância): vale o instante do snapshot
+        sem_horario = (atuais["Status"].astype(str) == "Aprovado") & atuais["Aprovado em"].isna() & atuais["Recebido em"].notna()
+        atuais.loc[sem_horario, "Aprovado em"] = agora
+        if anteriores is None or not atuais.equals(anteriores.reset_index(drop=True)):
+            _gravar_particao(caminho, atuais, ESQUEMA_PEDIDOS)
+            regravadas += 1
+
+    for data, atuais in itens.groupby("Data", sort=False):
+        caminho = _caminho(raiz, "itens", evento, data)
+        anteriores = _ler_particao(caminho)
+        if anteriores is not None:
+            anteriores = tipar_itens(anteriores)
+            atuais = pd.concat([anteriores[~anteriores["ID Pedido"].isin(atuais["ID Pedido"])], atuais], ignore_index=True)
+        atuais = tipar_itens(atuais).reset_index(drop=True)
+        if anteriores is None or not atuais.equals(anteriores.reset_index(drop=True)):
+            _gravar_particao(caminho, atuais, ESQUEMA_ITENS)
+    return regravadas
+
+
+class ExportadorHistorico:
+    """Snapshots periódicos do frame de pedidos de um evento para o histórico em Parquet.
+
+    Fica ouvindo o backend para anotar quando cada pedido chegou e quando
+    foi aprovado; `iniciar` dispara uma thread que grava um snapshot a
+    cada `intervalo` segundos.
+    """
+
+    def __init__(self, cache, store, evento, raiz, intervalo=3600):
+        self.cache = cache
+        self.evento = evento
+        self.raiz = raiz
+        self.intervalo = intervalo
+        self.ultimo_snapshot = None
+        self._lock = threading.Lock()
+        self._recebidos = {}
+        self._aprovados = {}
+        self._thread = None
+        store.registrar_ouvinte(self._ao_gravar)
+
+    def _ao_gravar(self, evento, *args):
+        agora = pd.Timestamp.now(tz="UTC")
+        with self._lock:
+            if evento == "adicionados":
+                linhas, _ = args
+                for linha in linhas:
+                    self._recebidos.setdefault(str(linha[0]), agora)
+            elif evento == "atualizados":
+                pedido_ids, coluna, valor = args
+                if coluna == "Status" and valor == "Aprovado":
+                    for pid in pedido_ids:
+                        self._aprovados.setdefault(str(pid), agora)
+
+    def snapshot(self):
+        """Grava um snapshot agora. Retorna quantas partições de pedidos foram regravadas."""
+        df = self.cache.frame(sincronizar=True)
+        itens = self.cache.itens()
+        with self._lock:
+            recebidos, aprovados = dict(self._recebidos), dict(self._aprovados)
+        regravadas = gravar_snapshot(self.raiz, self.evento, df, itens, recebidos, aprovados)
+        with self._lock:
+            # Já estão gravados nas partições; daqui em diante valem os horários de lá
+            for pid in recebidos:
+                self._recebidos.pop(pid, None)
+            for pid in aprovados:
+                self._aprovados.pop(pid, None)
+        self.ultimo_snapshot = pd.Timestamp.now(tz="UTC")
+        return regravadas
+
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._executar, name=f"historico-{self.evento}", daemon=True)
+            self._thread.start()
+
+    def _executar(self):
+        parar = threading.Event()
+        while not parar.wait(self.intervalo):
+            try:
+                self.snapshot()
+            except Exception:
+                logger.exception("Falha no snapshot do histórico do evento %s", self.evento)
+
+
+# --- Consulta ---
+
+def consultar(raiz, tabela, colunas, eventos=None, inicio=None, fim=None):
+    """Lê só `colunas` (mais `evento` e `data`) das partições pedidas.
+
+    `tabela` é "pedidos" ou "itens"; `inicio`/`fim` são datas (inclusive).
+    """
+    colunas = list(colunas) + ["evento", "data"]
+    caminho = os.path.join(raiz, tabela)
+    if not os.path.isdir(caminho):
+        return pd.DataFrame(columns=colunas)
+    esquema = ESQUEMAS[tabela]
+    for campo in PARTICOES:
+        esquema = esquema.append(campo)
+    dataset = ds.dataset(caminho, schema=esquema, format="parquet", partitioning=ds.partitioning(PARTICOES, flavor="hive"))
+    filtros = []
+    if eventos:
+        filtros.append(ds.field("evento").isin(list(eventos)))
+    if inicio:
+        filtros.append(ds.field("data") >= inicio.isoformat())
+    if fim:
+        filtros.append(ds.field("data") <= fim.isoformat())
+    filtro = None
+    for condicao in filtros:
+        filtro = condicao if filtro is None else filtro & condicao
+    df = dataset.to_table(columns=colunas, filter=filtro).to_pandas()
+    return df.astype({coluna: "category" for coluna in colunas if coluna in CATEGORICAS})
+
+
+def eventos_no_historico(raiz):
+    pasta = os.path.join(raiz, "pedidos")
+    if not os.path.isdir(pasta):
+        return []
+    return sorted(nome.split("=", 1)[1] for nome in os.listdir(pasta) if nome.startswith("evento="))
+
+
+def receita_por_dia(raiz, eventos=None, inicio=None, fim=None):
+    """Total aprovado por data (linhas) e evento (colunas)."""
+    df = consultar(raiz, "pedidos", ["Total Pedido", "Status"], eventos, inicio, fim)
+    aprovados = df[df["Status"].astype(str) == "Aprovado"]
+    return aprovados.pivot_table(index="data", columns="evento", values="Total Pedido", aggfunc="sum", fill_value=0)
+
+
+def mix_pratos(raiz, eventos=None, inicio=None, fim=None):
+    """Quantidade aprovada por prato (linhas) e evento (colunas), do prato mais vendido ao menos."""
+    itens = consultar(raiz, "itens", ["ID Pedido", "Item", "Quantidade"], eventos, inicio, fim)
+    status = consultar(raiz, "pedidos", ["ID", "Status"], eventos, inicio, fim)
+    aprovados = status.loc[status["Status"].astype(str) == "Aprovado", ["ID", "evento"]]
+    itens = itens.merge(aprovados, left_on=["ID Pedido", "evento"], right_on=["ID", "evento"])
+    tabela = itens.pivot_table(index="Item", columns="evento", values="Quantidade", aggfunc="sum", fill_value=0, observed=True)
+    if tabela.empty:
+        return tabela
+    return tabela.loc[tabela.sum(axis=1).sort_values(ascending=False).index]
+
+
+def atraso_aprovacao(raiz, eventos=None, inicio=None, fim=None):
+    """Tempo entre a chegada e a aprovação (em horas) por data e evento: pedidos, mediana e p90."""
+    df = consultar(raiz, "pedidos", ["Recebido em", "Aprovado em"], eventos, inicio, fim)
+    df = df.dropna(subset=["Recebido em", "Aprovado em"])
+    horas = (df["Aprovado em"] - df["Recebido em"]).dt.total_seconds() / 3600
+    return horas.groupby([df["data"], df["evento"]]).agg(
+        Pedidos="size", Mediana="median", p90=lambda h: h.quantile(0.9)
+    ).reset_index()
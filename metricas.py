@@ -0,0 +1,198 @@
+"""Instrumentação dos caminhos de dados do app.
+
+Registra a duração de cada etapa medida (conexão, leituras e escritas do
+backend, relatórios) e conta as chamadas à API do Google Sheets, por rerun
+e por sessão. Cada sessão do Streamlit roda o script na sua própria
+thread; o rerun em andamento fica em um `threading.local`, e o que é
+medido fora de um rerun (fila de gravação, espelho) entra como segundo
+plano. Reruns só de um fragmento (`st.fragment`) são contados à parte dos
+reruns da página inteira, e sessões paradas há mais de `sessao_ociosa`
+segundos saem do registro.
+"""
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+
+# Métodos de um gspread.Worksheet que fazem uma requisição à API
+METODOS_API_PLANILHA = [
+    "get_all_records", "get_all_values", "row_values", "col_values", "get", "batch_get",
+    "find", "findall", "update", "update_cell", "batch_update", "append_row", "append_rows", "add_cols",
+]
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) pelo método do vizinho mais próximo; None para lista vazia."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(int(round(p / 100 * (len(ordenados) - 1))), len(ordenados) - 1)]
+
+
+class Rerun:
+    """Etapas medidas e chamadas à API de uma execução do script ("pagina") ou de um fragmento ("fragmento")."""
+    __slots__ = ("sessao", "pagina", "tipo", "inicio", "duracao", "etapas", "chamadas_api")
+
+    def __init__(self, sessao, pagina, tipo="pagina"):
+        self.sessao = sessao
+        self.pagina = pagina
+        self.tipo = tipo
+        self.inicio = time.time()
+        self.duracao = 0.0
+        self.etapas = defaultdict(lambda: [0, 0.0])  # nome -> [vezes, segundos]
+        self.chamadas_api = 0
+
+    def como_dict(self):
+        return {
+            "sessao": self.sessao, "pagina": self.pagina, "tipo": self.tipo, "inicio": self.inicio,
+            "duracao_s": round(self.duracao, 6), "chamadas_api": self.chamadas_api,
+            "etapas": {nome: {"vezes": n, "duracao_s": round(t, 6)} for nome, (n, t) in self.etapas.items()},
+        }
+
+
+class Metricas:
+    """Registro de métricas compartilhado por todas as sessões."""
+
+    def __init__(self, max_amostras=500, max_reruns=200, sessao_ociosa=3600.0):
+        self.sessao_ociosa = sessao_ociosa
+        self._proxima_limpeza = time.time() + sessao_ociosa
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._amostras = defaultdict(lambda: deque(maxlen=max_amostras))
+        self._reruns = deque(maxlen=max_reruns)
+        self._chamadas_api = deque()  # instantes das chamadas do último minuto
+        self.chamadas_api_total = 0
+        self.chamadas_api_segundo_plano = 0
+        self.chamadas_por_metodo = defaultdict(int)
+        self.sessoes = defaultdict(lambda: {"reruns": 0, "fragmentos": 0, "duracao_s": 0.0, "chamadas_api": 0, "ultimo": 0.0})
+
+    # Reruns
+
+    def iniciar_rerun(self, sessao, pagina="", tipo="pagina"):
+        self._local.rerun = Rerun(sessao, pagina, tipo)
+
+    @contextmanager
+    def fragmento(self, sessao, nome):
+        """Mede um rerun só do fragmento `nome`; dentro do rerun da página, o fragmento já está sendo medido."""
+        if getattr(self._local, "rerun", None) is not None:
+            yield
+            return
+        self.iniciar_rerun(sessao, nome, tipo="fragmento")
+        try:
+            yield
+        finally:
+            self.finalizar_rerun()
+
+    def finalizar_rerun(self):
+        rerun = getattr(self._local, "rerun", None)
+        if rerun is None:
+            return
+        self._local.rerun = None
+        agora = time.time()
+        rerun.duracao = agora - rerun.inicio
+        with self._lock:
+            self._reruns.append(rerun)
+            self._amostras["rerun" if rerun.tipo == "pagina" else "rerun.fragmento"].append(rerun.duracao)
+            sessao = self.sessoes[rerun.sessao]
+            sessao["reruns" if rerun.tipo == "pagina" else "fragmentos"] += 1
+            sessao["duracao_s"] += rerun.duracao
+            sessao["chamadas_api"] += rerun.chamadas_api
+            sessao["ultimo"] = agora
+            if agora >= self._proxima_limpeza:
+                self._limpar_sessoes(agora)
+
+    def _limpar_sessoes(self, agora):
+        # Chamado com o lock; sessões fechadas no navegador não avisam o servidor
+        limite = agora - self.sessao_ociosa
+        for sessao in [s for s, dados in self.sessoes.items() if dados["ultimo"] < limite]:
+            del self.sessoes[sessao]
+        self._proxima_limpeza = agora + min(self.sessao_ociosa, 300)
+
+    # Medição
+
+    @contextmanager
+    def medir(self, nome):
+        """Mede a duração de um bloco: `with metricas.medir("relatorio.fechamento"): ...`."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracao = time.perf_counter() - inicio
+            with self._lock:
+                self._amostras[nome].append(duracao)
+            rerun = getattr(self._local, "rerun", None)
+            if rerun is not None:
+                etapa = rerun.etapas[nome]
+                etapa[0] += 1
+                etapa[1] += duracao
+
+    def medido(self, nome, funcao, api=False):
+        """Envolve `funcao` para medir cada chamada; com `api=True`, conta também uma chamada à API."""
+        @wraps(funcao)
+        def envolvida(*args, **kwargs):
+            if api:
+                self.registrar_chamada_api(nome)
+            with self.medir(nome):
+                return funcao(*args, **kwargs)
+        return envolvida
+
+    def instrumentar(self, objeto, metodos, prefixo, api=False):
+        """Substitui os métodos do objeto (só desta instância) por versões medidas. Retorna o próprio objeto."""
+        for metodo in metodos:
+            original = getattr(objeto, metodo, None)
+            if callable(original):
+                setattr(objeto, metodo, self.medido(f"{prefixo}.{metodo}", original, api=api))
+        return objeto
+
+    def instrumentar_planilha(self, sheet):
+        """Mede e conta as chamadas à API de um gspread.Worksheet."""
+        return self.instrumentar(sheet, METODOS_API_PLANILHA, f"sheets.{sheet.title}", api=True)
+
+    def registrar_chamada_api(self, metodo):
+        agora = time.monotonic()
+        rerun = getattr(self._local, "rerun", None)
+        with self._lock:
+            self._chamadas_api.append(agora)
+            self.chamadas_api_total += 1
+            self.chamadas_por_metodo[metodo] += 1
+            if rerun is None:
+                self.chamadas_api_segundo_plano += 1
+        if rerun is not None:
+            rerun.chamadas_api += 1
+
+    # Consulta
+
+    def chamadas_ultimo_minuto(self):
+        limite = time.monotonic() - 60
+        with self._lock:
+            while self._chamadas_api and self._chamadas_api[0] < limite:
+                self._chamadas_api.popleft()
+            return len(self._chamadas_api)
+
+    def resumo(self):
+        """Uma linha por etapa medida, com contagem e percentis (em ms) das amostras recentes."""
+        with self._lock:
+            amostras = {nome: list(valores) for nome, valores in self._amostras.items()}
+        return [
+            {
+                "Etapa": nome, "Amostras": len(valores),
+                "p50 (ms)": percentil(valores, 50) * 1000, "p95 (ms)": percentil(valores, 95) * 1000,
+                "p99 (ms)": percentil(valores, 99) * 1000, "Máx (ms)": max(valores) * 1000,
+            }
+            for nome, valores in sorted(amostras.items()) if valores
+        ]
+
+    def reruns_recentes(self, sessao=None):
+        with self._lock:
+            reruns = list(self._reruns)
+        return [r.como_dict() for r in reruns if sessao is None or r.sessao == sessao]
+
+    def exportar(self, caminho):
+        """Grava os reruns recentes no arquivo, um JSON por linha. Retorna quantos foram gravados."""
+        reruns = self.reruns_recentes()
+        with open(caminho, "w", encoding="utf-8") as f:
+            for rerun in reruns:
+                f.write(json.dumps(rerun, ensure_ascii=False) + "\n")
+        return len(reruns)
@@ -0,0 +1,302 @@
+"""Envio em lote dos comprovantes de pedido aprovado por WhatsApp.
+
+As mensagens são montadas a partir de um modelo e entregues por um
+`Remetente` plugável: exportação dos links wa.me em CSV, gateway HTTP ou um
+remetente simulado (para testes). Um lote roda em uma thread própria, com
+um pool de workers asyncio de concorrência limitada, limite de envios por
+segundo e novas tentativas com espera crescente. O resultado de cada pedido
+é gravado na coluna "Notificacao" do backend.
+"""
+import asyncio
+import csv
+import json
+import logging
+import os
+import threading
+import time
+import urllib.parse
+import urllib.request
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from armazenamento import formatar_itens, itens_do_texto
+from prazos import data_iso
+
+logger = logging.getLogger(__name__)
+
+# Campos disponíveis no modelo: {evento}, {nome}, {pedido_id}, {data}, {itens}
+MODELO_PADRAO = (
+    "*{evento} - Comprovante de Quentinha* 🍲\n\n"
+    "Olá, {nome}!\n"
+    "Seu pedido foi APROVADO!\n\n"
+    "*Nº do Pedido:* #{pedido_id}\n"
+    "*Data:* {data}\n"
+    "*Itens:*\n{itens}\n\n"
+    "Apresente esta mensagem no local de retirada. Bom apetite!"
+)
+# Valores gravados na coluna "Notificacao"
+ENVIADO = "Enviado"
+LINK_GERADO = "Link gerado"
+FALHOU = "Falhou"
+# Tamanho do bloco de resultados gravado de uma vez no backend
+LOTE_GRAVACAO = 50
+
+
+class _Campos(dict):
+    def __missing__(self, chave):
+        # Campo desconhecido no modelo fica como está, em vez de derrubar o lote
+        return "{" + chave + "}"
+
+
+def link_whatsapp(telefone, mensagem):
+    """Gera o link do WhatsApp com a mensagem pré-formatada"""
+    telefone = ''.join(filter(str.isdigit, str(telefone)))
+    if telefone and not telefone.startswith('55'):
+        telefone = '55' + telefone
+    return f"https://wa.me/{telefone}?text={urllib.parse.quote(mensagem)}"
+
+
+def _texto_data(data_pedido):
+    # Data ausente ou inválida (vazia, NaT) deixa o campo em branco, sem derrubar o lote
+    if isinstance(data_pedido, str):
+        try:
+            data_pedido = datetime.strptime(data_iso(data_pedido), '%Y-%m-%d')
+        except ValueError:
+            return ""
+    try:
+        return data_pedido.strftime('%A, %d/%m').upper()
+    except (AttributeError, ValueError):
+        return ""
+
+
+def montar_mensagem(modelo, evento, pedido_id, nome_cliente, data_pedido, itens):
+    """Preenche o modelo. `data_pedido` é datetime/Timestamp ou texto 'AAAA-MM-DD ...' / 'DD/MM/AAAA ...'; `itens` são itens estruturados."""
+    return modelo.format_map(_Campos(
+        evento=evento, nome=nome_cliente, pedido_id=pedido_id, data=_texto_data(data_pedido),
+        itens="- " + formatar_itens(itens, separador="\n- "),
+    ))
+
+
+# --- Remetentes ---
+
+class Remetente(ABC):
+    """Canal de entrega das mensagens. `enviar` levanta exceção em caso de falha."""
+
+    @abstractmethod
+    async def enviar(self, pedido_id, telefone, mensagem):
+        """Entrega uma mensagem e retorna o valor gravado em "Notificacao" (ex: ENVIADO)."""
+
+
+class ExportacaoLinks(Remetente):
+    """Não envia nada: grava os links wa.me em um CSV no disco, para abrir um a um.
+
+    O arquivo é recriado a cada lote e cada link é gravado assim que gerado,
+    então sobrevive a um reinício. Os pedidos ficam como LINK_GERADO (ainda
+    não enviados) até alguém confirmar o envio.
+    """
+
+    def __init__(self, caminho):
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        with open(caminho, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow(["ID", "Telefone", "Link"])
+
+    async def enviar(self, pedido_id, telefone, mensagem):
+        with self._lock, open(self.caminho, "a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow([pedido_id, telefone, link_whatsapp(telefone, mensagem)])
+        return LINK_GERADO
+
+
+class RemetenteSimulado(Remetente):
+    """Guarda as mensagens em memória; falha nos pedidos de `falhar` (para testes)."""
+
+    def __init__(self, falhar=(), atraso=0.0):
+        self.enviadas = []
+        self.falhar = {str(pid) for pid in falhar}
+        self.atraso = atraso
+
+    async def enviar(self, pedido_id, telefone, mensagem):
+        if self.atraso:
+            await asyncio.sleep(self.atraso)
+        if str(pedido_id) in self.falhar:
+            raise RuntimeError(f"Falha simulada no pedido {pedido_id}")
+        self.enviadas.append((pedido_id, telefone, mensagem))
+        return ENVIADO
+
+
+class GatewayHTTP(Remetente):
+    """Envia por um gateway HTTP de WhatsApp: POST JSON {telefone, mensagem, referencia}."""
+
+    def __init__(self, url, token=None, timeout=15.0):
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+
+    def _post(self, corpo):
+        cabecalhos = {"Content-Type": "application/json"}
+        if self.token:
+            cabecalhos["Authorization"] = f"Bearer {self.token}"
+        requisicao = urllib.request.Request(self.url, data=corpo, headers=cabecalhos, method="POST")
+        with urllib.request.urlopen(requisicao, timeout=self.timeout) as resposta:
+            resposta.read()
+
+    async def enviar(self, pedido_id, telefone, mensagem):
+        corpo = json.dumps({
+            "telefone": ''.join(filter(str.isdigit, str(telefone))), "mensagem": mensagem, "referencia": str(pedido_id),
+        }).encode("utf-8")
+        # urllib é bloqueante: roda fora do loop para não segurar os outros workers
+        await asyncio.to_thread(self._post, corpo)
+        return ENVIADO
+
+
+# --- Lote ---
+
+class LoteNotificacoes:
+    """Progresso de um lote, lido pela interface enquanto a thread trabalha."""
+
+    def __init__(self, total, remetente):
+        self.total = total
+        self.remetente = remetente
+        self.enviados = 0
+        self.falhas = {}  # pedido_id -> último erro
+        self.concluido = False
+        self.inicio = time.time()
+        self.fim = None
+
+    @property
+    def processados(self):
+        return self.enviados + len(self.falhas)
+
+
+class _LimiteTaxa:
+    """Espaça as chamadas para no máximo `por_segundo` envios por segundo (0 = sem limite)."""
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo if por_segundo else 0.0
+        self._proximo = 0.0
+        self._lock = asyncio.Lock()
+
+    async def aguardar(self):
+        if not self.intervalo:
+            return
+        async with self._lock:
+            agora = asyncio.get_running_loop().time()
+            espera = self._proximo - agora
+            self._proximo = max(agora, self._proximo) + self.intervalo
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+
+class PipelineNotificacoes:
+    """Monta e entrega os comprovantes de um lote de pedidos aprovados, um lote por vez."""
+
+    def __init__(self, store, concorrencia=5, por_segundo=5.0, tentativas=3, espera_inicial=1.0):
+        self.store = store
+        self.concorrencia = concorrencia
+        self.por_segundo = por_segundo
+        self.tentativas = tentativas
+        self.espera_inicial = espera_inicial
+        self.ultimo_lote = None
+        self._lock = threading.Lock()
+
+    @property
+    def ocupado(self):
+        return self.ultimo_lote is not None and not self.ultimo_lote.concluido
+
+    def iniciar(self, pedidos, remetente, modelo, evento):
+        """Dispara o lote em segundo plano e retorna o LoteNotificacoes para acompanhar o progresso.
+
+        `pedidos` são registros com as chaves de COLUNAS_PEDIDOS. Levanta
+        RuntimeError se já houver um lote em andamento. Os itens e as
+        mensagens são montados já na thread do lote, fora da interface.
+        """
+        pedidos = list(pedidos)
+        with self._lock:
+            if self.ocupado:
+                raise RuntimeError("Já existe um lote de notificações em andamento")
+            lote = self.ultimo_lote = LoteNotificacoes(len(pedidos), remetente)
+        threading.Thread(
+            target=self._rodar, args=(lote, pedidos, modelo, evento), name="notificacoes", daemon=True
+        ).start()
+        return lote
+
+    def _rodar(self, lote, pedidos, modelo, evento):
+        mensagens, falhas = self._montar(lote, pedidos, modelo, evento)
+        asyncio.run(self._executar(lote, mensagens, falhas))
+
+    def _montar(self, lote, pedidos, modelo, evento):
+        """Retorna (mensagens, pedidos que falharam); a falha de um pedido fica registrada no lote."""
+        itens_por_pedido = {}
+        try:
+            for item in self.store.carregar_itens():
+                itens_por_pedido.setdefault(str(item["ID Pedido"]), []).append(item)
+        except Exception:
+            # Sem os itens estruturados, vale o texto de "Itens Pedido"
+            logger.exception("Falha ao carregar os itens do lote de notificações")
+        mensagens, falhas = [], []
+        for pedido in pedidos:
+            pid = str(pedido.get("ID", ""))
+            try:
+                itens = itens_por_pedido.get(pid) or itens_do_texto(pid, "", pedido.get("Itens Pedido", ""))
+                mensagem = montar_mensagem(modelo, evento, pid, pedido.get("Nome Cliente", ""), pedido.get("Data/Hora"), itens)
+            except Exception as e:
+                lote.falhas[pid] = f"{type(e).__name__}: {e}"
+                falhas.append(pid)
+                continue
+            mensagens.append((pid, str(pedido.get("Telefone Cliente", "")), mensagem))
+        return mensagens, falhas
+
+    async def _executar(self, lote, mensagens, falhas=()):
+        fila = asyncio.Queue()
+        for mensagem in mensagens:
+            fila.put_nowait(mensagem)
+        limite = _LimiteTaxa(self.por_segundo)
+        resultados = [(pid, FALHOU) for pid in falhas]  # (pedido_id, valor) ainda não gravados
+
+        async def gravar():
+            pendentes = resultados[:]
+            del resultados[:]
+            por_valor = {}
+            for pid, valor in pendentes:
+                por_valor.setdefault(valor, []).append(pid)
+            for valor, ids in por_valor.items():
+                try:
+                    await asyncio.to_thread(self.store.atualizar_pedidos_em_lote, ids, "Notificacao", valor)
+                except Exception:
+                    logger.exception("Falha ao gravar o resultado de %d notificações", len(ids))
+
+        async def worker():
+            while True:
+                try:
+                    pid, telefone, mensagem = fila.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                espera = self.espera_inicial
+                for tentativa in range(1, self.tentativas + 1):
+                    await limite.aguardar()
+                    try:
+                        valor = await lote.remetente.enviar(pid, telefone, mensagem)
+                    except Exception as e:
+                        lote.falhas[pid] = f"{type(e).__name__}: {e}"
+                        if tentativa < self.tentativas:
+                            await asyncio.sleep(espera)
+                            espera = min(espera * 2, 30)
+                    else:
+                        lote.falhas.pop(pid, None)
+                        lote.enviados += 1
+                        resultados.append((pid, valor))
+                        break
+                else:
+                    resultados.append((pid, FALHOU))
+                if len(resultados) >= LOTE_GRAVACAO:
+                    await gravar()
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(max(self.concorrencia, 1))))
+            await gravar()
+        finally:
+            lote.fim = time.time()
+            lote.concluido = True
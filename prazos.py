@@ -0,0 +1,121 @@
+"""Prazos de pedido por data do evento, mantidos em memória.
+
+As linhas de configuração são convertidas em horários com fuso na carga
+(aceitando os dois formatos de data que a planilha devolve); depois disso,
+consultar um prazo é só um acesso ao dicionário. O painel atualiza a
+agenda ao salvar, sem nova leitura, e a agenda relê as configurações a
+cada `ttl` segundos (alterações feitas direto na planilha ou por outra
+instância). `agora()` é o relógio único usado tanto para desenhar o
+formulário quanto para validar o envio.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# A planilha pode devolver a data no formato em que foi gravada ou no formato local
+FORMATOS_DATA = ("%Y-%m-%d", "%d/%m/%Y")
+FORMATOS_HORA = ("%H:%M:%S", "%H:%M")
+
+
+def _ler(texto, formatos):
+    for formato in formatos:
+        try:
+            return datetime.strptime(texto, formato)
+        except ValueError:
+            continue
+    return None
+
+
+def data_iso(texto):
+    """'AAAA-MM-DD ...' ou 'DD/MM/AAAA ...' (como a planilha devolve) -> 'AAAA-MM-DD'; texto sem data fica como está."""
+    parte = str(texto).strip().split(" ")[0]
+    data = _ler(parte, FORMATOS_DATA)
+    return data.strftime("%Y-%m-%d") if data else parte
+
+
+def data_hora_iso(texto):
+    """Como data_iso, mas mantém o horário: 'DD/MM/AAAA HH:MM:SS' -> 'AAAA-MM-DD HH:MM:SS'."""
+    data, _, hora = str(texto).strip().partition(" ")
+    return f"{data_iso(data)} {hora.strip()}".rstrip()
+
+
+def ler_prazo(prazo_data, prazo_hora, fuso):
+    """Converte as colunas prazo_data/prazo_hora em datetime com fuso; None se forem inválidas."""
+    data = _ler(str(prazo_data).strip(), FORMATOS_DATA)
+    hora = _ler(str(prazo_hora).strip(), FORMATOS_HORA)
+    if data is None or hora is None:
+        return None
+    return fuso.localize(datetime.combine(data.date(), hora.time()))
+
+
+class AgendaPrazos:
+    """Prazo de cada data do evento ({'AAAA-MM-DD': datetime com fuso}), compartilhado pelas sessões."""
+
+    def __init__(self, store, fuso, relogio=None, ttl=60):
+        self.store = store
+        self.fuso = fuso
+        self.ttl = ttl
+        self._relogio = relogio or (lambda: datetime.now(fuso))
+        self._lock = threading.Lock()
+        self._lock_recarga = threading.Lock()
+        self._carregado_em = 0.0
+        self._prazos = {}
+        self.invalidos = set()  # datas com prazo gravado em formato que não foi possível ler
+        self.recarregar()
+
+    def agora(self):
+        return self._relogio()
+
+    def recarregar(self):
+        """Relê as configurações do backend (uma única leitura)."""
+        prazos, invalidos = {}, set()
+        for rec in self.store.carregar_configuracoes():
+            data_evento = str(rec.get("data_evento", ""))
+            prazo = ler_prazo(rec.get("prazo_data", ""), rec.get("prazo_hora", ""), self.fuso)
+            if prazo is None:
+                invalidos.add(data_evento)
+            else:
+                prazos[data_evento] = prazo
+        with self._lock:
+            self._prazos = prazos
+            self.invalidos = invalidos
+            self._carregado_em = time.monotonic()
+
+    def _conferir_validade(self):
+        if time.monotonic() - self._carregado_em <= self.ttl:
+            return
+        # Uma sessão relê; as outras seguem com os prazos atuais
+        if not self._lock_recarga.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() - self._carregado_em > self.ttl:
+                self.recarregar()
+        except Exception:
+            # Backend indisponível: mantém os prazos que já estão em memória e tenta no próximo ttl
+            logger.warning("Falha ao reler os prazos; mantendo os atuais", exc_info=True)
+            self._carregado_em = time.monotonic()
+        finally:
+            self._lock_recarga.release()
+
+    def definir(self, data_evento, prazo):
+        """Substitui o prazo de uma data (chamado ao salvar as configurações). `prazo` tem fuso."""
+        with self._lock:
+            prazos = dict(self._prazos)
+            prazos[data_evento] = prazo
+            self._prazos = prazos
+            self.invalidos = self.invalidos - {data_evento}
+
+    def prazo(self, data_evento):
+        """Prazo da data, ou None quando o administrador ainda não definiu."""
+        self._conferir_validade()
+        return self._prazos.get(data_evento)
+
+    def fechadas(self, datas, agora=None):
+        """Datas (entre as informadas) cujo prazo já passou em `agora`."""
+        self._conferir_validade()
+        agora = agora or self.agora()
+        prazos = self._prazos
+        return [data for data in datas if data in prazos and agora > prazos[data]]
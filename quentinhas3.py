@@ -1,13 +1,31 @@
 import streamlit as st
-import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
+from streamlit.runtime.scriptrunner import add_script_run_ctx
 from datetime import datetime, date, time
+import hashlib
+import threading
 import uuid
-import urllib.parse
+import os
+import json
+import re
+import importlib.util
 import locale
+from functools import wraps
+from time import monotonic
 import pytz # <-- ADICIONADO: Biblioteca para lidar com fusos horários
 
+from armazenamento import (
+    COLUNAS_CONFIG, COLUNAS_EVENTOS, COLUNAS_ITENS, COLUNAS_PEDIDOS, ContadoresProducao, DeduplicadorPedidos, FeedAlteracoes,
+    FilaPedidos, IndiceBusca, PlanilhaSobDemanda, ReservaEstoque, SheetsStore, SQLiteStore, formatar_itens, garantir_colunas
+)
+from eventos import EVENTO_PRINCIPAL, ConfigEventos, Evento, caminho_particao, nome_particao
+from metricas import Metricas
+from prazos import AgendaPrazos, ler_prazo
+from notificacoes import (
+    MODELO_PADRAO, ENVIADO, ExportacaoLinks, FALHOU, GatewayHTTP, LINK_GERADO, PipelineNotificacoes, RemetenteSimulado, link_whatsapp, montar_mensagem
+)
+# pandas (e cache_pedidos/relatorios, que dependem dele), gspread e google-auth são importados só
+# quando usados: a página de pedidos dos clientes não precisa de nenhum deles
+
 # Configurações iniciais do Streamlit
 st.set_page_config(page_title="Pedido Quentinhas - Congresso RCC/PI", page_icon="🍲", layout="wide")
 
@@ -21,6 +39,8 @@ except locale.Error:
 # ADICIONADO: Define o fuso horário correto (Brasil)
 FUSO_HORARIO_LOCAL = pytz.timezone("America/Sao_Paulo")
 
+# Cardápio, datas e pagamento do evento principal, gravados no catálogo de eventos
+# na primeira execução; depois disso os eventos são editados pelo painel.
 CARDAPIO = {
     "opcoes_principais": {
         "Isca (carne, frango e calabresa)": 20.00,
@@ -32,73 +52,181 @@ DATAS_DISPONIVEIS = {
     "Sábado (02/08/2025)": "2025-08-02",
     "Domingo (03/08/2025)": "2025-08-03"
 }
+PAGAMENTO = {
+    "pix_chave": "86988282470",
+    "pix_nome": "Lauriano Costa Viana",
+    "pix_banco": "Banco do Brasil",
+    "whatsapp": "86-98828-2470",
+}
+ACOMPANHAMENTOS = "Baião de dois, Macarrão, Farofa e Salada cozida"
+RESULTADOS_POR_PAGINA_RETIRADA = 10
+# Operações do backend de pedidos medidas pela página de Desempenho
+METODOS_STORE = [
+    "carregar_pedidos", "carregar_alteracoes", "carregar_itens", "adicionar_pedidos", "atualizar_pedido",
+    "atualizar_pedidos_em_lote", "atualizar_valores_em_lote", "carregar_configuracoes", "salvar_configuracao",
+    "carregar_eventos", "salvar_evento",
+]
+PEDIDOS_POR_PAGINA = 25
+# Colunas do modo tabela das listas de pedidos do painel
+COLUNAS_TABELA = ["ID", "Data/Hora", "Nome Cliente", "Telefone Cliente", "Itens Pedido", "Total Pedido", "Tipo Pagamento"]
 
 # --- Funções de Conexão com Google Sheets ---
 
+@st.cache_resource
+def get_metricas():
+    """Métricas de desempenho (durações e chamadas à API), compartilhadas por todas as sessões."""
+    return Metricas(sessao_ociosa=st.secrets.get("METRICAS_SESSAO_OCIOSA", 3600))
+
+def fragmento_medido(funcao):
+    """Conta os reruns só do fragmento como "fragmento" (e não como segundo plano) nas métricas da sessão."""
+    @wraps(funcao)
+    def medido(*args, **kwargs):
+        with get_metricas().fragmento(st.session_state.get("sessao_metricas", ""), funcao.__name__):
+            return funcao(*args, **kwargs)
+    return medido
+
 @st.cache_resource
 def connect_and_authorize():
     """Conecta e autoriza o acesso ao Google Sheets."""
-    scopes = ["https://www.googleapis.com/auth/spreadsheets"]
-    creds_dict = st.secrets["google_credentials"]
-    creds = Credentials.from_service_account_info(creds_dict, scopes=scopes)
-    client_gs = gspread.authorize(creds)
+    with get_metricas().medir("conexao"):
+        import gspread
+        from google.oauth2.service_account import Credentials
+        scopes = ["https://www.googleapis.com/auth/spreadsheets"]
+        creds_dict = st.secrets["google_credentials"]
+        creds = Credentials.from_service_account_info(creds_dict, scopes=scopes)
+        client_gs = gspread.authorize(creds)
     return client_gs
 
 @st.cache_resource
-def get_sheets(_client_gs):
-    """Obtém as planilhas 'Pedidos' e 'Configuracoes'."""
-    spreadsheet = _client_gs.open_by_key(st.secrets["GOOGLE_SHEETS_ID"])
-    
-    # Planilha de Pedidos
-    try:
-        sheet_pedidos = spreadsheet.worksheet("Pedidos")
-    except gspread.WorksheetNotFound:
-        sheet_pedidos = spreadsheet.add_worksheet(title="Pedidos", rows="100", cols="20")
-        headers = [
-            "ID", "Data/Hora", "Nome Cliente", "CPF", "Telefone Cliente", "Email",
-            "Itens Pedido", "Total Pedido", "Observacoes", "Tipo Pagamento",
-            "ID Transacao", "Status", "Aprovado por", "Valor Total Agrupado", "Entregue"
-        ]
-        sheet_pedidos.append_row(headers)
+def get_spreadsheet():
+    """Abre a planilha definida em GOOGLE_SHEETS_ID."""
+    return connect_and_authorize().open_by_key(st.secrets["GOOGLE_SHEETS_ID"])
 
-    # Planilha de Configurações
-    try:
-        sheet_config = spreadsheet.worksheet("Configuracoes")
-    except gspread.WorksheetNotFound:
-        sheet_config = spreadsheet.add_worksheet(title="Configuracoes", rows="10", cols="4")
-        sheet_config.append_row(["data_evento", "prazo_data", "prazo_hora", "nome_amigavel"])
+@st.cache_resource
+def get_sheets(evento=EVENTO_PRINCIPAL):
+    """Planilhas 'Pedidos', 'Configuracoes' e 'Itens' do evento (e 'Eventos', no evento principal).
+
+    Nenhuma chamada à API é feita aqui: cada planilha é aberta (e criada, se
+    faltar) no primeiro uso, ou antes disso pelo aquecimento em segundo plano.
+    """
+    sheets = (
+        PlanilhaSobDemanda(nome_particao("Pedidos", evento), lambda: _abrir_planilha(nome_particao("Pedidos", evento), COLUNAS_PEDIDOS, rows="100", cols="20")),
+        PlanilhaSobDemanda(nome_particao("Configuracoes", evento), lambda: _abrir_planilha(nome_particao("Configuracoes", evento), COLUNAS_CONFIG, rows="10", cols="5")),
+        PlanilhaSobDemanda(nome_particao("Itens", evento), lambda: _abrir_planilha(nome_particao("Itens", evento), COLUNAS_ITENS, rows="100", cols="5")),
+    )
+    # Catálogo de eventos (só na partição do evento principal)
+    if evento == EVENTO_PRINCIPAL:
+        sheets += (PlanilhaSobDemanda("Eventos", lambda: _abrir_planilha("Eventos", COLUNAS_EVENTOS, rows="20", cols=str(len(COLUNAS_EVENTOS)))),)
+    else:
+        sheets += (None,)
+    return sheets
+
+def _abrir_planilha(titulo, cabecalho, rows, cols):
+    """Abre a aba (criando-a com o cabeçalho, se não existir); as chamadas feitas por ela passam a ser medidas."""
+    import gspread
+    with get_metricas().medir("get_sheets"):
+        spreadsheet = get_spreadsheet()
+        try:
+            sheet = spreadsheet.worksheet(titulo)
+            if len(sheet.row_values(1)) < len(cabecalho):
+                # Planilhas criadas antes das colunas mais novas (ex: capacidades, Notificacao):
+                # a grade cresce antes do cabeçalho, senão a escrita passa do limite
+                garantir_colunas(sheet, len(cabecalho))
+                sheet.update(range_name="A1", values=[cabecalho])
+        except gspread.WorksheetNotFound:
+            sheet = spreadsheet.add_worksheet(title=titulo, rows=rows, cols=cols)
+            sheet.append_row(cabecalho)
+    # Toda chamada feita pela planilha daqui em diante é medida e contada
+    return get_metricas().instrumentar_planilha(sheet)
+
+def aquecer_planilhas(evento):
+    """Abre a conexão e as planilhas do evento em uma thread, sem bloquear a sessão atual."""
+    pendentes = [sheet for sheet in get_sheets(evento) if sheet is not None and not sheet.aberta]
+    if not pendentes:
+        return
 
-    return sheet_pedidos, sheet_config
+    def abrir_todas():
+        for sheet in pendentes:
+            try:
+                sheet.abrir()
+            except Exception:
+                # Tentado de novo no primeiro uso, na thread de quem precisar da planilha
+                pass
 
-client = connect_and_authorize()
-sheet, config_sheet = get_sheets(client)
+    thread = threading.Thread(target=abrir_todas, name=f"aquecer-{evento}", daemon=True)
+    add_script_run_ctx(thread)
+    thread.start()
 
-# --- Funções Utilitárias ---
+@st.cache_resource
+def get_store(evento=EVENTO_PRINCIPAL):
+    """Monta o backend de pedidos do evento, definido em BACKEND_PEDIDOS ('sqlite' por padrão, ou 'sheets')."""
+    # Cada leitura e escrita do backend é medida (só nesta instância; o espelho conta pelas planilhas)
+    return get_metricas().instrumentar(_criar_store(evento), METODOS_STORE, "store")
+
+def _criar_store(evento):
+    if st.secrets.get("BACKEND_PEDIDOS", "sqlite") == "sheets":
+        aquecer_planilhas(evento)
+        return SheetsStore(*get_sheets(evento))
+
+    # SQLite local (um arquivo por evento); o Google Sheets, se configurado, fica apenas como espelho
+    espelho = None
+    if "GOOGLE_SHEETS_ID" in st.secrets and st.secrets.get("ESPELHO_SHEETS", True):
+        espelho = SheetsStore(*get_sheets(evento))
+    store = SQLiteStore(caminho_particao(st.secrets.get("SQLITE_PATH", "dados/pedidos.db"), evento), espelho=espelho)
+    if espelho is not None and store.vazio():
+        # Primeira execução (ou disco efêmero): recupera os dados já gravados na planilha
+        store.importar_de(espelho)
+    elif espelho is not None:
+        # O espelho só é usado em segundo plano; a conexão é aberta sem segurar a primeira página
+        aquecer_planilhas(evento)
+    return store
 
-@st.cache_data(ttl=60) # Cache de 1 minuto para os prazos
-def get_deadlines():
-    """Busca e processa os prazos da planilha de configurações."""
-    records = config_sheet.get_all_records()
-    deadlines = {}
-    for record in records:
-        try:
-            deadline_str = f"{record['prazo_data']} {record['prazo_hora']}"
-            deadline_dt_naive = None # Variável para o datetime "ingênuo" (sem fuso)
-            
-            # Tenta múltiplos formatos de data que o Sheets pode retornar
-            try:
-                deadline_dt_naive = datetime.strptime(deadline_str, '%d/%m/%Y %H:%M:%S')
-            except ValueError:
-                 deadline_dt_naive = datetime.strptime(deadline_str, '%Y-%m-%d %H:%M:%S')
+@st.cache_resource
+def get_fila(evento):
+    """Fila de gravação dos pedidos dos clientes do evento (compartilhada por todas as sessões)."""
+    return FilaPedidos(get_store(evento), caminho_particao(st.secrets.get("FILA_PATH", "dados/fila_pedidos.db"), evento))
 
-            # CORRIGIDO: Converte o horário lido (que assumimos ser local) para um horário com fuso definido
-            if deadline_dt_naive:
-                deadline_dt_aware = FUSO_HORARIO_LOCAL.localize(deadline_dt_naive)
-                deadlines[record['data_evento']] = deadline_dt_aware
+@st.cache_resource
+def get_deduplicador(evento):
+    """Chaves de idempotência dos envios de pedido do evento, válidas por JANELA_DEDUP segundos."""
+    return DeduplicadorPedidos(
+        caminho_particao(st.secrets.get("DEDUP_PATH", "dados/envios_pedidos.db"), evento),
+        janela=st.secrets.get("JANELA_DEDUP", 600),
+    )
+
+@st.cache_resource
+def get_config_eventos():
+    """Catálogo de eventos em memória, relido do backend principal a cada CACHE_TTL_EVENTOS segundos."""
+    padrao = Evento(
+        EVENTO_PRINCIPAL, "Congresso RCC Piauí", CARDAPIO["opcoes_principais"], DATAS_DISPONIVEIS,
+        PAGAMENTO, ACOMPANHAMENTOS
+    )
+    return ConfigEventos(get_store(), padrao, ttl=st.secrets.get("CACHE_TTL_EVENTOS", 60))
 
-        except (ValueError, KeyError):
-            continue
-    return deadlines
+# --- Funções Utilitárias ---
+
+@st.cache_resource
+def get_agenda(evento):
+    """Prazos do evento já convertidos (com fuso), atualizados ao salvar no painel e relidos a cada CACHE_TTL_PRAZOS segundos."""
+    agenda = AgendaPrazos(get_store(evento), FUSO_HORARIO_LOCAL, ttl=st.secrets.get("CACHE_TTL_PRAZOS", 60))
+    return get_metricas().instrumentar(agenda, ["recarregar"], "prazos")
+
+def chave_envio(pedidos_finais, nome, telefone, pagamento, observacoes):
+    """Chave de idempotência do envio: sessão, nº do pedido na sessão, evento e conteúdo do carrinho.
+
+    Reenvios do mesmo formulário (clique duplo, rerun durante a gravação)
+    geram a mesma chave; "Fazer um Novo Pedido" muda o nº e libera um
+    pedido idêntico de propósito.
+    """
+    carrinho = sorted(
+        (data, sorted((item['nome'], item['qtd']) for item in detalhes["itens_obj"]))
+        for data, detalhes in pedidos_finais.items()
+    )
+    conteudo = json.dumps([
+        st.session_state.sessao_metricas, st.session_state.get('envios_sessao', 0), EVENTO.id,
+        carrinho, nome.strip().lower(), telefone, pagamento, observacoes.strip(),
+    ], ensure_ascii=False)
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
 
 def autenticar_admin():
     st.subheader("🔐 Login de Administrador")
@@ -112,38 +240,20 @@ def autenticar_admin():
         else:
             st.error("Credenciais inválidas.")
 
-def gerar_link_whatsapp(telefone, mensagem):
-    """Gera o link do WhatsApp com a mensagem pré-formatada"""
-    telefone = ''.join(filter(str.isdigit, str(telefone)))
-    if telefone and not telefone.startswith('55'):
-        telefone = '55' + telefone
-    return f"https://wa.me/{telefone}?text={urllib.parse.quote(mensagem)}"
-
 def notificar_cliente(pedido_id, nome_cliente, telefone_cliente, data_pedido, itens_pedido):
     """Função para gerar e exibir o link de notificação do WhatsApp com a comanda simplificada"""
     
-    data_formatada = data_pedido.strftime('%A, %d/%m').upper()
-    itens_formatados = "- " + itens_pedido.replace(", ", "\n- ")
-
-    mensagem = (
-        f"*Congresso RCC Piauí - Comprovante de Quentinha* 🍲\n\n"
-        f"Olá, {nome_cliente}!\n"
-        f"Seu pedido foi APROVADO!\n\n"
-        f"*Nº do Pedido:* #{pedido_id}\n"
-        f"*Data:* {data_formatada}\n"
-        f"*Itens:*\n{itens_formatados}\n\n"
-        f"Apresente esta mensagem no local de retirada. Bom apetite!"
-    )
-    
-    link_whatsapp = gerar_link_whatsapp(telefone_cliente, mensagem)
+    # itens_pedido: itens estruturados do pedido (dicionários com Item e Quantidade)
+    mensagem = montar_mensagem(MODELO_PADRAO, EVENTO.nome, pedido_id, nome_cliente, data_pedido, itens_pedido)
+    link = link_whatsapp(telefone_cliente, mensagem)
     
     st.markdown("### Notificação ao Cliente")
     st.markdown(f"**Mensagem pronta:**")
     st.text_area("Preview da Mensagem", value=mensagem, height=250, disabled=True)
-    st.markdown(f"[👉 Clique aqui para enviar mensagem no WhatsApp]({link_whatsapp})", unsafe_allow_html=True)
-    st.markdown(f"**Link completo:** `{link_whatsapp}`")
+    st.markdown(f"[👉 Clique aqui para enviar mensagem no WhatsApp]({link})", unsafe_allow_html=True)
+    st.markdown(f"**Link completo:** `{link}`")
     
-    return link_whatsapp
+    return link
 
 # --- Página de Pedidos (Usuário) ---
 
@@ -156,6 +266,9 @@ def pagina_pedidos():
 
     if st.session_state.pedido_finalizado:
         st.success("Pedido(s) registrado(s) com sucesso!\n\nVocê receberá uma confirmação via WhatsApp após aprovação.")
+        ids_registrados = st.session_state.get('ids_registrados', [])
+        if ids_registrados:
+            st.markdown("**Nº do(s) pedido(s):** " + ", ".join(f"`#{i}`" for i in ids_registrados))
         st.balloons()
         st.markdown("---")
         st.subheader("⚠️ Próximo Passo para Aprovar seu Pedido")
@@ -163,38 +276,46 @@ def pagina_pedidos():
         ultimo_pagamento = st.session_state.get('ultimo_pagamento')
 
         if ultimo_pagamento == "Pix":
+            pagamento = EVENTO.pagamento
             st.info(
                 "**LEMBRETE IMPORTANTE (PIX):**\n\n"
-                "Para que seu pedido seja APROVADO, você precisa enviar o comprovante de pagamento junto com seu nome completo para o WhatsApp **86-98828-2470**.\n\n"
-                "**Chave PIX:** `86988282470`\n"
-                "**Nome:** Lauriano Costa Viana\n"
-                "**Instituição:** Banco do Brasil"
+                f"Para que seu pedido seja APROVADO, você precisa enviar o comprovante de pagamento junto com seu nome completo para o WhatsApp **{pagamento.get('whatsapp', '')}**.\n\n"
+                f"**Chave PIX:** `{pagamento.get('pix_chave', '')}`\n"
+                f"**Nome:** {pagamento.get('pix_nome', '')}\n"
+                f"**Instituição:** {pagamento.get('pix_banco', '')}"
             )
         elif ultimo_pagamento == "Dinheiro":
             st.warning("**LEMBRETE IMPORTANTE (DINHEIRO):**\n\nPara que seu pedido seja APROVADO, dirija-se ao caixa do evento para efetuar o pagamento.")
         
         if st.button("➕ Fazer um Novo Pedido"):
             st.session_state.pedido_finalizado = False
+            st.session_state.envios_sessao = st.session_state.get('envios_sessao', 0) + 1
             if 'carrinho' in st.session_state: del st.session_state.carrinho
             if 'ultimo_pagamento' in st.session_state: del st.session_state.ultimo_pagamento
+            if 'ids_registrados' in st.session_state: del st.session_state.ids_registrados
             st.rerun()
         return
 
     # --- Lógica de Prazos ---
-    deadlines = get_deadlines()
-    # CORRIGIDO: Pega a hora atual com o fuso horário correto
-    now = datetime.now(FUSO_HORARIO_LOCAL)
+    agenda = get_agenda(EVENTO.id)
+    # Mesmo relógio (com fuso) usado para validar o envio
+    now = agenda.agora()
     
     DATAS_EXIBICAO = {}
-    for nome_original, valor_data in DATAS_DISPONIVEIS.items():
+    for nome_original, valor_data in EVENTO.datas.items():
         data_obj = datetime.strptime(valor_data, '%Y-%m-%d')
         dia_semana = nome_original.split(' ')[0]
         data_formatada = data_obj.strftime('%d/%m/%Y')
         texto_final_exibicao = f"{dia_semana} ({data_formatada})"
         DATAS_EXIBICAO[texto_final_exibicao] = valor_data
 
+    # O cardápio ou as datas podem ter mudado (outra versão do catálogo ou outro evento): refaz o carrinho
+    versao_carrinho = (EVENTO.id, get_config_eventos().versao)
+    if st.session_state.get('versao_carrinho') != versao_carrinho:
+        st.session_state.pop('carrinho', None)
+        st.session_state.versao_carrinho = versao_carrinho
     if 'carrinho' not in st.session_state:
-        st.session_state.carrinho = {data_valor: {opcao: 0 for opcao in CARDAPIO["opcoes_principais"]} for data_valor in DATAS_EXIBICAO.values()}
+        st.session_state.carrinho = {data_valor: {opcao: 0 for opcao in EVENTO.cardapio} for data_valor in DATAS_EXIBICAO.values()}
 
     st.subheader("1. Para quais dias você quer agendar?")
     
@@ -202,7 +323,7 @@ def pagina_pedidos():
     datas_para_pedir = []
 
     for nome_data_formatado, valor_data in DATAS_EXIBICAO.items():
-        deadline = deadlines.get(valor_data)
+        deadline = agenda.prazo(valor_data)
         
         # A comparação agora é feita entre dois horários "cientes" do fuso
         if deadline and now > deadline:
@@ -229,7 +350,9 @@ def pagina_pedidos():
 
     grand_total = 0
     pedidos_finais = {}
-    st.info("**Atenção:** Todas as opções acompanham Baião de dois, Macarrão, Farofa e Salada cozida.")
+    reserva = get_reserva(EVENTO.id)
+    if EVENTO.acompanhamentos:
+        st.info(f"**Atenção:** Todas as opções acompanham {EVENTO.acompanhamentos}.")
 
     for data_pedido in datas_para_pedir:
         nome_amigavel_data = [nome for nome, valor in DATAS_EXIBICAO.items() if valor == data_pedido][0]
@@ -237,18 +360,25 @@ def pagina_pedidos():
         st.subheader(f"🛒 Pedido para: {nome_amigavel_data}")
         total_dia = 0
         itens_dia_obj = []
-        for opcao, preco in CARDAPIO["opcoes_principais"].items():
+        for opcao, preco in EVENTO.cardapio.items():
+            disponivel = reserva.disponivel(data_pedido, opcao)
             col1, col2 = st.columns([3, 1])
             with col1:
-                st.markdown(f"**{opcao}** - R$ {preco:.2f}")
+                if disponivel == 0:
+                    st.markdown(f"**{opcao}** - R$ {preco:.2f} - ❌ **Esgotado**")
+                elif disponivel is not None and disponivel <= 20:
+                    st.markdown(f"**{opcao}** - R$ {preco:.2f} - ⚠️ restam {disponivel}")
+                else:
+                    st.markdown(f"**{opcao}** - R$ {preco:.2f}")
             with col2:
                 st.session_state.carrinho[data_pedido][opcao] = st.number_input(
-                    "Qtd", min_value=0, max_value=20, step=1, key=f"qtd_{opcao}_{data_pedido}", label_visibility="collapsed"
+                    "Qtd", min_value=0, max_value=20, step=1, key=f"qtd_{opcao}_{data_pedido}", label_visibility="collapsed",
+                    disabled=disponivel == 0 and not st.session_state.get(f"qtd_{opcao}_{data_pedido}")
                 )
 
         for opcao, quantidade in st.session_state.carrinho[data_pedido].items():
             if quantidade > 0:
-                total_dia += quantidade * CARDAPIO["opcoes_principais"][opcao]
+                total_dia += quantidade * EVENTO.cardapio[opcao]
                 itens_dia_obj.append({"nome": opcao, "qtd": quantidade})
 
         st.markdown(f"<p style='text-align: right; font-weight: bold;'>Subtotal para {nome_amigavel_data}: R$ {total_dia:.2f}</p>", unsafe_allow_html=True)
@@ -270,7 +400,11 @@ def pagina_pedidos():
         )
 
         if tipo_pagamento == "Pix":
-            st.info("🔑 **Chave PIX:** `86988282470`\n\n👤 **Lauriano Costa Viana - Banco do Brasil**\n\n📨 Após finalizar, envie o seu nome completo e o comprovante para 86-98828-2470 via WhatsApp para ter seu pedido APROVADO.")
+            pagamento = EVENTO.pagamento
+            st.info(
+                f"🔑 **Chave PIX:** `{pagamento.get('pix_chave', '')}`\n\n👤 **{pagamento.get('pix_nome', '')} - {pagamento.get('pix_banco', '')}**\n\n"
+                f"📨 Após finalizar, envie o seu nome completo e o comprovante para {pagamento.get('whatsapp', '')} via WhatsApp para ter seu pedido APROVADO."
+            )
         else:
             st.info("💵 Após finalizar, dirija-se ao caixa do evento para realizar o pagamento e ter seu pedido APROVADO.")
 
@@ -287,104 +421,704 @@ def pagina_pedidos():
                 elif len(numeros_telefone) != 11:
                     st.warning(f"O número '{telefone_cliente}' parece inválido. Por favor, insira um celular com DDD (11 dígitos). Ex: 86999998888")
                 else:
-                    with st.spinner('Registrando seu pedido, por favor aguarde...'):
-                        # CORRIGIDO: Pega a hora atual com fuso para registrar na planilha
-                        hora_atual_local = datetime.now(FUSO_HORARIO_LOCAL).strftime('%H:%M:%S')
-                        for data_pedido, detalhes in pedidos_finais.items():
-                            id_por_data = f"{data_pedido.replace('-', '')}-{uuid.uuid4().hex[:6].upper()}"
-                            itens_fmt = ", ".join([f"[{item['qtd']}x] {item['nome']}" for item in detalhes["itens_obj"]])
-                            new_order_data = [
-                                id_por_data, f"{data_pedido} {hora_atual_local}",
-                                nome_cliente, "", numeros_telefone, "",
-                                itens_fmt, f"{detalhes['total']:.2f}",
-                                observacoes, tipo_pagamento, "", "Pendente", "",
-                                f"{grand_total:.2f}", ""
-                            ]
-                            sheet.append_row(new_order_data, value_input_option='USER_ENTERED')
-                    
-                    st.session_state.ultimo_pagamento = tipo_pagamento
-                    st.session_state.pedido_finalizado = True
-                    st.rerun()
+                    registrar_envio(pedidos_finais, DATAS_EXIBICAO, reserva, nome_cliente, numeros_telefone,
+                                    observacoes, tipo_pagamento, grand_total)
+
+def registrar_envio(pedidos_finais, datas_exibicao, reserva, nome_cliente, numeros_telefone,
+                    observacoes, tipo_pagamento, grand_total):
+    """Reserva a capacidade e enfileira os pedidos do carrinho, uma única vez por chave de envio."""
+    ids = {data_pedido: f"{data_pedido.replace('-', '')}-{uuid.uuid4().hex[:6].upper()}" for data_pedido in pedidos_finais}
+    chave = chave_envio(pedidos_finais, nome_cliente, numeros_telefone, tipo_pagamento, observacoes)
+    deduplicador = get_deduplicador(EVENTO.id)
+    anteriores = deduplicador.registrar(chave, list(ids.values()))
+    if anteriores is not None:
+        # Reenvio do mesmo carrinho: o pedido já foi registrado, só mostra a confirmação de novo
+        st.session_state.ids_registrados = anteriores
+        st.session_state.ultimo_pagamento = tipo_pagamento
+        st.session_state.pedido_finalizado = True
+        st.rerun()
+
+    # O formulário pode ter sido aberto antes do prazo: confere de novo no momento da gravação
+    agora = get_agenda(EVENTO.id).agora()
+    if encerradas := get_agenda(EVENTO.id).fechadas(pedidos_finais, agora):
+        deduplicador.liberar(chave)
+        nomes_datas = {valor: nome for nome, valor in datas_exibicao.items()}
+        st.error("O prazo de pedidos terminou enquanto você preenchia o formulário:\n\n" + "\n".join(
+            f"- {nomes_datas.get(data, data)}" for data in encerradas
+        ) + "\n\nDesmarque essa(s) data(s) para enviar o restante.")
+        return
+
+    quantidades = {
+        data_pedido: {item['nome']: item['qtd'] for item in detalhes["itens_obj"]}
+        for data_pedido, detalhes in pedidos_finais.items()
+    }
+    if faltas := reserva.reservar(quantidades, ids):
+        # A reserva é tudo ou nada: nenhum item foi reservado
+        deduplicador.liberar(chave)
+        nomes_datas = {valor: nome for nome, valor in datas_exibicao.items()}
+        st.error("Não há quentinhas suficientes para o seu pedido:\n\n" + "\n".join(
+            f"- {prato} ({nomes_datas.get(data, data)}): restam {restam}" for data, prato, restam in faltas
+        ))
+        return
+
+    # A hora registrada é a mesma usada na validação do prazo
+    hora_atual_local = agora.strftime('%H:%M:%S')
+    novas_linhas, novos_itens = [], []
+    for data_pedido, detalhes in pedidos_finais.items():
+        id_por_data = ids[data_pedido]
+        itens_pedido = [
+            {"ID Pedido": id_por_data, "Data": data_pedido, "Item": item['nome'],
+             "Quantidade": item['qtd'], "Preco Unitario": EVENTO.cardapio[item['nome']]}
+            for item in detalhes["itens_obj"]
+        ]
+        # O texto de "Itens Pedido" serve só para exibição; os relatórios usam os itens estruturados
+        itens_fmt = formatar_itens(itens_pedido)
+        new_order_data = [
+            id_por_data, f"{data_pedido} {hora_atual_local}",
+            nome_cliente, "", numeros_telefone, "",
+            itens_fmt, f"{detalhes['total']:.2f}",
+            observacoes, tipo_pagamento, "", "Pendente", "",
+            f"{grand_total:.2f}", "", ""
+        ]
+        novas_linhas.append(new_order_data)
+        novos_itens.extend(itens_pedido)
+    # A gravação no backend acontece em segundo plano, em lote
+    try:
+        get_fila(EVENTO.id).enfileirar(novas_linhas, novos_itens)
+    except Exception:
+        # Nada foi registrado: devolve a capacidade e deixa o cliente tentar de novo
+        reserva.liberar(ids.values())
+        deduplicador.liberar(chave)
+        raise
+
+    st.session_state.ids_registrados = [linha[0] for linha in novas_linhas]
+    st.session_state.ultimo_pagamento = tipo_pagamento
+    st.session_state.pedido_finalizado = True
+    st.rerun()
 
 # --- Página de Administração ---
 
+@st.cache_resource
+def get_contadores(evento):
+    """Contadores de produção da cozinha do evento, compartilhados por todas as sessões."""
+    return ContadoresProducao(get_store(evento))
+
+@st.cache_resource
+def get_reserva(evento):
+    """Capacidade por data e prato do evento, com reserva atômica (compartilhada por todas as sessões).
+
+    Os contadores vêm antes da fila: um pedido gravado entre as duas leituras já está nos contadores.
+    """
+    return ReservaEstoque(get_store(evento), get_contadores(evento), get_fila(evento))
+
+@st.cache_resource
+def get_indice_busca(evento):
+    """Índice de busca do balcão de retirada (nome, telefone e ID) do evento, compartilhado pelas sessões."""
+    return IndiceBusca(get_store(evento))
+
+@st.cache_resource
+def get_cache_pedidos(evento):
+    """DataFrame de pedidos do evento compartilhado pelas sessões, sincronizado de forma incremental."""
+    from cache_pedidos import CachePedidos
+    cache = CachePedidos(get_store(evento), ttl=st.secrets.get("CACHE_TTL_PEDIDOS", 30))
+    # recarregar/_sincronizar incluem a montagem do frame (pd.to_datetime)
+    return get_metricas().instrumentar(cache, ["recarregar", "_sincronizar", "itens"], "cache")
+
+@st.cache_resource
+def get_feed(evento):
+    """Feed das gravações de pedidos do evento, lido pelas sessões do painel para se atualizarem sozinhas."""
+    # Os ouvintes são chamados na ordem de registro: as visões do painel vêm antes, então quando o feed
+    # avisa uma sessão, o frame, os contadores e o índice de busca já estão atualizados
+    get_cache_pedidos(evento)
+    get_contadores(evento)
+    get_indice_busca(evento)
+    return FeedAlteracoes(get_store(evento))
+
+def avisar_alteracoes():
+    """Mostra, uma vez, o que mudou no feed desde a última passada desta sessão."""
+    feed = get_feed(EVENTO.id)
+    alteracoes = feed.desde(st.session_state.get("feed_seq", 0))
+    if not alteracoes:
+        if alteracoes is None:
+            st.session_state.feed_seq = feed.seq
+        return
+    st.session_state.feed_seq = alteracoes[-1].seq
+    novos = sum(len(a.ids) for a in alteracoes if a.tipo == "adicionados")
+    alterados = len({pid for a in alteracoes if a.tipo == "atualizados" for pid in a.ids})
+    partes = ([f"{novos} pedido(s) novo(s)"] if novos else []) + ([f"{alterados} pedido(s) alterado(s)"] if alterados else [])
+    st.toast("Atualizado: " + ", ".join(partes), icon="🔄")
+
+def frame_ao_vivo(chave, filtros, filtrar):
+    """Pedidos de uma lista ao vivo, refiltrados só quando algo mudou.
+
+    O resultado fica na sessão com o `seq` do feed em que foi montado; nas
+    passadas sem alteração no feed, com os mesmos `filtros` e dentro do
+    CACHE_TTL_PEDIDOS (que traz o que foi editado direto na planilha), o
+    fragmento redesenha a partir dele, sem ler nem filtrar o frame.
+    """
+    feed = get_feed(EVENTO.id)
+    cache = get_cache_pedidos(EVENTO.id)
+    filtros = (EVENTO.id, *filtros)
+    anterior = st.session_state.get(f"{chave}_ao_vivo")
+    if anterior is not None:
+        seq, filtros_anteriores, montado_em, df = anterior
+        if filtros_anteriores == filtros and monotonic() - montado_em < cache.ttl and feed.desde(seq) == []:
+            return df
+    # O seq é lido antes do frame: o que vier depois dele aparece na próxima passada
+    seq = feed.seq
+    df = filtrar(cache.frame())
+    st.session_state[f"{chave}_ao_vivo"] = (seq, filtros, monotonic(), df)
+    return df
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def get_duplicados(evento, seq, total):
+    """Prováveis duplicados do evento, recalculados só quando o feed (`seq`) ou o número de pedidos muda."""
+    from relatorios import itens_dos_pedidos, provaveis_duplicados
+    cache = get_cache_pedidos(evento)
+    df = cache.frame()
+    return provaveis_duplicados(df, itens_dos_pedidos(df, cache.itens()))
+
+@st.cache_resource
+def get_historico(evento):
+    """Snapshots periódicos dos pedidos do evento para o histórico em Parquet (HISTORICO_PATH)."""
+    from historico import ExportadorHistorico
+    exportador = ExportadorHistorico(
+        get_cache_pedidos(evento), get_store(evento), evento, st.secrets.get("HISTORICO_PATH", "dados/historico"),
+        intervalo=st.secrets.get("HISTORICO_INTERVALO", 3600),
+    )
+    get_metricas().instrumentar(exportador, ["snapshot"], "historico")
+    exportador.iniciar()
+    return exportador
+
+def painel_cozinha():
+    """Quantidades a preparar por data e prato, lidas dos contadores (sem consultar os pedidos)."""
+    contadores = get_contadores(EVENTO.id)
+    st.caption(f"Atualizado às {datetime.now(FUSO_HORARIO_LOCAL).strftime('%H:%M:%S')}")
+    for nome_data, valor_data in EVENTO.datas.items():
+        aprovados = contadores.quantidades(valor_data, "Aprovado")
+        pendentes = contadores.quantidades(valor_data, "Pendente")
+        pratos = list(EVENTO.cardapio)
+        pratos += sorted((set(aprovados) | set(pendentes)) - set(pratos))
+
+        st.subheader(f"🍽️ {nome_data}")
+        for coluna, prato in zip(st.columns(len(pratos)), pratos):
+            coluna.metric(prato, aprovados.get(prato, 0), f"+{pendentes.get(prato, 0)} pendentes", delta_color="off")
+        st.markdown(f"**Total aprovado:** {sum(aprovados.values())} | **Pendentes de pagamento:** {sum(pendentes.values())}")
+
+@st.fragment
+@fragmento_medido
+def painel_retirada():
+    """Busca do balcão de retirada; digitar, paginar ou entregar redesenha só este fragmento."""
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        consulta = st.text_input("Nome, final do telefone ou nº do pedido", key="retirada_busca", placeholder="Ex: maria, 8888 ou A1B2C3")
+    with col2:
+        data_retirada = st.date_input("Data", value=datetime.now(FUSO_HORARIO_LOCAL), key="retirada_data", format="DD/MM/YYYY")
+    somente_a_entregar = st.toggle("Somente aprovados ainda não entregues", value=True, key="retirada_filtro")
+
+    if not consulta.strip():
+        st.info("Digite o nome, o final do telefone ou o número do pedido do cliente.")
+        return
+
+    # Nova busca volta para a primeira página
+    if st.session_state.get("retirada_ultima_busca") != consulta:
+        st.session_state.retirada_ultima_busca = consulta
+        st.session_state.retirada_pagina = 0
+    pagina = st.session_state.get("retirada_pagina", 0)
+
+    filtro = (lambda p: p["Status"] == "Aprovado" and p["Entregue"] != "Sim") if somente_a_entregar else None
+    total, resultados = get_indice_busca(EVENTO.id).buscar(
+        consulta, data=data_retirada.strftime('%Y-%m-%d'), filtro=filtro,
+        limite=RESULTADOS_POR_PAGINA_RETIRADA, pagina=pagina
+    )
+    if total == 0:
+        st.warning("Nenhum pedido encontrado.")
+        return
+
+    total_paginas = (total + RESULTADOS_POR_PAGINA_RETIRADA - 1) // RESULTADOS_POR_PAGINA_RETIRADA
+    st.caption(f"{total} pedido(s) encontrado(s) - página {pagina + 1} de {total_paginas}")
+    for pedido in resultados:
+        col_id, col_itens, col_acao = st.columns([2, 4, 1])
+        col_id.markdown(f"**#{pedido['ID']}**  \n{pedido['Nome Cliente']}")
+        entregue = " - ✅ Entregue" if pedido['Entregue'] == "Sim" else ""
+        col_itens.markdown(f"{pedido['Itens Pedido']}  \nStatus: {pedido['Status']}{entregue}")
+        if pedido['Status'] == "Aprovado" and pedido['Entregue'] != "Sim":
+            if col_acao.button("Entregar", key=f"retirada_{pedido['ID']}", type="primary"):
+                if store.atualizar_pedido(pedido['ID'], "Entregue", "Sim"):
+                    st.toast(f"Pedido #{pedido['ID']} entregue!")
+                else:
+                    st.error(f"Não foi possível encontrar o pedido #{pedido['ID']}.")
+                st.rerun(scope="fragment")
+
+    if total_paginas > 1:
+        col_ant, col_prox = st.columns(2)
+        if col_ant.button("◀ Anterior", key="retirada_anterior", disabled=pagina == 0):
+            st.session_state.retirada_pagina = pagina - 1
+            st.rerun(scope="fragment")
+        if col_prox.button("Próxima ▶", key="retirada_proxima", disabled=pagina + 1 >= total_paginas):
+            st.session_state.retirada_pagina = pagina + 1
+            st.rerun(scope="fragment")
+
+def extrair_ids(texto):
+    """Separa uma lista de IDs colada (um por linha ou separados por vírgula, com ou sem '#')."""
+    return [t.lstrip('#') for t in re.split(r'[\s,;]+', texto or "") if t.lstrip('#')]
+
+def aplicar_em_lote(pedido_ids, coluna, valor, status_exigido=None):
+    """Grava a mesma alteração em vários pedidos de uma só vez e retorna o resultado por ID."""
+    import pandas as pd
+    df = get_cache_pedidos(EVENTO.id).frame()
+    valores_atuais, status_atuais = {}, {}
+    if not df.empty:
+        ids_df = df['ID'].astype(str)
+        if coluna in df.columns:
+            valores_atuais = dict(zip(ids_df, df[coluna].astype(str)))
+        status_atuais = dict(zip(ids_df, df['Status'].astype(str)))
+
+    resultados, para_gravar = {}, []
+    for pid in pedido_ids:
+        if valores_atuais.get(pid) == valor:
+            resultados[pid] = f"Sem alteração (já estava '{valor}')"
+        elif status_exigido and pid in status_atuais and status_atuais[pid] != status_exigido:
+            resultados[pid] = f"Ignorado (status '{status_atuais[pid]}')"
+        else:
+            para_gravar.append(pid)
+
+    gravados = store.atualizar_pedidos_em_lote(para_gravar, coluna, valor) if para_gravar else {}
+    for pid, ok in gravados.items():
+        resultados[pid] = "✅ Atualizado" if ok else "❌ Não encontrado"
+    return pd.DataFrame({"ID": list(pedido_ids), "Resultado": [resultados[pid] for pid in pedido_ids]})
+
+def painel_lote(df_candidatos, chave, coluna, valor, rotulo_botao, status_exigido=None):
+    """Seleção múltipla (ou lista de IDs colada) gravada de uma vez, com relatório por pedido."""
+    opcoes = df_candidatos['ID'].astype(str).tolist()
+    nomes = dict(zip(opcoes, df_candidatos['Nome Cliente'].astype(str)))
+    selecionados = st.multiselect(
+        "Selecionar pedidos", opcoes, format_func=lambda i: f"#{i} - {nomes.get(i, '')}", key=f"lote_sel_{chave}"
+    )
+    colados = st.text_area("Ou cole uma lista de IDs (um por linha ou separados por vírgula)", key=f"lote_txt_{chave}", height=100)
+    ids = list(dict.fromkeys(selecionados + extrair_ids(colados)))
+
+    if st.button(f"{rotulo_botao} ({len(ids)})", key=f"lote_btn_{chave}", type="primary", disabled=not ids):
+        with st.spinner("Gravando alterações..."):
+            st.session_state[f"lote_relatorio_{chave}"] = aplicar_em_lote(ids, coluna, valor, status_exigido)
+        del st.session_state[f"lote_sel_{chave}"]
+        del st.session_state[f"lote_txt_{chave}"]
+        st.rerun()
+
+    relatorio = st.session_state.get(f"lote_relatorio_{chave}")
+    if relatorio is not None:
+        st.markdown(f"**Último lote:** {(relatorio['Resultado'] == '✅ Atualizado').sum()} de {len(relatorio)} pedido(s) atualizado(s).")
+        st.dataframe(relatorio, hide_index=True)
+
+def detalhes_pendente(row):
+    """Detalhes e ações de um pedido pendente (desenhados só quando o pedido é aberto)."""
+    import pandas as pd
+    from relatorios import itens_dos_pedidos
+    data_formatada = row['Data/Hora'].strftime('%d/%m/%Y %H:%M:%S') if pd.notna(row['Data/Hora']) else "Data inválida"
+    st.write(f"**Data/Hora:** {data_formatada}")
+    st.write(f"**Itens:** {row['Itens Pedido']}")
+    st.write(f"**Telefone:** {row['Telefone Cliente']}")
+    st.write(f"**Pagamento:** {row['Tipo Pagamento']}")
+    st.write(f"**Observações:** {row['Observacoes'] or 'Nenhuma'}")
+
+    st.markdown("---")
+    col_btn1, col_btn2 = st.columns(2)
+
+    with col_btn1:
+        if st.button("Gerar Notificação (WhatsApp)", key=f"notify_{row['ID']}"):
+            st.session_state[f"show_notify_{row['ID']}"] = True
+    with col_btn2:
+        if st.button("Aprovar Pedido e Remover", key=f"approve_{row['ID']}", type="primary"):
+            if store.atualizar_pedido(row['ID'], "Status", "Aprovado"):
+                st.success(f"Pedido #{row['ID']} aprovado! A lista será atualizada.")
+                if f"show_notify_{row['ID']}" in st.session_state: del st.session_state[f"show_notify_{row['ID']}"]
+                st.rerun()
+            else:
+                st.error(f"Não foi possível encontrar o pedido #{row['ID']} na planilha para aprovação.")
+
+    if st.session_state.get(f"show_notify_{row['ID']}", False):
+        with st.container(border=True):
+            df = get_cache_pedidos(EVENTO.id).frame()
+            notificar_cliente(
+                pedido_id=row['ID'], nome_cliente=row['Nome Cliente'],
+                telefone_cliente=row['Telefone Cliente'], data_pedido=row['Data/Hora'],
+                itens_pedido=itens_dos_pedidos(df[df['ID'] == row['ID']], get_cache_pedidos(EVENTO.id).itens()).to_dict('records')
+            )
+            if st.button("Ocultar Notificação", key=f"hide_{row['ID']}"):
+                del st.session_state[f"show_notify_{row['ID']}"]
+                st.rerun(scope="fragment")
+
+def detalhes_entrega(row):
+    """Detalhes e botão de entrega de um pedido aprovado (desenhados só quando o pedido é aberto)."""
+    import pandas as pd
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        data_formatada = row['Data/Hora'].strftime('%d/%m/%Y %H:%M:%S') if pd.notna(row['Data/Hora']) else "N/A"
+        st.write(f"**Data/Hora:** {data_formatada}")
+        st.write(f"**Itens:** {row['Itens Pedido']}")
+        st.write(f"**Telefone:** {row['Telefone Cliente']}")
+    with col2:
+        if st.button(f"Marcar como Entregue", key=f"entregue_{row['ID']}"):
+            if store.atualizar_pedido(row['ID'], "Entregue", "Sim"):
+                st.success(f"Pedido #{row['ID']} marcado como entregue!")
+                st.rerun()
+            else:
+                st.error(f"Não foi possível encontrar o pedido #{row['ID']} na planilha.")
+
+@st.fragment
+@fragmento_medido
+def lista_paginada(df_lista, chave, detalhes, titulo):
+    """Lista de pedidos paginada; trocar de página ou abrir um pedido redesenha só este fragmento.
+
+    No modo lista só a página visível é desenhada e os widgets de um pedido
+    (`detalhes`) só são criados quando ele é aberto. O modo tabela mostra
+    todos os resultados em um st.dataframe, com os detalhes das linhas
+    selecionadas abaixo.
+    """
+    modo = st.radio("Exibição", ["Lista", "Tabela"], horizontal=True, key=f"{chave}_modo")
+
+    if modo == "Tabela":
+        colunas = [c for c in COLUNAS_TABELA if c in df_lista.columns]
+        evento = st.dataframe(
+            df_lista[colunas], hide_index=True, on_select="rerun", selection_mode="multi-row", key=f"{chave}_tabela",
+            column_config={"Data/Hora": st.column_config.DatetimeColumn(format="DD/MM/YYYY HH:mm")}
+        )
+        for posicao in evento.selection.rows[:PEDIDOS_POR_PAGINA]:
+            row = df_lista.iloc[posicao]
+            with st.container(border=True):
+                st.markdown(f"**{titulo(row)}**")
+                detalhes(row)
+        return
+
+    # Filtros ou ordenação diferentes voltam para a primeira página
+    assinatura = (len(df_lista), tuple(df_lista['ID'].astype(str).head(PEDIDOS_POR_PAGINA)))
+    if st.session_state.get(f"{chave}_assinatura") != assinatura:
+        st.session_state[f"{chave}_assinatura"] = assinatura
+        st.session_state[f"{chave}_pagina"] = 0
+    total_paginas = max((len(df_lista) + PEDIDOS_POR_PAGINA - 1) // PEDIDOS_POR_PAGINA, 1)
+    pagina = min(st.session_state.get(f"{chave}_pagina", 0), total_paginas - 1)
+    aberto = st.session_state.get(f"{chave}_aberto")
+
+    for _, row in df_lista.iloc[pagina * PEDIDOS_POR_PAGINA:(pagina + 1) * PEDIDOS_POR_PAGINA].iterrows():
+        pid = str(row['ID'])
+        if st.button(("▾ " if pid == aberto else "▸ ") + titulo(row), key=f"{chave}_abrir_{pid}"):
+            st.session_state[f"{chave}_aberto"] = None if pid == aberto else pid
+            st.rerun(scope="fragment")
+        if pid == aberto:
+            with st.container(border=True):
+                detalhes(row)
+
+    if total_paginas > 1:
+        st.caption(f"Página {pagina + 1} de {total_paginas}")
+        col_ant, col_prox = st.columns(2)
+        if col_ant.button("◀ Anterior", key=f"{chave}_anterior", disabled=pagina == 0):
+            st.session_state[f"{chave}_pagina"] = pagina - 1
+            st.rerun(scope="fragment")
+        if col_prox.button("Próxima ▶", key=f"{chave}_proxima", disabled=pagina + 1 >= total_paginas):
+            st.session_state[f"{chave}_pagina"] = pagina + 1
+            st.rerun(scope="fragment")
+
+@st.cache_resource
+def get_notificacoes(evento):
+    """Envio em lote dos comprovantes do evento (um lote por vez, compartilhado pelas sessões)."""
+    return PipelineNotificacoes(
+        get_store(evento),
+        concorrencia=st.secrets.get("NOTIFICACOES_CONCORRENCIA", 5),
+        por_segundo=st.secrets.get("NOTIFICACOES_POR_SEGUNDO", 5.0),
+    )
+
+def painel_notificacoes(df):
+    """Gera (ou envia) os comprovantes de todos os aprovados ainda não notificados, em segundo plano."""
+    import pandas as pd
+    pipeline = get_notificacoes(EVENTO.id)
+    notificacao = df['Notificacao'].astype(str) if 'Notificacao' in df.columns else pd.Series("", index=df.index)
+    incluir_falhas = st.checkbox("Incluir os que falharam antes", value=True, key="notif_falhas")
+    incluir_links = st.checkbox("Incluir os que já têm link gerado (envio não confirmado)", value=False, key="notif_links")
+    situacoes = [""] + ([FALHOU] if incluir_falhas else []) + ([LINK_GERADO] if incluir_links else [])
+    df_a_notificar = df[(df['Status'] == 'Aprovado') & notificacao.isin(situacoes)]
+    df_links = df[(df['Status'] == 'Aprovado') & (notificacao == LINK_GERADO)]
+    st.markdown(f"**Aprovados aguardando comprovante:** {len(df_a_notificar)} | **Links gerados sem confirmação:** {len(df_links)}")
+
+    # O CSV fica no disco: dá para baixar de novo depois de um reinício
+    caminho_links = caminho_particao(st.secrets.get("LINKS_WHATSAPP_PATH", "dados/comprovantes_whatsapp.csv"), EVENTO.id)
+    remetentes = {"Exportar links (CSV)": lambda: ExportacaoLinks(caminho_links)}
+    if st.secrets.get("WHATSAPP_GATEWAY_URL"):
+        remetentes["Gateway HTTP"] = lambda: GatewayHTTP(st.secrets["WHATSAPP_GATEWAY_URL"], st.secrets.get("WHATSAPP_GATEWAY_TOKEN"))
+    if st.secrets.get("NOTIFICACOES_SIMULADAS", False):
+        remetentes["Simulado (testes)"] = RemetenteSimulado
+    canal = st.radio("Canal", list(remetentes), horizontal=True, key="notif_canal")
+    modelo = st.text_area(
+        "Modelo da mensagem", value=MODELO_PADRAO, height=220, key="notif_modelo",
+        help="Campos: {evento}, {nome}, {pedido_id}, {data}, {itens}"
+    )
+
+    if st.button(f"📤 Gerar comprovantes ({len(df_a_notificar)})", type="primary", disabled=df_a_notificar.empty or pipeline.ocupado):
+        try:
+            pipeline.iniciar(df_a_notificar.to_dict('records'), remetentes[canal](), modelo, EVENTO.nome)
+        except RuntimeError as e:
+            st.error(str(e))
+
+    # Enquanto o lote roda, só o progresso é redesenhado
+    st.fragment(fragmento_medido(progresso_notificacoes), run_every=2 if pipeline.ocupado else None)()
+
+    # Link gerado não é mensagem enviada: o pedido só sai da lista quando alguém confirma o envio
+    if not df_links.empty and not pipeline.ocupado:
+        st.markdown("**Confirmar envio dos links**")
+        if os.path.exists(caminho_links):
+            with open(caminho_links, "rb") as f:
+                st.download_button("⬇️ Baixar links (CSV)", f.read(), file_name="comprovantes_whatsapp.csv", mime="text/csv")
+        painel_lote(df_links, "notif_confirmar", "Notificacao", ENVIADO, "✅ Confirmar envio", status_exigido="Aprovado")
+
+def progresso_notificacoes():
+    import pandas as pd
+    lote = get_notificacoes(EVENTO.id).ultimo_lote
+    if lote is None:
+        return
+    st.progress(lote.processados / lote.total if lote.total else 1.0, text=f"{lote.processados} de {lote.total} processado(s)")
+    if not lote.concluido:
+        return
+    st.markdown(f"**Último lote:** {lote.enviados} enviado(s), {len(lote.falhas)} falha(s) em {lote.fim - lote.inicio:.1f} s.")
+    if lote.falhas:
+        st.dataframe(pd.DataFrame({"ID": list(lote.falhas), "Erro": list(lote.falhas.values())}), hide_index=True)
+    if isinstance(lote.remetente, ExportacaoLinks):
+        st.caption(f"Links gravados em `{lote.remetente.caminho}`; confirme o envio abaixo depois de mandar as mensagens.")
+    if st.button("🔄 Atualizar lista", key="notif_atualizar"):
+        get_cache_pedidos(EVENTO.id).frame(sincronizar=True)
+        st.rerun()
+
+def painel_conciliacao(df):
+    """Importa o extrato do banco e propõe, para aprovação em um clique, os pedidos PIX pendentes já pagos."""
+    import pandas as pd
+    from conciliacao import agrupar_cobrancas, conciliar, ler_extrato
+    arquivo = st.file_uploader("Extrato bancário (CSV ou OFX)", type=["csv", "ofx"], key="conciliacao_arquivo")
+    if arquivo is None:
+        st.caption("Os créditos são comparados com os pedidos PIX pendentes pelo valor total, pelo nome do pagador e pela data.")
+        return
+    try:
+        lancamentos = ler_extrato(arquivo.getvalue(), arquivo.name)
+    except ValueError as e:
+        st.error(str(e))
+        return
+
+    pendentes = df[(df['Status'] == 'Pendente') & (df['Tipo Pagamento'] == 'Pix')]
+    usados = set(df['ID Transacao'].astype(str)) - {""} if 'ID Transacao' in df.columns else set()
+    with get_metricas().medir("conciliacao.propor"):
+        propostas, sem_par = conciliar(
+            lancamentos, agrupar_cobrancas(pendentes.to_dict('records')),
+            janela_dias=st.secrets.get("CONCILIACAO_JANELA_DIAS", 30), usados=usados,
+        )
+    st.markdown(
+        f"**{len(lancamentos)} crédito(s) no extrato:** {len(propostas)} com pedido correspondente, "
+        f"{len(sem_par)} sem correspondência."
+    )
+    if not propostas:
+        return
+
+    tabela = pd.DataFrame([{
+        "Aprovar": proposta.confiavel,
+        "Crédito": proposta.lancamento.data.strftime('%d/%m/%Y %H:%M'),
+        "Valor": proposta.lancamento.centavos / 100,
+        "Pagador (extrato)": proposta.lancamento.nome,
+        "Cliente": proposta.cobranca.nome,
+        "Pedidos": ", ".join(proposta.cobranca.ids),
+        "Semelhança": round(proposta.semelhanca * 100),
+        "Horário confere": proposta.no_horario,
+    } for proposta in propostas])
+    editada = st.data_editor(
+        tabela, hide_index=True, key=f"conciliacao_tabela_{arquivo.file_id}",
+        disabled=[coluna for coluna in tabela.columns if coluna != "Aprovar"],
+        column_config={
+            "Valor": st.column_config.NumberColumn(format="R$ %.2f"),
+            "Semelhança": st.column_config.ProgressColumn(format="%d%%", min_value=0, max_value=100),
+        },
+    )
+    escolhidas = [proposta for proposta, marcar in zip(propostas, editada["Aprovar"]) if marcar]
+    if st.button(f"✅ Aprovar conciliados ({len(escolhidas)})", type="primary", disabled=not escolhidas, key="conciliacao_aprovar"):
+        transacoes = {pid: proposta.lancamento.id for proposta in escolhidas for pid in proposta.cobranca.ids}
+        with st.spinner("Aprovando pedidos..."):
+            relatorio = aplicar_em_lote(list(transacoes), "Status", "Aprovado", status_exigido="Pendente")
+            aprovados = relatorio.loc[relatorio['Resultado'] == "✅ Atualizado", 'ID']
+            # O ID da transação impede que o mesmo crédito seja usado de novo numa próxima importação
+            store.atualizar_valores_em_lote("ID Transacao", {pid: transacoes[pid] for pid in aprovados})
+        st.session_state["lote_relatorio_conciliacao"] = relatorio
+        st.rerun()
+
+    relatorio = st.session_state.get("lote_relatorio_conciliacao")
+    if relatorio is not None:
+        st.markdown(f"**Última conciliação:** {(relatorio['Resultado'] == '✅ Atualizado').sum()} de {len(relatorio)} pedido(s) aprovado(s).")
+        st.dataframe(relatorio, hide_index=True)
+
+def painel_comandas(df_aprovados, data_relatorio):
+    """Arquivo com as comandas dos aprovados do dia (PDF A4 ou ESC/POS), agrupadas por prato e nome."""
+    from comandas import escrever_escpos, escrever_pdf, gerar_arquivo, gerar_comandas
+    from relatorios import itens_dos_pedidos
+    col1, col2, col3 = st.columns(3)
+    with col1: formato = st.radio("Formato", ["PDF (A4, 10 por página)", "Impressora térmica (ESC/POS)"], key="comandas_formato")
+    with col2: bobina = st.radio("Bobina", ["80 mm", "58 mm"], horizontal=True, key="comandas_bobina", disabled=formato.startswith("PDF"))
+    with col3: so_pendentes = st.checkbox("Só os não entregues", value=True, key="comandas_pendentes")
+    if so_pendentes and 'Entregue' in df_aprovados.columns:
+        df_aprovados = df_aprovados[df_aprovados['Entregue'] != 'Sim']
+
+    if formato.startswith("PDF"):
+        if importlib.util.find_spec("reportlab") is None:
+            st.error("O PDF precisa do pacote reportlab (pip install reportlab). O formato ESC/POS funciona sem ele.")
+            return
+        escritor, opcoes, extensao, mime = escrever_pdf, {}, "pdf", "application/pdf"
+    else:
+        escritor, opcoes, extensao, mime = escrever_escpos, {"largura": 48 if bobina == "80 mm" else 32}, "bin", "application/octet-stream"
+
+    # O arquivo só é gerado no clique, fora do script, e não fica guardado na sessão
+    itens, nome_evento, metricas = get_cache_pedidos(EVENTO.id).itens(), EVENTO.nome, get_metricas()
+    def gerar():
+        with metricas.medir("comandas.gerar"):
+            comandas = gerar_comandas(df_aprovados, itens_dos_pedidos(df_aprovados, itens))
+            return gerar_arquivo(escritor, comandas, nome_evento, **opcoes)
+
+    st.download_button(
+        f"🖨️ Baixar comandas ({len(df_aprovados)} pedido(s))", gerar, file_name=f"comandas_{EVENTO.id}_{data_relatorio}.{extensao}",
+        mime=mime, key="comandas_baixar", disabled=df_aprovados.empty, on_click="ignore",
+    )
+
+def pendentes_ao_vivo():
+    """Busca, aprovação em lote e lista dos pendentes, redesenhadas a cada INTERVALO_ATUALIZACAO_PAINEL segundos.
+
+    As gravações chegam ao frame compartilhado pelos ouvintes do backend; a
+    lista só é refiltrada quando o feed mostra alguma (ver `frame_ao_vivo`),
+    sem reexecutar o resto da página.
+    """
+    avisar_alteracoes()
+    st.subheader("🔍 Buscar Pedidos Pendentes")
+    col1, col2, col3 = st.columns(3)
+    with col1: busca_id = st.text_input("Buscar por ID do Pedido")
+    with col2: busca_nome = st.text_input("Buscar por Nome do Cliente")
+    with col3: busca_telefone = st.text_input("Buscar por Telefone")
+
+    def filtrar(df):
+        if df.empty or 'Status' not in df.columns:
+            return None
+        # Os filtros criam frames novos: o compartilhado não é alterado
+        df_pendentes = df[df['Status'] == 'Pendente']
+        if busca_id: df_pendentes = df_pendentes[df_pendentes['ID'].astype(str).str.contains(busca_id, case=False, na=False)]
+        if busca_nome: df_pendentes = df_pendentes[df_pendentes['Nome Cliente'].str.contains(busca_nome, case=False, na=False)]
+        if busca_telefone: df_pendentes = df_pendentes[df_pendentes['Telefone Cliente'].astype(str).str.contains(busca_telefone, case=False, na=False)]
+        return df_pendentes
+
+    df_pendentes = frame_ao_vivo("pendentes", (busca_id, busca_nome, busca_telefone), filtrar)
+    if df_pendentes is None:
+        st.info("Nenhum pedido para gerenciar.")
+        return
+
+    with st.expander("✅ Aprovação em lote"):
+        painel_lote(df_pendentes, "aprovar", "Status", "Aprovado", "Aprovar selecionados")
+
+    if df_pendentes.empty:
+        st.info("✅ Nenhum pedido pendente encontrado com os critérios de busca.")
+    else:
+        st.markdown(f"**Pedidos pendentes encontrados:** {len(df_pendentes)}")
+        lista_paginada(
+            df_pendentes, "pendentes", detalhes_pendente,
+            lambda row: f"Pedido #{row['ID']} - {row['Nome Cliente']} - R$ {row['Total Pedido']}"
+        )
+
+def entregas_ao_vivo(data_relatorio):
+    """Busca, entrega em lote e lista das entregas pendentes do dia, redesenhadas a cada INTERVALO_ATUALIZACAO_PAINEL segundos."""
+    import pandas as pd
+    st.subheader("🔍 Buscar Pedidos para Entrega")
+    col1, col2, col3 = st.columns(3)
+    with col1: busca_id_entrega = st.text_input("Buscar por ID", key="busca_id_entrega")
+    with col2: busca_nome_entrega = st.text_input("Buscar por Nome", key="busca_nome_entrega")
+    with col3: busca_item_entrega = st.text_input("Buscar por Item", key="busca_item_entrega")
+
+    def filtrar(df):
+        a_entregar = (df['Data/Hora'].dt.normalize() == pd.Timestamp(data_relatorio)) & (df['Status'] == 'Aprovado')
+        if 'Entregue' in df.columns:
+            a_entregar &= df['Entregue'] != 'Sim'
+        df_para_entrega = df[a_entregar]
+        if busca_id_entrega: df_para_entrega = df_para_entrega[df_para_entrega['ID'].astype(str).str.contains(busca_id_entrega, case=False, na=False)]
+        if busca_nome_entrega: df_para_entrega = df_para_entrega[df_para_entrega['Nome Cliente'].str.contains(busca_nome_entrega, case=False, na=False)]
+        if busca_item_entrega: df_para_entrega = df_para_entrega[df_para_entrega['Itens Pedido'].str.contains(busca_item_entrega, case=False, na=False)]
+        return df_para_entrega
+
+    df_para_entrega = frame_ao_vivo("entregas", (data_relatorio, busca_id_entrega, busca_nome_entrega, busca_item_entrega), filtrar)
+
+    with st.expander("📦 Entrega em lote"):
+        painel_lote(df_para_entrega, "entregar", "Entregue", "Sim", "Marcar selecionados como entregues", status_exigido="Aprovado")
+
+    st.markdown("---")
+    st.subheader(f"📋 Lista de Entregas Pendentes ({len(df_para_entrega)})")
+
+    if df_para_entrega.empty:
+        st.success("🎉 Todos os pedidos para esta data foram entregues!")
+    else:
+        opcoes_ordenacao = st.multiselect("Ordenar por:", options=["Nome Cliente", "Data/Hora"], default=["Nome Cliente"])
+        if opcoes_ordenacao: df_para_entrega = df_para_entrega.sort_values(by=opcoes_ordenacao)
+
+        lista_paginada(
+            df_para_entrega, "entregas", detalhes_entrega,
+            lambda row: f"Pedido #{row['ID']} - {row['Nome Cliente']}"
+        )
+
 def pagina_admin():
     if not st.session_state.get("autenticado"):
         autenticar_admin()
         return
 
-    tab1, tab2, tab3 = st.tabs(["Gerenciar Pedidos", "Relatórios", "Prazos e Configurações"])
+    import pandas as pd
+    from relatorios import (
+        fechamento_por_dia, itens_dos_pedidos, resumo_itens, resumo_itens_por_dia, totais_por_pagamento
+    )
 
-    # Carrega dados para as abas 1 e 2
-    all_data = sheet.get_all_records()
-    if not all_data:
-        df = pd.DataFrame()
-    else:
-        df = pd.DataFrame(all_data)
-        df['Data/Hora'] = pd.to_datetime(df['Data/Hora'], errors='coerce')
+    tab1, tab2, tab_retirada, tab_cozinha, tab3, tab_desempenho = st.tabs(
+        ["Gerenciar Pedidos", "Relatórios", "Retirada", "Cozinha", "Prazos e Configurações", "Desempenho"]
+    )
+
+    # Os snapshots do histórico rodam em segundo plano para os eventos ativos e o selecionado;
+    # um evento encerrado não muda mais e não precisa de exportador
+    for evento_id, evento in get_config_eventos().eventos().items():
+        if evento.ativo or evento_id == EVENTO.id:
+            get_historico(evento_id)
+
+    # Tudo o que foi gravado até aqui já aparece neste rerun; os avisos são só do que vier depois
+    st.session_state.feed_seq = get_feed(EVENTO.id).seq
+    # As listas ao vivo são fragmentos redesenhados sozinhos: uma alteração não reexecuta a página inteira
+    intervalo = st.secrets.get("INTERVALO_ATUALIZACAO_PAINEL", 2)
+
+    # Carrega dados para as abas 1 e 2 (frame compartilhado; só as alterações são lidas do backend)
+    with get_metricas().medir("painel.frame"):
+        df = get_cache_pedidos(EVENTO.id).frame()
     
     # --- Aba 1: Gerenciar Pedidos ---
     with tab1:
         st.title("👑 Gerenciamento de Pedidos Pendentes")
         
-        if st.button("🔄 Atualizar Pedidos"): 
+        if st.button("🔄 Atualizar Pedidos", help="As alterações feitas pelo app aparecem sozinhas; use para o que foi editado direto na planilha."):
+            get_cache_pedidos(EVENTO.id).frame(sincronizar=True)
+            # A sincronização não passa pelo feed: as listas ao vivo refiltram na próxima passada
+            for chave in ("pendentes", "entregas"):
+                st.session_state.pop(f"{chave}_ao_vivo", None)
             st.rerun()
 
-        if df.empty or 'Status' not in df.columns:
-            st.info("Nenhum pedido para gerenciar.")
-        else:
-            st.subheader("🔍 Buscar Pedidos Pendentes")
-            col1, col2, col3 = st.columns(3)
-            with col1: busca_id = st.text_input("Buscar por ID do Pedido")
-            with col2: busca_nome = st.text_input("Buscar por Nome do Cliente")
-            with col3: busca_telefone = st.text_input("Buscar por Telefone")
+        st.fragment(fragmento_medido(pendentes_ao_vivo), run_every=intervalo)()
 
-            df_pendentes = df[df['Status'] == 'Pendente'].copy()
+        if not df.empty and 'Status' in df.columns:
+            with st.expander("🏦 Conciliação PIX (extrato bancário)"):
+                painel_conciliacao(df)
 
-            if busca_id: df_pendentes = df_pendentes[df_pendentes['ID'].astype(str).str.contains(busca_id, case=False, na=False)]
-            if busca_nome: df_pendentes = df_pendentes[df_pendentes['Nome Cliente'].str.contains(busca_nome, case=False, na=False)]
-            if busca_telefone: df_pendentes = df_pendentes[df_pendentes['Telefone Cliente'].astype(str).str.contains(busca_telefone, case=False, na=False)]
+            with st.expander("📲 Comprovantes em lote (WhatsApp)"):
+                painel_notificacoes(df)
 
-            if df_pendentes.empty:
-                st.info("✅ Nenhum pedido pendente encontrado com os critérios de busca.")
-            else:
-                st.markdown(f"**Pedidos pendentes encontrados:** {len(df_pendentes)}")
-                for _, row in df_pendentes.iterrows():
-                    with st.expander(f"Pedido #{row['ID']} - {row['Nome Cliente']} - R$ {row['Total Pedido']}"):
-                        data_formatada = row['Data/Hora'].strftime('%d/%m/%Y %H:%M:%S') if pd.notna(row['Data/Hora']) else "Data inválida"
-                        st.write(f"**Data/Hora:** {data_formatada}")
-                        st.write(f"**Itens:** {row['Itens Pedido']}")
-                        st.write(f"**Telefone:** {row['Telefone Cliente']}")
-                        st.write(f"**Pagamento:** {row['Tipo Pagamento']}")
-                        st.write(f"**Observações:** {row['Observacoes'] or 'Nenhuma'}")
-                        
-                        st.markdown("---")
-                        col_btn1, col_btn2 = st.columns(2)
-
-                        with col_btn1:
-                            if st.button("Gerar Notificação (WhatsApp)", key=f"notify_{row['ID']}"):
-                                st.session_state[f"show_notify_{row['ID']}"] = True
-                        with col_btn2:
-                            if st.button("Aprovar Pedido e Remover", key=f"approve_{row['ID']}", type="primary"):
-                                cell = sheet.find(str(row['ID']))
-                                if cell:
-                                    sheet.update_cell(cell.row, 12, "Aprovado")
-                                    st.success(f"Pedido #{row['ID']} aprovado! A lista será atualizada.")
-                                    if f"show_notify_{row['ID']}" in st.session_state: del st.session_state[f"show_notify_{row['ID']}"]
-                                    st.rerun()
-                                else:
-                                    st.error(f"Não foi possível encontrar o pedido #{row['ID']} na planilha para aprovação.")
-                        
-                        if st.session_state.get(f"show_notify_{row['ID']}", False):
-                            with st.container(border=True):
-                                notificar_cliente(
-                                    pedido_id=row['ID'], nome_cliente=row['Nome Cliente'],
-                                    telefone_cliente=row['Telefone Cliente'], data_pedido=row['Data/Hora'],
-                                    itens_pedido=row['Itens Pedido']
-                                )
-                                if st.button("Ocultar Notificação", key=f"hide_{row['ID']}"):
-                                    del st.session_state[f"show_notify_{row['ID']}"]
-                                    st.rerun()
+            with st.expander("🔁 Prováveis duplicados"):
+                st.caption("Pedidos com o mesmo telefone, a mesma data e os mesmos itens.")
+                with get_metricas().medir("relatorios.duplicados"):
+                    duplicados = get_duplicados(EVENTO.id, get_feed(EVENTO.id).seq, len(df))
+                if duplicados.empty:
+                    st.info("Nenhum pedido repetido encontrado.")
+                else:
+                    st.markdown(f"**{duplicados['Grupo'].nunique()} grupo(s), {len(duplicados)} pedidos.** Confira antes de aprovar.")
+                    st.dataframe(
+                        duplicados[['Grupo', 'ID', 'Data/Hora', 'Nome Cliente', 'Telefone Cliente', 'Itens Pedido', 'Tipo Pagamento', 'Status']],
+                        hide_index=True,
+                    )
 
     # --- Aba 2: Relatórios ---
     with tab2:
@@ -396,112 +1130,100 @@ def pagina_admin():
             data_relatorio = st.date_input("Selecione a data do pedido:", value=datetime.now(FUSO_HORARIO_LOCAL), format="YYYY-MM-DD")
             st.info("Altere para a data que deseja consultar (ex: 02/08/2025 ou 03/08/2025).")
 
-            df['Data'] = df['Data/Hora'].dt.date
-            df.dropna(subset=['Data'], inplace=True)
-            df['Total Pedido'] = pd.to_numeric(df['Total Pedido'], errors='coerce').fillna(0)
-
-            df_aprovados_do_dia = df[(df['Data'] == data_relatorio) & (df['Status'] == 'Aprovado')]
-
-            if 'Entregue' in df_aprovados_do_dia.columns:
-                df_para_entrega = df_aprovados_do_dia[df_aprovados_do_dia['Entregue'] != 'Sim'].copy()
-            else:
-                df_para_entrega = df_aprovados_do_dia.copy()
-
-            st.subheader("🔍 Buscar Pedidos para Entrega")
-            col1, col2, col3 = st.columns(3)
-            with col1: busca_id_entrega = st.text_input("Buscar por ID", key="busca_id_entrega")
-            with col2: busca_nome_entrega = st.text_input("Buscar por Nome", key="busca_nome_entrega")
-            with col3: busca_item_entrega = st.text_input("Buscar por Item", key="busca_item_entrega")
+            st.fragment(fragmento_medido(entregas_ao_vivo), run_every=intervalo)(data_relatorio)
 
-            if busca_id_entrega: df_para_entrega = df_para_entrega[df_para_entrega['ID'].astype(str).str.contains(busca_id_entrega, case=False, na=False)]
-            if busca_nome_entrega: df_para_entrega = df_para_entrega[df_para_entrega['Nome Cliente'].str.contains(busca_nome_entrega, case=False, na=False)]
-            if busca_item_entrega: df_para_entrega = df_para_entrega[df_para_entrega['Itens Pedido'].str.contains(busca_item_entrega, case=False, na=False)]
+            # Trabalha sobre uma cópia para não alterar o DataFrame compartilhado
+            with get_metricas().medir("relatorios.preparar"):
+                df_relatorio = df.copy()
+                df_relatorio['Data'] = df_relatorio['Data/Hora'].dt.date
+                df_relatorio.dropna(subset=['Data'], inplace=True)
+                df_relatorio['Total Pedido'] = pd.to_numeric(df_relatorio['Total Pedido'], errors='coerce').fillna(0)
 
+            with st.expander("🖨️ Comandas e etiquetas"):
+                painel_comandas(
+                    df_relatorio[(df_relatorio['Data'] == data_relatorio) & (df_relatorio['Status'] == 'Aprovado')], data_relatorio
+                )
             st.markdown("---")
-            st.subheader(f"📋 Lista de Entregas Pendentes ({len(df_para_entrega)})")
+            st.subheader("💰 Resumo Financeiro (Pedidos Aprovados)")
+            periodo = st.date_input("Período do resumo:", value=(data_relatorio, data_relatorio), format="YYYY-MM-DD")
+            inicio, fim = (periodo[0], periodo[-1]) if periodo else (data_relatorio, data_relatorio)
+            texto_periodo = inicio.strftime('%d/%m/%Y') if inicio == fim else f"{inicio.strftime('%d/%m/%Y')} a {fim.strftime('%d/%m/%Y')}"
 
-            if df_para_entrega.empty:
-                st.success("🎉 Todos os pedidos para esta data foram entregues!")
-            else:
-                opcoes_ordenacao = st.multiselect("Ordenar por:", options=["Nome Cliente", "Data/Hora"], default=["Nome Cliente"])
-                if opcoes_ordenacao: df_para_entrega = df_para_entrega.sort_values(by=opcoes_ordenacao)
-
-                for _, row in df_para_entrega.iterrows():
-                    with st.expander(f"Pedido #{row['ID']} - {row['Nome Cliente']}"):
-                        col1, col2 = st.columns([3, 1])
-                        with col1:
-                            data_formatada = row['Data/Hora'].strftime('%d/%m/%Y %H:%M:%S') if pd.notna(row['Data/Hora']) else "N/A"
-                            st.write(f"**Data/Hora:** {data_formatada}")
-                            st.write(f"**Itens:** {row['Itens Pedido']}")
-                            st.write(f"**Telefone:** {row['Telefone Cliente']}")
-                        with col2:
-                            if st.button(f"Marcar como Entregue", key=f"entregue_{row['ID']}"):
-                                cell = sheet.find(str(row['ID']))
-                                if cell:
-                                    sheet.update_cell(cell.row, 15, "Sim") 
-                                    st.success(f"Pedido #{row['ID']} marcado como entregue!")
-                                    st.rerun()
-                                else:
-                                    st.error(f"Não foi possível encontrar o pedido #{row['ID']} na planilha.")
-            
-            st.markdown("---")
-            st.subheader("💰 Resumo Financeiro do Dia (Pedidos Aprovados)")
+            df_aprovados_periodo = df_relatorio[
+                (df_relatorio['Data'] >= inicio) & (df_relatorio['Data'] <= fim) & (df_relatorio['Status'] == 'Aprovado')
+            ]
 
-            if df_aprovados_do_dia.empty:
-                st.info("Nenhum pedido aprovado para a data selecionada.")
+            if df_aprovados_periodo.empty:
+                st.info("Nenhum pedido aprovado para o período selecionado.")
             else:
+                with get_metricas().medir("relatorios.resumo"):
+                    itens_vendidos = itens_dos_pedidos(df_aprovados_periodo, get_cache_pedidos(EVENTO.id).itens())
+                    vendidos_por_item = resumo_itens(itens_vendidos)
+                    total_vendido = df_aprovados_periodo["Total Pedido"].sum()
+                    valores_por_pagamento = totais_por_pagamento(df_aprovados_periodo)
+                    if inicio != fim:
+                        vendidos_por_dia = resumo_itens_por_dia(itens_vendidos)
+                        fechamento = fechamento_por_dia(df_aprovados_periodo)
+
                 st.write("#### Resumo por Item Vendido")
-                contagem = {}
-                for _, row in df_aprovados_do_dia.iterrows():
-                    itens = str(row['Itens Pedido']).split(',')
-                    for item in itens:
-                        item = item.strip()
-                        if '] ' in item:
-                            try:
-                                qtd_str, nome_item = item.split('] ')
-                                qtd = int(qtd_str.replace('[','').replace('x','').strip())
-                                contagem[nome_item] = contagem.get(nome_item, 0) + qtd
-                            except ValueError:
-                                st.warning(f"Não foi possível processar o item: '{item}' do pedido #{row['ID']}")
-                for k, v in contagem.items(): st.write(f"- {k}: {v} unidades")
+                for k, v in vendidos_por_item.items(): st.write(f"- {k}: {v} unidades")
+                if inicio != fim:
+                    st.dataframe(vendidos_por_dia)
 
                 st.write("#### Fechamento de Caixa")
-                total_vendido = df_aprovados_do_dia["Total Pedido"].sum()
-                st.markdown(f"**Total Arrecadado ({data_relatorio.strftime('%d/%m/%Y')}): R$ {total_vendido:.2f}**")
+                st.markdown(f"**Total Arrecadado ({texto_periodo}): R$ {total_vendido:.2f}**")
                 
-                valores_por_pagamento = df_aprovados_do_dia.groupby("Tipo Pagamento")["Total Pedido"].sum()
                 st.write("##### Totais por forma de pagamento:")
                 for metodo, valor in valores_por_pagamento.items(): st.write(f"- {metodo}: R$ {valor:.2f}")
+                if inicio != fim:
+                    st.write("##### Fechamento por dia:")
+                    st.dataframe(fechamento.style.format("R$ {:.2f}"))
+
+        st.markdown("---")
+        painel_historico()
+
+    # --- Aba Retirada: busca rápida no balcão ---
+    with tab_retirada:
+        st.title("🛍️ Balcão de Retirada")
+        painel_retirada()
+
+    # --- Aba Cozinha: previsão de produção ---
+    with tab_cozinha:
+        st.title("👩‍🍳 Previsão de Produção")
+        st.info("Aprovados = quentinhas confirmadas para preparo. Pendentes = aguardando pagamento (previsão).")
+        atualizacao_automatica = st.toggle("Atualizar automaticamente a cada 10 segundos", value=True)
+        # Só o fragmento é reexecutado no intervalo; o restante do painel não é redesenhado
+        st.fragment(fragmento_medido(painel_cozinha), run_every=10 if atualizacao_automatica else None)()
+
+    # --- Aba Desempenho: instrumentação dos caminhos de dados ---
+    with tab_desempenho:
+        st.title("📊 Desempenho")
+        painel_desempenho()
 
     # --- Aba 3: Prazos e Configurações ---
     with tab3:
         st.title("⚙️ Prazos e Configurações")
-        st.subheader("Definir Data e Hora Limite para Pedidos")
+        st.subheader("Definir Data e Hora Limite e Capacidade para Pedidos")
         st.warning("Atenção: Após o horário definido para uma data, os usuários não poderão mais fazer pedidos para aquele dia.")
 
-        config_records = config_sheet.get_all_records()
-        configs = {rec['data_evento']: rec for rec in config_records}
+        # Prazos e limites vêm da agenda e da reserva em memória, sem reler a aba de configurações
+        vendidas = get_contadores(EVENTO.id).totais_por_prato()
+        agenda = get_agenda(EVENTO.id)
+        reserva = get_reserva(EVENTO.id)
 
         with st.form("deadlines_form"):
             new_configs = {}
-            for nome_amigavel, data_evento in DATAS_DISPONIVEIS.items():
+            for nome_amigavel, data_evento in EVENTO.datas.items():
                 st.markdown("---")
                 st.markdown(f"#### Prazo para **{nome_amigavel}**")
                 
                 default_date = datetime.strptime(data_evento, '%Y-%m-%d').date()
                 default_time = time(10, 0)
 
-                if data_evento in configs:
-                    try:
-                        saved_date_str = configs[data_evento]['prazo_data']
-                        saved_time_str = configs[data_evento]['prazo_hora']
-                        try:
-                            default_date = datetime.strptime(saved_date_str, '%d/%m/%Y').date()
-                        except ValueError:
-                            default_date = datetime.strptime(saved_date_str, '%Y-%m-%d').date()
-                        default_time = datetime.strptime(saved_time_str, '%H:%M:%S').time()
-                    except (ValueError, KeyError):
-                        st.error(f"Formato de data/hora salvo para {nome_amigavel} é inválido. Usando valores padrão.")
+                if prazo_salvo := agenda.prazo(data_evento):
+                    default_date, default_time = prazo_salvo.date(), prazo_salvo.time()
+                elif data_evento in agenda.invalidos:
+                    st.error(f"Formato de data/hora salvo para {nome_amigavel} é inválido. Usando valores padrão.")
 
                 col1, col2 = st.columns(2)
                 with col1:
@@ -509,39 +1231,265 @@ def pagina_admin():
                 with col2:
                     prazo_hora = st.time_input("Hora limite", value=default_time, key=f"time_{data_evento}")
 
+                st.markdown("**Limite de quentinhas por prato** (0 = sem limite)")
+                capacidades = {}
+                for col, prato in zip(st.columns(len(EVENTO.cardapio)), EVENTO.cardapio):
+                    with col:
+                        capacidades[prato] = st.number_input(
+                            prato, min_value=0, step=10, value=reserva.capacidade(data_evento, prato) or 0, key=f"cap_{data_evento}_{prato}",
+                            help=f"Já vendidas: {vendidas.get((data_evento, prato), 0)}"
+                        )
+
                 new_configs[data_evento] = {
                     "prazo_data": prazo_data,
                     "prazo_hora": prazo_hora,
-                    "nome_amigavel": nome_amigavel
+                    "nome_amigavel": nome_amigavel,
+                    "capacidades": {prato: limite for prato, limite in capacidades.items() if limite > 0}
                 }
 
-            submitted = st.form_submit_button("💾 Salvar Todos os Prazos", type="primary")
+            submitted = st.form_submit_button("💾 Salvar Todos os Prazos e Limites", type="primary")
             if submitted:
                 with st.spinner("Salvando configurações..."):
                     for data_evento, config_data in new_configs.items():
-                        cell = config_sheet.find(data_evento)
-                        
-                        prazo_data_str = config_data['prazo_data'].strftime('%Y-%m-%d')
-                        prazo_hora_str = config_data['prazo_hora'].strftime('%H:%M:%S')
-
-                        if cell:
-                            row_index = cell.row
-                            config_sheet.update_cell(row_index, 2, prazo_data_str)
-                            config_sheet.update_cell(row_index, 3, prazo_hora_str)
-                        else:
-                            config_sheet.append_row([
-                                data_evento,
-                                prazo_data_str,
-                                prazo_hora_str,
-                                config_data['nome_amigavel']
-                            ])
-                st.success("Prazos salvos com sucesso!")
-                st.cache_data.clear()
+                        store.salvar_configuracao(
+                            data_evento,
+                            config_data['prazo_data'].strftime('%Y-%m-%d'),
+                            config_data['prazo_hora'].strftime('%H:%M:%S'),
+                            config_data['nome_amigavel'],
+                            json.dumps(config_data['capacidades'], ensure_ascii=False) if config_data['capacidades'] else ""
+                        )
+                        reserva.definir_capacidades(data_evento, config_data['capacidades'])
+                        agenda.definir(data_evento, ler_prazo(
+                            config_data['prazo_data'].strftime('%Y-%m-%d'), config_data['prazo_hora'].strftime('%H:%M:%S'),
+                            FUSO_HORARIO_LOCAL
+                        ))
+                st.success("Prazos e limites salvos com sucesso!")
                 st.rerun()
 
+        st.markdown("---")
+        st.subheader("🎪 Eventos")
+        st.info("Cada evento tem cardápio, datas, pagamento e planilha de pedidos próprios. As alterações valem para todas as sessões sem reiniciar o app.")
+        painel_eventos()
+
+def painel_eventos():
+    """Cadastro de eventos: cria um evento novo ou edita cardápio, datas e pagamento de um existente."""
+    import pandas as pd
+    config_eventos = get_config_eventos()
+    eventos = config_eventos.eventos()
+    for evento_id, motivo in config_eventos.invalidos.items():
+        st.warning(f"O evento '{evento_id}' está com dados inválidos no catálogo e foi ignorado ({motivo}). Corrija a linha na planilha de eventos.")
+    opcoes = list(eventos) + ["novo"]
+    escolhido = st.selectbox(
+        "Evento", opcoes, index=opcoes.index(EVENTO.id) if EVENTO.id in opcoes else 0, key="evento_editado",
+        format_func=lambda e: "➕ Novo evento" if e == "novo" else f"{eventos[e].nome} ({e})"
+    )
+    base = eventos.get(escolhido) or Evento("", "", {}, {})
+
+    with st.form(f"evento_form_{escolhido}"):
+        id_evento = st.text_input("Identificador (letras minúsculas, números e hífens)", value=base.id, disabled=escolhido != "novo")
+        nome = st.text_input("Nome do evento", value=base.nome)
+        ativo = st.checkbox("Aceitando pedidos", value=base.ativo)
+
+        st.markdown("**Cardápio**")
+        cardapio = st.data_editor(
+            pd.DataFrame({"Prato": pd.Series(list(base.cardapio), dtype=str), "Preço": pd.Series(list(base.cardapio.values()), dtype=float)}),
+            num_rows="dynamic", hide_index=True, key=f"evento_cardapio_{escolhido}",
+            column_config={"Preço": st.column_config.NumberColumn(format="R$ %.2f", min_value=0)}
+        )
+        acompanhamentos = st.text_input("Acompanhamentos (servidos com todas as opções)", value=base.acompanhamentos)
+
+        st.markdown("**Datas**")
+        datas = st.data_editor(
+            pd.DataFrame({"Rótulo": pd.Series(list(base.datas), dtype=str), "Data": pd.to_datetime(pd.Series(list(base.datas.values()), dtype=str))}),
+            num_rows="dynamic", hide_index=True, key=f"evento_datas_{escolhido}",
+            column_config={"Rótulo": st.column_config.TextColumn(help="Ex: Sábado (02/08/2025)"), "Data": st.column_config.DateColumn(format="DD/MM/YYYY")}
+        )
+
+        st.markdown("**Pagamento**")
+        col1, col2, col3, col4 = st.columns(4)
+        pix_chave = col1.text_input("Chave PIX", value=base.pagamento.get("pix_chave", ""))
+        pix_nome = col2.text_input("Nome do recebedor", value=base.pagamento.get("pix_nome", ""))
+        pix_banco = col3.text_input("Banco", value=base.pagamento.get("pix_banco", ""))
+        whatsapp = col4.text_input("WhatsApp para comprovantes", value=base.pagamento.get("whatsapp", ""))
+
+        if st.form_submit_button("💾 Salvar Evento", type="primary"):
+            evento = Evento(
+                id_evento.strip(), nome.strip(),
+                {str(r["Prato"]).strip(): float(r["Preço"]) for r in cardapio.dropna().to_dict("records") if str(r["Prato"]).strip()},
+                {str(r["Rótulo"]).strip(): pd.Timestamp(r["Data"]).strftime('%Y-%m-%d') for r in datas.dropna().to_dict("records") if str(r["Rótulo"]).strip()},
+                {"pix_chave": pix_chave.strip(), "pix_nome": pix_nome.strip(), "pix_banco": pix_banco.strip(), "whatsapp": whatsapp.strip()},
+                acompanhamentos.strip(), ativo
+            )
+            if escolhido == "novo" and evento.id in eventos:
+                st.error(f"Já existe um evento com o identificador '{evento.id}'.")
+            elif not evento.nome or not evento.cardapio or not evento.datas:
+                st.error("Informe o nome, ao menos um prato e ao menos uma data.")
+            else:
+                try:
+                    config_eventos.salvar(evento)
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    st.success(f"Evento '{evento.nome}' salvo!")
+                    st.rerun()
+
+def painel_historico():
+    """Tendências de vários dias e eventos lidas do histórico em Parquet (sem consultar o backend)."""
+    from historico import atraso_aprovacao, eventos_no_historico, mix_pratos, receita_por_dia
+    st.subheader("🗂️ Histórico (todos os eventos)")
+    raiz = st.secrets.get("HISTORICO_PATH", "dados/historico")
+    exportador = get_historico(EVENTO.id)
+    col1, col2 = st.columns([3, 1])
+    if exportador.ultimo_snapshot is not None:
+        ultimo = exportador.ultimo_snapshot.tz_convert(FUSO_HORARIO_LOCAL).strftime('%d/%m/%Y %H:%M')
+        col1.caption(f"Último snapshot de {EVENTO.nome}: {ultimo}. Novos snapshots a cada {exportador.intervalo // 60} min.")
+    else:
+        col1.caption(f"Snapshots a cada {exportador.intervalo // 60} min; o histórico guarda os pedidos mesmo depois que a planilha é limpa.")
+    if col2.button("📸 Gerar snapshot agora"):
+        with st.spinner("Gravando snapshot..."):
+            regravadas = exportador.snapshot()
+        st.success(f"Snapshot gravado ({regravadas} data(s) atualizada(s)).")
+
+    disponiveis = eventos_no_historico(raiz)
+    if not disponiveis:
+        st.info("O histórico ainda está vazio.")
+        return
+    nomes = {id_: ev.nome for id_, ev in get_config_eventos().eventos().items()}
+    eventos = st.multiselect(
+        "Eventos", disponiveis, default=[EVENTO.id] if EVENTO.id in disponiveis else disponiveis,
+        format_func=lambda i: nomes.get(i, i), key="historico_eventos",
+    )
+    periodo = st.date_input("Período", value=(), format="YYYY-MM-DD", key="historico_periodo")
+    inicio, fim = (periodo[0], periodo[-1]) if periodo else (None, None)
+
+    with get_metricas().medir("historico.consulta"):
+        receita = receita_por_dia(raiz, eventos, inicio, fim)
+        pratos = mix_pratos(raiz, eventos, inicio, fim)
+        atraso = atraso_aprovacao(raiz, eventos, inicio, fim)
+    if receita.empty:
+        st.info("Nenhum pedido aprovado no histórico para o filtro escolhido.")
+        return
+    st.write("#### Receita aprovada por dia")
+    st.bar_chart(receita.rename(columns=nomes))
+    st.write("#### Mix de pratos")
+    st.dataframe(pratos.rename(columns=nomes))
+    st.write("#### Tempo até a aprovação (horas)")
+    if atraso.empty:
+        st.info("Sem horários de chegada e aprovação registrados no período.")
+    else:
+        st.dataframe(atraso.round(1), hide_index=True)
+
+def painel_desempenho():
+    """Durações e chamadas à API medidas nos caminhos de dados, com uso da cota do Google Sheets."""
+    import pandas as pd
+    metricas = get_metricas()
+    cota = st.secrets.get("COTA_SHEETS_POR_MINUTO", 300)
+    usadas = metricas.chamadas_ultimo_minuto()
+    st.progress(min(usadas / cota, 1.0), text=f"Cota do Google Sheets: {usadas} de {cota} chamadas no último minuto")
+    if usadas >= 0.8 * cota:
+        st.warning("Uso da cota acima de 80%: novas leituras da planilha podem falhar com erro 429.")
+
+    sessao = st.session_state.get("sessao_metricas")
+    dados_sessao = metricas.sessoes.get(sessao, {"reruns": 0, "fragmentos": 0, "duracao_s": 0.0, "chamadas_api": 0})
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Chamadas à API (total)", metricas.chamadas_api_total)
+    col2.metric("Em segundo plano", metricas.chamadas_api_segundo_plano, help="Fila de gravação e espelho da planilha")
+    col3.metric("Reruns desta sessão", dados_sessao["reruns"])
+    col4.metric("Reruns de fragmento", dados_sessao["fragmentos"], help="Painéis ao vivo, busca da retirada, listas paginadas")
+    col5.metric("Chamadas desta sessão", dados_sessao["chamadas_api"])
+    st.caption(f"{len(metricas.sessoes)} sessão(ões) com atividade nos últimos {metricas.sessao_ociosa / 60:.0f} min")
+
+    st.subheader("⏱️ Etapas medidas (amostras recentes)")
+    resumo = metricas.resumo()
+    if resumo:
+        st.dataframe(pd.DataFrame(resumo).round(1), hide_index=True)
+        if metricas.chamadas_por_metodo:
+            st.write("**Chamadas à API por método:** " + ", ".join(
+                f"{metodo} = {n}" for metodo, n in sorted(metricas.chamadas_por_metodo.items())
+            ))
+    else:
+        st.info("Nenhuma medição registrada ainda.")
+
+    st.subheader("🔁 Últimos reruns desta sessão")
+    reruns = metricas.reruns_recentes(sessao)[-20:]
+    if reruns:
+        st.dataframe(pd.DataFrame([
+            {
+                "Início": datetime.fromtimestamp(r["inicio"], FUSO_HORARIO_LOCAL).strftime('%H:%M:%S'),
+                "Página": r["pagina"], "Tipo": r["tipo"], "Duração (ms)": round(r["duracao_s"] * 1000, 1),
+                "Medido (ms)": round(sum(e["duracao_s"] for e in r["etapas"].values()) * 1000, 1),
+                "Chamadas à API": r["chamadas_api"],
+                "Etapa mais lenta": max(r["etapas"], key=lambda nome: r["etapas"][nome]["duracao_s"], default=""),
+            }
+            for r in reversed(reruns)
+        ]), hide_index=True)
+        st.caption("Duração menos o tempo medido ≈ desenho dos widgets. Etapas aninhadas (ex: store dentro do frame) somam duas vezes.")
+
+    caminho = st.secrets.get("METRICAS_PATH", "dados/metricas.jsonl")
+    if st.button("💾 Exportar traces"):
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        st.success(f"{metricas.exportar(caminho)} rerun(s) gravado(s) em `{caminho}`.")
+
+def pagina_aquecimento():
+    """Cria os recursos compartilhados de todos os eventos ativos antes de a instância receber clientes.
+
+    Aberta com `?aquecer=1` (ex: pelo readiness check do autoscaler): abre a
+    conexão e as planilhas, carrega pandas e monta filas, índices, contadores
+    e o frame do painel. Quando termina, mostra "PRONTO".
+    """
+    inicio = datetime.now()
+    usa_sheets = st.secrets.get("BACKEND_PEDIDOS", "sqlite") == "sheets" or (
+        "GOOGLE_SHEETS_ID" in st.secrets and st.secrets.get("ESPELHO_SHEETS", True)
+    )
+    eventos_ativos = [evento_id for evento_id, evento in get_config_eventos().eventos().items() if evento.ativo]
+    for evento_id in eventos_ativos:
+        if usa_sheets:
+            for sheet in get_sheets(evento_id):
+                if sheet is not None:
+                    sheet.abrir()
+        get_fila(evento_id)
+        get_agenda(evento_id)
+        get_reserva(evento_id)
+        get_indice_busca(evento_id)
+        get_cache_pedidos(evento_id).frame()
+    st.json({
+        "status": "PRONTO", "eventos": eventos_ativos,
+        "duracao_s": round((datetime.now() - inicio).total_seconds(), 3),
+    })
+
+# Aquecimento da instância (não mostra menu nem páginas)
+if "aquecer" in st.query_params:
+    pagina_aquecimento()
+    st.stop()
+
 # --- Configuração do menu principal ---
 menu = st.sidebar.radio("Escolha a página:", ["Fazer Pedido", "Painel de Administração"])
-if menu == "Fazer Pedido":
-    pagina_pedidos()
+
+# Evento atual: escolhido na barra lateral ou pelo link (?evento=<id>); clientes só veem eventos ativos
+eventos = get_config_eventos().eventos()
+disponiveis = [e for e, ev in eventos.items() if ev.ativo or menu != "Fazer Pedido"]
+if not disponiveis:
+    st.info("Nenhum evento está recebendo pedidos no momento.")
+    st.stop()
+evento_link = st.query_params.get("evento")
+if len(disponiveis) > 1:
+    evento_id = st.sidebar.selectbox(
+        "Evento:", disponiveis, index=disponiveis.index(evento_link) if evento_link in disponiveis else 0,
+        format_func=lambda e: eventos[e].nome
+    )
 else:
-    pagina_admin()
\ No newline at end of file
+    evento_id = disponiveis[0]
+EVENTO = eventos[evento_id]
+store = get_store(EVENTO.id)
+
+if "sessao_metricas" not in st.session_state:
+    st.session_state.sessao_metricas = uuid.uuid4().hex[:8]
+get_metricas().iniciar_rerun(st.session_state.sessao_metricas, menu)
+try:
+    if menu == "Fazer Pedido":
+        pagina_pedidos()
+    else:
+        pagina_admin()
+finally:
+    # Também roda quando st.rerun()/st.stop() interrompem o script
+    get_metricas().finalizar_rerun()
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""Cálculos vetorizados da aba de Relatórios.
+
+Os resumos partem dos itens estruturados de cada pedido (um item por
+linha). Pedidos antigos, gravados antes da tabela de itens existir, têm o
+texto de "Itens Pedido" convertido para o mesmo formato, de uma vez só,
+com uma expressão regular.
+"""
+import pandas as pd
+
+from armazenamento import COLUNAS_ITENS, PADRAO_ITEM_TEXTO
+
+
+def extrair_itens_texto(df_pedidos):
+    """Converte a coluna de texto 'Itens Pedido' em itens estruturados (sem preço unitário conhecido)."""
+    if df_pedidos.empty:
+        return pd.DataFrame(columns=COLUNAS_ITENS)
+    extraidos = df_pedidos['Itens Pedido'].astype(str).str.extractall(PADRAO_ITEM_TEXTO)
+    if extraidos.empty:
+        return pd.DataFrame(columns=COLUNAS_ITENS)
+    origem = df_pedidos.loc[extraidos.index.get_level_values(0)]
+    return pd.DataFrame({
+        "ID Pedido": origem['ID'].astype(str).to_numpy(),
+        "Data": origem['Data/Hora'].dt.strftime('%Y-%m-%d').to_numpy(),
+        "Item": extraidos['Item'].str.strip().to_numpy(),
+        "Quantidade": extraidos['Quantidade'].astype('int64').to_numpy(),
+        "Preco Unitario": float('nan'),
+    })
+
+
+def itens_dos_pedidos(df_pedidos, df_itens):
+    """Itens estruturados dos pedidos informados, completando com o texto dos que não têm itens gravados."""
+    ids = df_pedidos['ID'].astype(str)
+    estruturados = df_itens[df_itens['ID Pedido'].isin(ids)]
+    sem_itens = df_pedidos[~ids.isin(estruturados['ID Pedido'])]
+    if sem_itens.empty:
+        return estruturados
+    return pd.concat([estruturados, extrair_itens_texto(sem_itens)], ignore_index=True)
+
+
+def resumo_itens(itens):
+    """Quantidade vendida por item, da maior para a menor."""
+    return itens.groupby('Item', sort=False)['Quantidade'].sum().sort_values(ascending=False)
+
+
+def resumo_itens_por_dia(itens):
+    """Tabela item x data com as quantidades vendidas."""
+    return itens.pivot_table(index='Item', columns='Data', values='Quantidade', aggfunc='sum', fill_value=0)
+
+
+def totais_por_pagamento(df_pedidos):
+    """Total arrecadado por forma de pagamento."""
+    return df_pedidos.groupby('Tipo Pagamento')['Total Pedido'].sum()
+
+
+def fechamento_por_dia(df_pedidos):
+    """Fechamento de caixa: uma linha por data, uma coluna por forma de pagamento, mais o total."""
+    tabela = df_pedidos.pivot_table(
+        index='Data', columns='Tipo Pagamento', values='Total Pedido', aggfunc='sum', fill_value=0
+    )
+    tabela['Total'] = tabela.sum(axis=1)
+    return tabela
+
+
+def provaveis_duplicados(df_pedidos, itens):
+    """Pedidos com o mesmo telefone, a mesma data e os mesmos itens, agrupados.
+
+    A assinatura de cada pedido vira uma chave de agrupamento (hash), então
+    o custo cresce com o número de pedidos, sem comparar pedido a pedido.
+    Retorna os pedidos repetidos com a coluna 'Grupo', do grupo maior ao menor.
+    """
+    if df_pedidos.empty:
+        return df_pedidos.assign(Grupo=pd.Series(dtype='int64'))
+    pares = itens['Quantidade'].astype('int64').astype(str) + 'x ' + itens['Item'].astype(str).str.strip().str.lower()
+    assinatura = (
+        itens.assign(_par=pares).sort_values(['ID Pedido', '_par'])
+        .groupby('ID Pedido', sort=False)['_par'].agg('|'.join)
+    )
+    base = df_pedidos.assign(
+        _telefone=df_pedidos['Telefone Cliente'].astype(str).str.replace(r'\D', '', regex=True),
+        _data=df_pedidos['Data/Hora'].dt.strftime('%Y-%m-%d'),
+        _itens=df_pedidos['ID'].astype(str).map(assinatura).fillna(''),
+    )
+    chave = ['_telefone', '_data', '_itens']
+    repetidos = base[base['_telefone'].ne('') & base.duplicated(chave, keep=False)]
+    if repetidos.empty:
+        return repetidos.drop(columns=chave).assign(Grupo=pd.Series(dtype='int64'))
+    tamanho = repetidos.groupby(chave)['ID'].transform('size')
+    repetidos = repetidos.assign(_tamanho=tamanho).sort_values(['_tamanho', '_data', '_telefone', 'Data/Hora'], ascending=[False, True, True, True])
+    repetidos['Grupo'] = repetidos.groupby(chave, sort=False).ngroup() + 1
+    return repetidos.drop(columns=chave + ['_tamanho'])
@@ -0,0 +1,46 @@
+"""Dados e planilhas falsas compartilhados pelos testes (as planilhas são as do benchmark_carga.py, sem latência)."""
+from armazenamento import COLUNAS_CONFIG, COLUNAS_ITENS, COLUNAS_PEDIDOS, SheetsStore
+from benchmark_carga import ContadorAPI, PlanilhaFalsa
+
+
+def registro_pedido(pedido_id, data_hora, nome, telefone="86999998888", status="Aprovado", itens="[1x] Isca", **colunas):
+    """Pedido com todas as colunas de COLUNAS_PEDIDOS; as demais colunas vão por nome (ex: **{"Total Pedido": "20.00"})."""
+    valores = {
+        "ID": pedido_id, "Data/Hora": data_hora, "Nome Cliente": nome, "Telefone Cliente": telefone,
+        "Itens Pedido": itens, "Status": status, **colunas,
+    }
+    return {coluna: valores.get(coluna, "") for coluna in COLUNAS_PEDIDOS}
+
+
+def linha_pedido(*args, **kwargs):
+    """O mesmo pedido como linha da planilha, na ordem de COLUNAS_PEDIDOS."""
+    return list(registro_pedido(*args, **kwargs).values())
+
+
+def item_pedido(pedido_id, data, prato, quantidade):
+    return {"ID Pedido": pedido_id, "Data": data, "Item": prato, "Quantidade": quantidade, "Preco Unitario": 20.0}
+
+
+class PlanilhaInstavel(PlanilhaFalsa):
+    """Planilha cujo append_rows falha nas primeiras chamadas, antes ou depois de gravar."""
+
+    def __init__(self, titulo, cabecalho, falhas=1, grava_antes_de_falhar=False):
+        super().__init__(titulo, cabecalho, ContadorAPI(0), latencia=0, variacao=0)
+        self.falhas = falhas
+        self.grava_antes_de_falhar = grava_antes_de_falhar
+
+    def append_rows(self, linhas, value_input_option=None, **kwargs):
+        if self.falhas:
+            self.falhas -= 1
+            if self.grava_antes_de_falhar:
+                super().append_rows(linhas, value_input_option)
+            raise ConnectionError("tempo esgotado")
+        return super().append_rows(linhas, value_input_option)
+
+
+def sheets_store(pedidos=None, itens=None):
+    return SheetsStore(
+        pedidos or PlanilhaInstavel("Pedidos", COLUNAS_PEDIDOS, falhas=0),
+        PlanilhaInstavel("Configuracoes", COLUNAS_CONFIG, falhas=0),
+        itens or PlanilhaInstavel("Itens", COLUNAS_ITENS, falhas=0),
+    )
@@ -0,0 +1,183 @@
+from armazenamento import (
+    COLUNAS_ITENS, COLUNAS_PEDIDOS, ContadoresProducao, DeduplicadorPedidos, FeedAlteracoes, FilaPedidos, IndiceBusca,
+    ReservaEstoque, SQLiteStore
+)
+from conftest import PlanilhaInstavel, item_pedido, linha_pedido, sheets_store
+
+
+class StoreFora:
+    """Backend sempre indisponível: os pedidos ficam parados na fila."""
+
+    def adicionar_pedidos(self, linhas, itens=()):
+        raise ConnectionError("fora do ar")
+
+
+def store_com_limite(tmp_path, limite):
+    store = SQLiteStore(str(tmp_path / "pedidos.db"))
+    store.salvar_configuracao("2025-08-02", "2025-08-01", "18:00", "Sábado", f'{{"Isca": {limite}}}')
+    return store
+
+
+def test_busca_por_data_aceita_os_dois_formatos(tmp_path):
+    store = SQLiteStore(str(tmp_path / "pedidos.db"))
+    # Como o app grava e como o Sheets devolve depois de um reinício
+    store.adicionar_pedidos([
+        linha_pedido("20250802-AAA111", "2025-08-02 10:00:00", "Maria Silva"),
+        linha_pedido("20250802-BBB222", "02/08/2025 10:05:00", "Maria Sousa"),
+        linha_pedido("20250803-CCC333", "03/08/2025 09:00:00", "Maria Lima"),
+    ])
+    indice = IndiceBusca(store)
+
+    total, pedidos = indice.buscar("maria", data="2025-08-02")
+    assert total == 2
+    assert {p["ID"] for p in pedidos} == {"20250802-AAA111", "20250802-BBB222"}
+    assert indice.buscar("maria", data="2025-08-03")[0] == 1
+
+
+def test_busca_por_data_de_pedido_gravado_depois(tmp_path):
+    store = SQLiteStore(str(tmp_path / "pedidos.db"))
+    indice = IndiceBusca(store)
+    store.adicionar_pedidos([linha_pedido("20250802-DDD444", "02/08/2025 11:00:00", "José Araújo", telefone="86988887777")])
+
+    total, pedidos = indice.buscar("7777", data="2025-08-02")
+    assert total == 1
+    assert pedidos[0]["Data"] == "2025-08-02"
+
+
+def test_lote_repetido_nao_duplica_pedidos(tmp_path):
+    # Os pedidos foram gravados, mas os itens falharam: a fila manda o lote inteiro de novo
+    store = sheets_store(itens=PlanilhaInstavel("Itens", COLUNAS_ITENS))
+    fila = FilaPedidos(store, str(tmp_path / "fila.db"), intervalo=0.01, espera_maxima=0.05)
+    fila.enfileirar(
+        [linha_pedido("20250802-AAA111", "2025-08-02 10:00:00", "Maria Silva")],
+        [item_pedido("20250802-AAA111", "2025-08-02", "Isca", 1)],
+    )
+
+    assert fila.aguardar(5)
+    assert [l[0] for l in store.sheet._linhas] == ["ID", "20250802-AAA111"]
+    assert [l[0] for l in store.itens_sheet._linhas] == ["ID Pedido", "20250802-AAA111"]
+
+
+def test_lote_repetido_depois_de_erro_com_escrita_feita():
+    # O append_rows gravou e mesmo assim falhou (ex: tempo esgotado na resposta)
+    store = sheets_store(pedidos=PlanilhaInstavel("Pedidos", COLUNAS_PEDIDOS, grava_antes_de_falhar=True))
+    linhas = [linha_pedido("20250802-AAA111", "2025-08-02 10:00:00", "Maria Silva")]
+    itens = [item_pedido("20250802-AAA111", "2025-08-02", "Isca", 1)]
+    try:
+        store.adicionar_pedidos(linhas, itens)
+    except ConnectionError:
+        pass
+    store.adicionar_pedidos(linhas, itens)
+
+    assert [l[0] for l in store.sheet._linhas] == ["ID", "20250802-AAA111"]
+    assert [l[0] for l in store.itens_sheet._linhas] == ["ID Pedido", "20250802-AAA111"]
+    assert store.localizar("20250802-AAA111") == 2
+
+
+def test_indice_evita_find_e_confere_a_linha_antes_de_gravar():
+    store = sheets_store()
+    store.adicionar_pedidos([
+        linha_pedido("20250802-AAA111", "2025-08-02 10:00:00", "Maria Silva", status="Pendente"),
+        linha_pedido("20250802-BBB222", "2025-08-02 10:05:00", "José Araújo", status="Pendente"),
+    ])
+    contador = store.sheet.contador
+
+    assert store.atualizar_pedido("20250802-BBB222", "Status", "Aprovado")
+    assert store.indice.get("20250802-BBB222").status == "Aprovado"
+    assert contador.por_metodo["find"] == 0
+
+    # Alguém ordena a planilha por nome: a linha do índice aponta para outro pedido
+    store.sheet._linhas[1:] = sorted(store.sheet._linhas[1:], key=lambda l: l[2])
+    assert store.atualizar_pedido("20250802-AAA111", "Entregue", "Sim")
+    entregue = {l[0]: l[14] for l in store.sheet._linhas[1:]}
+    assert entregue == {"20250802-AAA111": "Sim", "20250802-BBB222": ""}
+    assert store.localizar("20250802-AAA111") == 3
+
+
+def test_indice_acha_pedido_gravado_por_fora():
+    store = sheets_store()
+    store.adicionar_pedidos([linha_pedido("20250802-AAA111", "2025-08-02 10:00:00", "Maria Silva")])
+    store.sheet._linhas.append(linha_pedido("20250802-CCC333", "2025-08-02 11:00:00", "Ana Lima"))
+
+    assert store.localizar("20250802-CCC333") == 3
+    assert store.localizar("20250802-ZZZ999") is None
+    assert store.atualizar_pedidos_em_lote(["20250802-CCC333", "20250802-ZZZ999"], "Status", "Pendente") == {
+        "20250802-CCC333": True, "20250802-ZZZ999": False,
+    }
+
+
+def test_reserva_conta_pedidos_que_sobraram_na_fila(tmp_path):
+    store = store_com_limite(tmp_path, 3)
+    fila = FilaPedidos(StoreFora(), str(tmp_path / "fila.db"), intervalo=60)
+    fila.enfileirar(
+        [linha_pedido("20250802-AAA111", "2025-08-02 10:00:00", "Maria Silva", itens="[2x] Isca")],
+        [item_pedido("20250802-AAA111", "2025-08-02", "Isca", 2)],
+    )
+    # Como depois de um reinício: a reserva nasce com o pedido ainda na fila
+    reserva = ReservaEstoque(store, ContadoresProducao(store), fila)
+
+    assert reserva.disponivel("2025-08-02", "Isca") == 1
+    assert reserva.reservar({"2025-08-02": {"Isca": 2}}, {"2025-08-02": "20250802-BBB222"}) == [("2025-08-02", "Isca", 1)]
+
+
+def test_reserva_tudo_ou_nada_sem_contar_duas_vezes(tmp_path):
+    store = store_com_limite(tmp_path, 3)
+    store.salvar_configuracao("2025-08-03", "2025-08-02", "18:00", "Domingo", '{"Isca": 1}')
+    reserva = ReservaEstoque(store, ContadoresProducao(store))
+
+    ids = {"2025-08-02": "20250802-AAA111", "2025-08-03": "20250803-AAA111"}
+    faltas = reserva.reservar({"2025-08-02": {"Isca": 2}, "2025-08-03": {"Isca": 2}}, ids)
+    assert faltas == [("2025-08-03", "Isca", 1)]
+    assert reserva.disponivel("2025-08-02", "Isca") == 3
+
+    assert reserva.reservar({"2025-08-02": {"Isca": 2}}, {"2025-08-02": "20250802-AAA111"}) == []
+    assert reserva.disponivel("2025-08-02", "Isca") == 1
+    # O pedido gravado passa a contar pelos contadores, não mais como reserva
+    store.adicionar_pedidos(
+        [linha_pedido("20250802-AAA111", "2025-08-02 10:00:00", "Maria Silva", itens="[2x] Isca")],
+        [item_pedido("20250802-AAA111", "2025-08-02", "Isca", 2)],
+    )
+    assert reserva.disponivel("2025-08-02", "Isca") == 1
+
+    reserva.reservar({"2025-08-02": {"Isca": 1}}, {"2025-08-02": "20250802-BBB222"})
+    reserva.liberar(["20250802-BBB222"])
+    assert reserva.disponivel("2025-08-02", "Isca") == 1
+
+
+def test_envio_repetido_recebe_os_ids_da_primeira_vez(tmp_path):
+    caminho = str(tmp_path / "envios.db")
+    deduplicador = DeduplicadorPedidos(caminho)
+
+    assert deduplicador.registrar("sessao-1:1", ["20250802-AAA111"]) is None
+    assert deduplicador.registrar("sessao-1:1", ["20250802-BBB222"]) == ["20250802-AAA111"]
+    # A chave sobrevive a um reinício
+    assert DeduplicadorPedidos(caminho).registrar("sessao-1:1", ["20250802-CCC333"]) == ["20250802-AAA111"]
+
+    # Envio recusado (prazo, capacidade): a mesma chave pode ser enviada de novo
+    deduplicador.liberar("sessao-1:1")
+    assert deduplicador.registrar("sessao-1:1", ["20250802-DDD444"]) is None
+
+
+def test_chave_vencida_vale_como_envio_novo(tmp_path):
+    deduplicador = DeduplicadorPedidos(str(tmp_path / "envios.db"), janela=0)
+    deduplicador.registrar("sessao-1:1", ["20250802-AAA111"])
+
+    assert deduplicador.registrar("sessao-1:1", ["20250802-BBB222"]) is None
+
+
+def test_feed_entrega_as_alteracoes_depois_do_seq(tmp_path):
+    store = SQLiteStore(str(tmp_path / "pedidos.db"))
+    feed = FeedAlteracoes(store, capacidade=2)
+    store.adicionar_pedidos([linha_pedido("20250802-AAA111", "2025-08-02 10:00:00", "Maria Silva")])
+    store.atualizar_pedidos_em_lote(["20250802-AAA111"], "Status", "Aprovado")
+
+    assert feed.seq == 2
+    assert feed.desde(2) == []
+    alteracoes = feed.desde(0)
+    assert [(a.tipo, a.ids) for a in alteracoes] == [("adicionados", ["20250802-AAA111"]), ("atualizados", ["20250802-AAA111"])]
+    assert (alteracoes[1].coluna, alteracoes[1].valor) == ("Status", "Aprovado")
+
+    store.atualizar_pedido("20250802-AAA111", "Entregue", "Sim")
+    # A primeira alteração já saiu do registro: quem parou no seq 0 redesenha tudo
+    assert feed.desde(0) is None
+    assert [a.seq for a in feed.desde(1)] == [2, 3]
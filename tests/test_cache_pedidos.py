@@ -0,0 +1,45 @@
+from cache_pedidos import CachePedidos, montar_df
+from conftest import linha_pedido, sheets_store
+
+
+def test_linha_apagada_na_planilha_recarrega_o_frame():
+    store = sheets_store()
+    store.adicionar_pedidos([
+        linha_pedido("20250802-AAA111", "2025-08-02 10:00:00", "Maria Silva", status="Pendente"),
+        linha_pedido("20250802-BBB222", "2025-08-02 10:05:00", "José Araújo", status="Aprovado"),
+        linha_pedido("20250802-CCC333", "2025-08-02 10:10:00", "Ana Lima", status="Pendente"),
+    ])
+    cache = CachePedidos(store)
+    cache.frame()
+
+    # Alguém apaga a linha do meio direto no Sheets
+    del store.sheet._linhas[2]
+    df = cache.frame(sincronizar=True)
+
+    assert df[["ID", "Status"]].values.tolist() == [["20250802-AAA111", "Pendente"], ["20250802-CCC333", "Pendente"]]
+    assert store.localizar("20250802-CCC333") == 3
+
+
+def test_sincronizacao_traz_status_e_pedidos_novos():
+    store = sheets_store()
+    store.adicionar_pedidos([linha_pedido("20250802-AAA111", "2025-08-02 10:00:00", "Maria Silva", status="Pendente")])
+    cache = CachePedidos(store)
+    cache.frame()
+
+    store.sheet._linhas[1][11] = "Aprovado"
+    store.sheet._linhas.append(linha_pedido("20250802-BBB222", "2025-08-02 10:05:00", "José Araújo", status=""))
+    df = cache.frame(sincronizar=True)
+
+    assert df[["ID", "Status"]].values.tolist() == [["20250802-AAA111", "Aprovado"], ["20250802-BBB222", ""]]
+
+
+def test_datas_nos_dois_formatos_da_planilha():
+    df = montar_df([
+        {"ID": "A", "Data/Hora": "2025-08-02 10:00:00"},
+        {"ID": "B", "Data/Hora": "02/08/2025 10:05:00"},
+        {"ID": "C", "Data/Hora": "13/08/2025 09:00:00"},
+        {"ID": "D", "Data/Hora": ""},
+    ])
+
+    assert df["Data/Hora"].dt.strftime("%Y-%m-%d %H:%M").tolist()[:3] == ["2025-08-02 10:00", "2025-08-02 10:05", "2025-08-13 09:00"]
+    assert df["Data/Hora"].isna().tolist() == [False, False, False, True]
@@ -0,0 +1,51 @@
+import pytest
+
+from cache_pedidos import montar_df, montar_df_itens
+from comandas import escrever_escpos, escrever_pdf, gerar_arquivo, gerar_comandas
+from conftest import item_pedido, registro_pedido
+
+GS_QR = b"\x1d(k"
+
+
+def comandas():
+    df = montar_df([
+        registro_pedido("20250802-AAA111", "2025-08-02 10:00:00", "Zé Souza"),
+        registro_pedido("20250802-BBB222", "2025-08-02 10:05:00", "Ângela Araújo", Observacoes="Sem cebola"),
+        registro_pedido("20250802-CCC333", "2025-08-02 10:10:00", "Bruno Lima"),
+    ])
+    itens = montar_df_itens([
+        item_pedido("20250802-AAA111", "2025-08-02", "Isca", 2),
+        item_pedido("20250802-BBB222", "2025-08-02", "Isca", 1),
+        item_pedido("20250802-BBB222", "2025-08-02", "Arroz", 1),
+        item_pedido("20250802-CCC333", "2025-08-02", "Isca", 1),
+    ])
+    return list(gerar_comandas(df, itens))
+
+
+def test_comandas_por_prato_e_nome_sem_acento():
+    assert [(c.prato, c.nome, c.quantidade) for c in comandas()] == [
+        ("Arroz", "Ângela Araújo", 1),
+        ("Isca", "Ângela Araújo", 1), ("Isca", "Bruno Lima", 1), ("Isca", "Zé Souza", 2),
+    ]
+
+
+def test_escpos_em_cp860_com_qr_nativo():
+    dados = gerar_arquivo(escrever_escpos, comandas(), "Congresso", largura=32)
+
+    # Inicializa a impressora e seleciona a página de código 3 (português)
+    assert dados.startswith(b"\x1b@\x1bt\x03")
+    assert "Ângela Araújo".encode("cp860") in dados
+    assert b"Obs: Sem cebola" in dados
+    # Gravação do QR: pL pH = tamanho do ID + 3, seguido de "1P0" e do ID
+    pid = b"20250802-AAA111"
+    assert GS_QR + bytes([len(pid) + 3, 0]) + b"1P0" + pid in dados
+    # Um corte de papel por comanda
+    assert dados.count(b"\x1dV\x42\x00") == 4
+
+
+def test_pdf_com_uma_pagina_por_prato():
+    pytest.importorskip("reportlab")
+    dados = gerar_arquivo(escrever_pdf, comandas(), "Congresso")
+
+    assert dados.startswith(b"%PDF-")
+    assert dados.count(b"/Type /Page\n") == 2
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+from conciliacao import Lancamento, agrupar_cobrancas, conciliar, ler_extrato, semelhanca_nomes
+from conftest import registro_pedido
+
+
+def pedido(pedido_id, data_hora, nome, total, agrupado="", telefone="86999998888"):
+    # Pedido pendente pago por Pix, o caso da conciliação
+    return registro_pedido(
+        pedido_id, data_hora, nome, telefone=telefone, status="Pendente",
+        **{"Total Pedido": total, "Valor Total Agrupado": agrupado, "Tipo Pagamento": "Pix"}
+    )
+
+
+def test_extrato_csv_com_valores_no_formato_brasileiro():
+    conteudo = (
+        "Data;Valor;Nome;Tipo\n"
+        "01/08/2025 10:02:00;R$ 1.234,56;PIX RECEBIDO MARIA SILVA;C\n"
+        "01/08/2025 11:00:00;-40,00;TARIFA;D\n"
+        "01/08/2025 12:00:00;36,00;JOSE ARAUJO;C\n"
+    ).encode("utf-8")
+    lancamentos = ler_extrato(conteudo, "extrato.csv")
+
+    assert [(l.centavos, l.nome) for l in lancamentos] == [(123456, "PIX RECEBIDO MARIA SILVA"), (3600, "JOSE ARAUJO")]
+    # Sem coluna de identificador: importar o mesmo arquivo de novo gera os mesmos IDs
+    assert [l.id for l in ler_extrato(conteudo, "extrato.csv")] == [l.id for l in lancamentos]
+
+
+def test_nome_abreviado_pelo_banco():
+    assert semelhanca_nomes("JOAO S SILVA", "João Santos da Silva") == 1.0
+    assert semelhanca_nomes("PEDRO ALVES", "João Santos da Silva") < 0.6
+
+
+def test_pedidos_do_mesmo_envio_viram_uma_cobranca():
+    cobrancas = agrupar_cobrancas([
+        pedido("20250802-AAA111", "2025-08-02 10:00:00", "Maria Silva", "20.00", agrupado="40.00"),
+        pedido("20250803-AAA111", "2025-08-03 10:00:00", "Maria Silva", "20.00", agrupado="40.00"),
+        pedido("20250802-BBB222", "2025-08-02 10:00:00", "José Araújo", "20.00", telefone="86988887777"),
+    ])
+
+    assert sorted((c.ids, c.centavos) for c in cobrancas) == [
+        (["20250802-AAA111", "20250803-AAA111"], 4000), (["20250802-BBB222"], 2000),
+    ]
+    assert [c.data_pedido for c in cobrancas if len(c.ids) == 2] == [datetime(2025, 8, 2).date()]
+
+
+def test_conciliar_usa_cada_credito_uma_vez():
+    cobrancas = agrupar_cobrancas([
+        pedido("20250802-AAA111", "2025-08-02 10:00:00", "Maria Silva", "20.00"),
+        pedido("20250802-BBB222", "2025-08-02 11:00:00", "Maria Sousa", "20.00", telefone="86988887777"),
+    ])
+    lancamentos = [
+        Lancamento("E1", datetime(2025, 8, 2, 10, 5), 2000, "PIX RECEBIDO MARIA SILVA"),
+        Lancamento("E2", datetime(2025, 6, 1, 10, 0), 2000, "MARIA SOUSA"),  # fora da janela de datas
+        Lancamento("E3", datetime(2025, 8, 2, 9, 0), 2500, "MARIA SOUSA"),  # valor diferente
+    ]
+    propostas, sem_par = conciliar(lancamentos, cobrancas, janela_dias=30)
+
+    assert [(p.lancamento.id, p.cobranca.ids) for p in propostas] == [("E1", ["20250802-AAA111"])]
+    assert propostas[0].confiavel and propostas[0].no_horario
+    assert [l.id for l in sem_par] == ["E2", "E3"]
+
+
+def test_conciliar_ignora_creditos_ja_gravados():
+    cobrancas = agrupar_cobrancas([pedido("20250802-AAA111", "02/08/2025 10:00:00", "Maria Silva", "20.00")])
+    lancamentos = [Lancamento("E1", datetime(2025, 8, 1), 2000, "MARIA SILVA")]
+
+    assert conciliar(lancamentos, cobrancas, usados={"E1"}) == ([], [])
+    propostas, _ = conciliar(lancamentos, cobrancas)
+    # Extrato só com a data: não há horário para comparar
+    assert len(propostas) == 1 and not propostas[0].no_horario
@@ -0,0 +1,34 @@
+from armazenamento import COLUNAS_EVENTOS, SQLiteStore
+from eventos import ConfigEventos, Evento, caminho_particao, nome_particao
+
+PADRAO = Evento("principal", "Congresso", {"Isca": 20.0}, {"Sábado": "2025-08-02"}, {"pix_chave": "123"})
+
+
+def test_evento_volta_igual_do_catalogo():
+    evento = Evento("retiro-2026", "Retiro", {"Isca": 22.5}, {"Sábado": "2026-03-07"}, {"whatsapp": "5586"}, "Arroz", ativo=False)
+    lido = Evento.de_registro(dict(zip(COLUNAS_EVENTOS, evento.registro())))
+
+    assert (lido.id, lido.cardapio, lido.datas, lido.pagamento, lido.ativo) == (
+        "retiro-2026", {"Isca": 22.5}, {"Sábado": "2026-03-07"}, {"whatsapp": "5586"}, False
+    )
+
+
+def test_particoes_do_evento_principal_mantem_os_nomes():
+    assert nome_particao("Pedidos", "principal") == "Pedidos"
+    assert nome_particao("Pedidos", "retiro-2026") == "Pedidos - retiro-2026"
+    assert caminho_particao("dados/pedidos.db", "retiro-2026") == "dados/pedidos_retiro-2026.db"
+
+
+def test_catalogo_grava_o_padrao_e_ignora_eventos_invalidos(tmp_path):
+    store = SQLiteStore(str(tmp_path / "pedidos.db"))
+    config = ConfigEventos(store, PADRAO, ttl=0)
+    assert list(config.eventos()) == ["principal"]
+    versao = config.versao
+
+    store.salvar_evento(["retiro", "Retiro", '{"Isca": "vinte"}', "{}", "{}", "", "sim"])
+    store.salvar_evento(["Nome Inválido", "X", "{}", "{}", "{}", "", "sim"])
+
+    # Um preço inválido tira só aquele evento do ar, não o app inteiro
+    assert list(config.eventos()) == ["principal"]
+    assert list(config.invalidos) == ["retiro"]
+    assert config.versao == versao + 1
@@ -0,0 +1,56 @@
+from datetime import date
+
+import pandas as pd
+
+from cache_pedidos import montar_df, montar_df_itens
+from conftest import item_pedido, registro_pedido
+from historico import consultar, eventos_no_historico, gravar_snapshot, receita_por_dia
+
+RECEBIDO = pd.Timestamp("2025-08-01 12:00", tz="UTC")
+
+
+def pedidos(*registros):
+    return montar_df([
+        registro_pedido(pid, data_hora, "Maria Silva", status=status, **{"Total Pedido": total})
+        for pid, data_hora, status, total in registros
+    ])
+
+
+def test_snapshot_particiona_por_data_e_mescla_pelo_id(tmp_path):
+    raiz = str(tmp_path)
+    df = pedidos(
+        ("20250802-AAA111", "2025-08-02 10:00:00", "Pendente", "20.00"),
+        ("20250802-BBB222", "02/08/2025 11:00:00", "Aprovado", "40.00"),
+        ("20250803-CCC333", "2025-08-03 09:00:00", "Aprovado", "20.00"),
+    )
+    itens = montar_df_itens([item_pedido("20250802-AAA111", "2025-08-02", "Isca", 1)])
+    assert gravar_snapshot(raiz, "principal", df, itens, recebidos={"20250802-AAA111": RECEBIDO}) == 2
+    # Nada mudou: nenhuma partição regravada
+    assert gravar_snapshot(raiz, "principal", df, itens) == 0
+
+    # O pedido apagado da planilha continua no histórico; o aprovado depois ganha horário
+    aprovado = df[df["ID"] != "20250802-BBB222"].assign(Status="Aprovado")
+    assert gravar_snapshot(raiz, "principal", aprovado, itens, aprovados={"20250802-AAA111": RECEBIDO + pd.Timedelta(hours=2)}) == 1
+
+    dia = consultar(raiz, "pedidos", ["ID", "Status", "Recebido em", "Aprovado em"], inicio=date(2025, 8, 2), fim=date(2025, 8, 2))
+    assert sorted(dia["ID"]) == ["20250802-AAA111", "20250802-BBB222"]
+    linha = dia.set_index("ID").loc["20250802-AAA111"]
+    assert (str(linha["Status"]), linha["Recebido em"], linha["Aprovado em"]) == ("Aprovado", RECEBIDO, RECEBIDO + pd.Timedelta(hours=2))
+    # Itens estruturados, ou os do texto de "Itens Pedido" para quem não tem
+    assert sorted(consultar(raiz, "itens", ["ID Pedido"])["ID Pedido"]) == ["20250802-AAA111", "20250802-BBB222", "20250803-CCC333"]
+
+
+def test_receita_por_dia_e_evento(tmp_path):
+    raiz = str(tmp_path)
+    vazio = montar_df_itens([])
+    gravar_snapshot(raiz, "principal", pedidos(("20250802-AAA111", "2025-08-02 10:00:00", "Aprovado", "20.00")), vazio)
+    gravar_snapshot(raiz, "retiro", pedidos(
+        ("20250802-BBB222", "2025-08-02 10:00:00", "Aprovado", "40.00"),
+        ("20250802-CCC333", "2025-08-02 10:00:00", "Pendente", "99.00"),
+        # Sem data válida: fica fora do histórico
+        ("20250802-DDD444", "", "Aprovado", "10.00"),
+    ), vazio)
+
+    assert eventos_no_historico(raiz) == ["principal", "retiro"]
+    assert receita_por_dia(raiz).loc["2025-08-02"].to_dict() == {"principal": 20.0, "retiro": 40.0}
+    assert receita_por_dia(raiz, eventos=["retiro"]).columns.tolist() == ["retiro"]
@@ -0,0 +1,82 @@
+import asyncio
+import csv
+import threading
+import time
+
+import pandas as pd
+
+from armazenamento import SQLiteStore
+from conftest import registro_pedido
+from notificacoes import (
+    ENVIADO, FALHOU, LINK_GERADO, MODELO_PADRAO, ExportacaoLinks, PipelineNotificacoes, RemetenteSimulado, montar_mensagem
+)
+
+
+def aguardar(lote, timeout=5.0):
+    limite = time.monotonic() + timeout
+    while not lote.concluido:
+        assert time.monotonic() < limite, "o lote não terminou a tempo"
+        time.sleep(0.01)
+
+
+def test_mensagem_usa_os_itens_estruturados():
+    itens = [{"Item": "Isca", "Quantidade": 2}, {"Item": "Frango assado", "Quantidade": 1}]
+    mensagem = montar_mensagem(MODELO_PADRAO + " {desconhecido}", "Congresso", "P1", "Maria", "2025-08-02 10:00:00", itens)
+
+    assert "#P1" in mensagem and "Olá, Maria!" in mensagem
+    assert "- [2x] Isca\n- [1x] Frango assado" in mensagem
+    # Campo desconhecido no modelo fica como está
+    assert mensagem.endswith("{desconhecido}")
+
+
+def test_lote_grava_o_resultado_de_cada_pedido(tmp_path):
+    store = SQLiteStore(str(tmp_path / "pedidos.db"))
+    pedidos = [registro_pedido(pid, "2025-08-02 10:00:00", nome) for pid, nome in [("P1", "Maria Silva"), ("P2", "José Araújo"), ("P3", "Ana Lima")]]
+    store.adicionar_pedidos([list(p.values()) for p in pedidos])
+    pipeline = PipelineNotificacoes(store, concorrencia=2, por_segundo=0, tentativas=2, espera_inicial=0)
+    remetente = RemetenteSimulado(falhar=["P2"])
+
+    lote = pipeline.iniciar(pedidos, remetente, MODELO_PADRAO, "Congresso")
+    aguardar(lote)
+
+    assert (lote.enviados, list(lote.falhas)) == (2, ["P2"])
+    assert sorted(pid for pid, _, _ in remetente.enviadas) == ["P1", "P3"]
+    notificacao = {p["ID"]: p["Notificacao"] for p in store.carregar_pedidos()}
+    assert notificacao == {"P1": ENVIADO, "P2": FALHOU, "P3": ENVIADO}
+
+
+def test_exportacao_grava_os_links_no_disco(tmp_path):
+    caminho = tmp_path / "links" / "comprovantes.csv"
+    remetente = ExportacaoLinks(str(caminho))
+
+    assert asyncio.run(remetente.enviar("P1", "(86) 99999-8888", "Olá, Maria!")) == LINK_GERADO
+    with open(caminho, newline="", encoding="utf-8") as f:
+        linhas = list(csv.reader(f))
+    assert linhas == [["ID", "Telefone", "Link"], ["P1", "(86) 99999-8888", "https://wa.me/5586999998888?text=Ol%C3%A1%2C%20Maria%21"]]
+
+
+class StoreComItens(SQLiteStore):
+    """Anota em que thread os itens foram carregados."""
+
+    def carregar_itens(self):
+        self.thread_itens = threading.current_thread().name
+        return super().carregar_itens()
+
+
+def test_pedido_sem_data_nao_derruba_o_lote(tmp_path):
+    store = StoreComItens(str(tmp_path / "pedidos.db"))
+    pedidos = [registro_pedido("P1", "2025-08-02 10:00:00", "Maria Silva"), registro_pedido("P2", "2025-08-02 10:00:00", "José Araújo")]
+    store.adicionar_pedidos([list(p.values()) for p in pedidos])
+    # Como vem do frame do painel: data ilegível vira NaT
+    pedidos[0]["Data/Hora"] = pd.NaT
+    pedidos[1]["Data/Hora"] = "02/08/2025 10:00:00"
+    pipeline = PipelineNotificacoes(store, concorrencia=1, por_segundo=0, tentativas=1, espera_inicial=0)
+    remetente = RemetenteSimulado()
+
+    lote = pipeline.iniciar(pedidos, remetente, "{pedido_id}: {data}", "Congresso")
+    aguardar(lote)
+
+    assert (lote.enviados, dict(lote.falhas)) == (2, {})
+    mensagens = dict((pid, m) for pid, _, m in remetente.enviadas)
+    assert mensagens["P1"] == "P1: " and mensagens["P2"].endswith(", 02/08")
+    assert store.thread_itens == "notificacoes"
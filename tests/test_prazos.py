@@ -0,0 +1,71 @@
+from datetime import datetime
+
+import pytz
+
+from prazos import AgendaPrazos, data_hora_iso, data_iso, ler_prazo
+
+FUSO = pytz.timezone("America/Fortaleza")
+
+
+class StoreConfiguracoes:
+    """Só as configurações, com contagem de leituras."""
+
+    def __init__(self, registros):
+        self.registros = registros
+        self.leituras = 0
+
+    def carregar_configuracoes(self):
+        self.leituras += 1
+        return self.registros
+
+
+def test_data_iso_aceita_os_dois_formatos():
+    assert data_iso("2025-08-02 10:00:00") == "2025-08-02"
+    assert data_iso("02/08/2025 10:00:00") == "2025-08-02"
+    assert data_iso(" 02/08/2025") == "2025-08-02"
+    # Sem data: nada a converter
+    assert data_iso("") == ""
+    assert data_hora_iso("02/08/2025 10:05:00") == "2025-08-02 10:05:00"
+    assert data_hora_iso("2025-08-02") == "2025-08-02"
+
+
+def test_ler_prazo_aceita_os_dois_formatos():
+    esperado = FUSO.localize(datetime(2025, 8, 1, 18, 0))
+    assert ler_prazo("2025-08-01", "18:00", FUSO) == esperado
+    assert ler_prazo("01/08/2025", "18:00:00", FUSO) == esperado
+    assert ler_prazo("", "18:00", FUSO) is None
+    assert ler_prazo("2025-08-01", "fim do dia", FUSO) is None
+
+
+def test_agenda_fechadas_e_prazos_invalidos():
+    store = StoreConfiguracoes([
+        {"data_evento": "2025-08-02", "prazo_data": "01/08/2025", "prazo_hora": "18:00"},
+        {"data_evento": "2025-08-03", "prazo_data": "2025-08-02", "prazo_hora": "18:00"},
+        {"data_evento": "2025-08-04", "prazo_data": "amanhã", "prazo_hora": "18:00"},
+    ])
+    agenda = AgendaPrazos(store, FUSO, ttl=3600)
+    agora = FUSO.localize(datetime(2025, 8, 1, 19, 0))
+
+    assert agenda.fechadas(["2025-08-02", "2025-08-03", "2025-08-04"], agora) == ["2025-08-02"]
+    assert agenda.invalidos == {"2025-08-04"}
+    assert agenda.prazo("2025-08-04") is None
+
+
+def test_agenda_rele_depois_do_ttl():
+    store = StoreConfiguracoes([{"data_evento": "2025-08-02", "prazo_data": "2025-08-01", "prazo_hora": "18:00"}])
+    agenda = AgendaPrazos(store, FUSO, ttl=0)
+    store.registros = [{"data_evento": "2025-08-02", "prazo_data": "2025-08-01", "prazo_hora": "20:00"}]
+
+    assert agenda.prazo("2025-08-02").hour == 20
+    assert store.leituras >= 2
+
+
+def test_agenda_mantem_prazos_se_a_leitura_falhar():
+    store = StoreConfiguracoes([{"data_evento": "2025-08-02", "prazo_data": "2025-08-01", "prazo_hora": "18:00"}])
+    agenda = AgendaPrazos(store, FUSO, ttl=0)
+
+    def fora_do_ar():
+        raise ConnectionError("fora do ar")
+    store.carregar_configuracoes = fora_do_ar
+
+    assert agenda.prazo("2025-08-02").hour == 18
@@ -0,0 +1,62 @@
+from cache_pedidos import montar_df, montar_df_itens
+from conftest import item_pedido, registro_pedido
+from relatorios import (
+    extrair_itens_texto, fechamento_por_dia, itens_dos_pedidos, provaveis_duplicados, resumo_itens, resumo_itens_por_dia
+)
+
+
+def pedidos_do_dia():
+    return montar_df([
+        registro_pedido("20250802-AAA111", "2025-08-02 10:00:00", "Maria Silva", itens="[2x] Isca",
+                        **{"Total Pedido": 40.0, "Tipo Pagamento": "Pix"}),
+        # Pedido antigo, sem itens estruturados; o nome do prato tem vírgula
+        registro_pedido("20250802-BBB222", "02/08/2025 11:00:00", "José Araújo", itens="[1x] Isca, [3x] Frango, farofa e arroz",
+                        **{"Total Pedido": 80.0, "Tipo Pagamento": "Dinheiro"}),
+        registro_pedido("20250803-CCC333", "2025-08-03 09:00:00", "Ana Lima", itens="[1x] Isca",
+                        **{"Total Pedido": 20.0, "Tipo Pagamento": "Pix"}),
+    ])
+
+
+def test_itens_do_texto_completam_os_estruturados():
+    df = pedidos_do_dia()
+    itens = itens_dos_pedidos(df, montar_df_itens([
+        item_pedido("20250802-AAA111", "2025-08-02", "Isca", 2), item_pedido("20250803-CCC333", "2025-08-03", "Isca", 1),
+    ]))
+
+    assert sorted(zip(itens["ID Pedido"], itens["Data"], itens["Item"], itens["Quantidade"])) == [
+        ("20250802-AAA111", "2025-08-02", "Isca", 2),
+        ("20250802-BBB222", "2025-08-02", "Frango, farofa e arroz", 3),
+        ("20250802-BBB222", "2025-08-02", "Isca", 1),
+        ("20250803-CCC333", "2025-08-03", "Isca", 1),
+    ]
+    assert resumo_itens(itens).to_dict() == {"Isca": 4, "Frango, farofa e arroz": 3}
+    assert resumo_itens_por_dia(itens).loc["Isca"].to_dict() == {"2025-08-02": 3, "2025-08-03": 1}
+
+
+def test_texto_sem_itens_reconhecidos():
+    df = montar_df([registro_pedido("20250802-AAA111", "2025-08-02 10:00:00", "Maria Silva", itens="(sem itens)")])
+    assert extrair_itens_texto(df).empty
+
+
+def test_fechamento_por_dia_e_pagamento():
+    df = pedidos_do_dia()
+    tabela = fechamento_por_dia(df.assign(Data=df["Data/Hora"].dt.date.astype(str)))
+
+    assert tabela.loc["2025-08-02"].to_dict() == {"Dinheiro": 80.0, "Pix": 40.0, "Total": 120.0}
+    assert tabela.loc["2025-08-03", "Total"] == 20.0
+
+
+def test_provaveis_duplicados_mesmo_telefone_data_e_itens():
+    df = montar_df([
+        registro_pedido("20250802-AAA111", "2025-08-02 10:00:00", "Maria Silva", telefone="(86) 99999-8888", itens="[2x] Isca"),
+        registro_pedido("20250802-BBB222", "02/08/2025 10:00:30", "Maria Silva", telefone="86999998888", itens="[2x] isca"),
+        # Outros itens, outro dia ou sem telefone: não são duplicados
+        registro_pedido("20250802-CCC333", "2025-08-02 10:01:00", "Maria Silva", itens="[1x] Isca"),
+        registro_pedido("20250803-DDD444", "2025-08-03 10:00:00", "Maria Silva", itens="[2x] Isca"),
+        registro_pedido("20250802-EEE555", "2025-08-02 10:00:00", "José", telefone="", itens="[2x] Isca"),
+        registro_pedido("20250802-FFF666", "2025-08-02 10:00:00", "José", telefone="", itens="[2x] Isca"),
+    ])
+    duplicados = provaveis_duplicados(df, itens_dos_pedidos(df, montar_df_itens([])))
+
+    assert duplicados[["Grupo", "ID"]].values.tolist() == [[1, "20250802-AAA111"], [1, "20250802-BBB222"]]
+    assert provaveis_duplicados(df.iloc[:1], itens_dos_pedidos(df.iloc[:1], montar_df_itens([]))).empty